@@ -0,0 +1,47 @@
+"""
+Compares every registered gateway codec on a GUILD_CREATE sized
+payload and on heartbeats. The first codec listed for an encoding
+is the one connections use by default.
+
+Run with `python benchmarks/bench_codecs.py` from the repository root.
+"""
+import sys
+import timeit
+
+sys.path.insert(0, '.')
+
+from bench_models import guild_payload  # noqa: E402
+
+from umbreon.gateway.codecs import codecs, find_codec  # noqa: E402
+
+NUMBER = 20
+HEARTBEATS = 10_000
+
+
+def main() -> None:
+    payload = {'op': 0, 's': 1, 't': 'GUILD_CREATE', 'd': guild_payload(1000)}
+    heartbeat = {'op': 1, 'd': 1234}
+
+    for encoding, registered in codecs.items():
+        if not registered:
+            continue
+
+        print(f'{encoding} (default: {find_codec(encoding).name})')
+
+        for codec in registered:
+            data = codec.encode(payload)
+
+            decode = min(timeit.repeat(
+                lambda: codec.decode(data), number=NUMBER, repeat=3
+            ))
+            encode = min(timeit.repeat(
+                lambda: codec.encode(heartbeat), number=HEARTBEATS, repeat=3
+            ))
+
+            print(f'  {codec.name:<10} '
+                  f'{len(data) * NUMBER / decode / 1e6:>8,.1f} MB/sec decoded'
+                  f'{HEARTBEATS / encode:>12,.0f} heartbeats/sec encoded')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""
+Measures how many data models per second `DataModelMixin` can build
+from typical gateway payloads.
+
+Run with `python benchmarks/bench_models.py` from the repository root.
+"""
+import sys
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Dict
+
+sys.path.insert(0, '.')
+
+from umbreon.cache.dict_cache import DictCache  # noqa: E402
+from umbreon.structures import Guild, Member, Message, User  # noqa: E402
+
+
+def user_payload(n: int) -> Dict[str, Any]:
+    return {
+        'id': str(80351110224678912 + n),
+        'username': f'user{n}',
+        'discriminator': '1337',
+        'avatar': '8342729096ea3675442027381ff50dfe',
+        'bot': False,
+        'flags': 64,
+    }
+
+
+def member_payload(n: int) -> Dict[str, Any]:
+    return {
+        'user': user_payload(n),
+        'nick': None,
+        'roles': ['41771983423143936', '41771983423143937'],
+        'joined_at': '2015-04-26T06:26:56.936000+00:00',
+        'premium_since': None,
+        'deaf': False,
+        'mute': False,
+    }
+
+
+def message_payload(n: int) -> Dict[str, Any]:
+    return {
+        'id': str(334385199974967042 + n),
+        'channel_id': '290926798999357250',
+        'guild_id': '290926798626357999',
+        'author': user_payload(n % 50),
+        'member': member_payload(n % 50),
+        'content': 'Supa Hot',
+        'timestamp': '2017-07-11T17:27:07.299000+00:00',
+        'edited_timestamp': None,
+        'tts': False,
+        'mention_everyone': False,
+        'mentions': [],
+        'mention_roles': [],
+        'attachments': [],
+        'embeds': [{
+            'title': 'embed', 'type': 'rich', 'description': 'hello',
+            'footer': {'text': 'footer'},
+            'fields': [{'name': 'a', 'value': 'b', 'inline': True}],
+        }],
+        'pinned': False,
+        'type': 0,
+    }
+
+
+def guild_payload(members: int) -> Dict[str, Any]:
+    return {
+        'id': '41771983423143937',
+        'name': 'Discord Developers',
+        'icon': None,
+        'owner_id': '80351110224678912',
+        'region': 'us-east',
+        'afk_timeout': 300,
+        'verification_level': 1,
+        'default_message_notifications': 0,
+        'explicit_content_filter': 0,
+        'roles': [
+            {'id': str(41771983423143936 + n), 'name': f'role{n}',
+             'color': 0, 'hoist': False, 'position': n,
+             'permissions': 104324161, 'managed': False,
+             'mentionable': False}
+            for n in range(20)
+        ],
+        'emojis': [],
+        'features': ['NEWS'],
+        'mfa_level': 0,
+        'joined_at': '2017-07-11T17:27:07.299000+00:00',
+        'large': True,
+        'member_count': members,
+        'members': [member_payload(n) for n in range(members)],
+        'channels': [
+            {'id': str(290926798999357250 + n), 'type': 0,
+             'guild_id': '41771983423143937', 'position': n,
+             'permission_overwrites': [], 'name': f'channel{n}',
+             'topic': None, 'nsfw': False}
+            for n in range(30)
+        ],
+        'premium_tier': 0,
+    }
+
+
+def objects_per_second(build: Callable[[], Any],
+                       objects: int,
+                       seconds: float = 2.0) -> float:
+    rounds = 0
+    start = time.perf_counter()
+
+    while time.perf_counter() - start < seconds:
+        build()
+        rounds += 1
+
+    return rounds * objects / (time.perf_counter() - start)
+
+
+def main() -> None:
+    client = SimpleNamespace(cache=DictCache())
+
+    users = [user_payload(n) for n in range(1000)]
+    members = [member_payload(n) for n in range(1000)]
+    messages = [message_payload(n) for n in range(1000)]
+    # a guild contains 1 guild, 20 roles, 30 channels and per member
+    # a Member and a User
+    guild = guild_payload(500)
+
+    cases = [
+        ('User', lambda: [User(client, dict(u)) for u in users], 1000),
+        ('Member', lambda: [Member(client, dict(m)) for m in members], 1000),
+        ('Message', lambda: [Message(client, dict(m)) for m in messages],
+         1000),
+        ('Guild (500 members)', lambda: Guild(client, dict(guild)),
+         1 + 20 + 30 + 2 * 500),
+    ]
+
+    for name, build, objects in cases:
+        rate = objects_per_second(build, objects)
+        print(f'{name:<24} {rate:>12,.0f} objects/sec')
+
+    # what most handlers do with a MESSAGE_CREATE
+    def handle(message: Message) -> Any:
+        return message.content, message.author.id, message.channel_id
+
+    for lazy in (False, True):
+        Message.lazy_decoding = lazy
+        rate = objects_per_second(
+            lambda: [handle(Message(client, dict(m)).uncache())
+                     for m in messages],
+            1000
+        )
+        name = 'Message handled' + (' (lazy)' if lazy else '')
+        print(f'{name:<24} {rate:>12,.0f} objects/sec')
+
+    Message.lazy_decoding = False
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Replays gateway traffic through decompression, decoding, dispatch and
+the cache, as fast as possible, and reports events per second.
+
+Run with `python benchmarks/bench_replay.py [recording]` from the
+repository root. Without a recording (see `umbreon.gateway.recording`)
+a synthetic one is made: a READY, GUILD_CREATEs and MESSAGE_CREATEs.
+"""
+import json
+import os
+import sys
+import tempfile
+import zlib
+
+import trio
+
+sys.path.insert(0, '.')
+
+from bench_models import guild_payload, message_payload  # noqa: E402
+
+from umbreon import Client  # noqa: E402
+from umbreon.gateway.recording import Recorder, replay  # noqa: E402
+
+GUILDS = 20
+MEMBERS = 500
+MESSAGES = 20_000
+
+
+async def synthesize(path: str) -> None:
+    recorder = Recorder(path, 'json', True)
+    deflate = zlib.compressobj()
+
+    def send(payload: dict) -> None:
+        data = json.dumps(payload).encode('utf-8')
+        recorder.write(deflate.compress(data)
+                       + deflate.flush(zlib.Z_SYNC_FLUSH))
+
+    recorder.connected()
+    send({'op': 10, 'd': {'heartbeat_interval': 41250}})
+
+    guild_ids = [str(41771983423143937 + n) for n in range(GUILDS)]
+    send({'op': 0, 's': 1, 't': 'READY', 'd': {
+        'v': 6, 'session_id': 'replay',
+        'user': {'id': '1', 'username': 'umbreon'},
+        'guilds': [{'id': n, 'unavailable': True} for n in guild_ids],
+    }})
+
+    for seq, guild_id in enumerate(guild_ids, 2):
+        send({'op': 0, 's': seq, 't': 'GUILD_CREATE',
+              'd': {**guild_payload(MEMBERS), 'id': guild_id}})
+
+    for n in range(MESSAGES):
+        send({'op': 0, 's': GUILDS + 2 + n, 't': 'MESSAGE_CREATE',
+              'd': message_payload(n)})
+
+    recorder.close()
+
+
+async def main(path: str) -> None:
+    client = Client('replay')
+
+    @client.on_dispatch('MESSAGE_CREATE')
+    async def on_message(client, message):
+        return message.content, message.author.id
+
+    stats = await replay(client, path)
+
+    print(f'{stats.events:,} events, {stats.received_bytes:,} bytes '
+          f'received, in {stats.seconds:.2f}s')
+    print(f'{stats.events_per_second:>12,.0f} events/sec')
+    print(f'{len(list(client.cache.models())):>12,} models cached')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        trio.run(main, sys.argv[1])
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'synthetic.rec')
+            trio.run(synthesize, path)
+            trio.run(main, path)
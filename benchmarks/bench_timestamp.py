@@ -0,0 +1,44 @@
+"""
+Compares `parse_timestamp` against `dateutil.parser.isoparse`
+on the timestamp shapes Discord sends.
+
+Run with `python benchmarks/bench_timestamp.py` from the repository root.
+"""
+import sys
+import timeit
+
+sys.path.insert(0, '.')
+
+from dateutil.parser import isoparse  # noqa: E402
+
+from umbreon.structures.timestamp import parse_timestamp  # noqa: E402
+
+NUMBER = 100_000
+
+# what a member chunk looks like: lots of different timestamps...
+UNIQUE = [
+    f'2017-07-11T17:{n // 60 % 60:02d}:{n % 60:02d}.{n:06d}+00:00'
+    for n in range(NUMBER)
+]
+# ... and lots of identical ones.
+REPEATED = ['2015-04-26T06:26:56.936000+00:00'] * NUMBER
+
+
+def run(name: str, timestamps: list) -> None:
+    for parser in (isoparse, parse_timestamp):
+        elapsed = min(timeit.repeat(
+            lambda: list(map(parser, timestamps)),
+            number=1,
+            repeat=3
+        ))
+        print(f'{name:<10} {parser.__name__:<16} '
+              f'{NUMBER / elapsed:>12,.0f} timestamps/sec')
+
+
+def main() -> None:
+    run('unique', UNIQUE)
+    run('repeated', REPEATED)
+
+
+if __name__ == '__main__':
+    main()
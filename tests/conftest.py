@@ -0,0 +1,121 @@
+"""A fake Discord for the HTTP tests, on trio's mock clock."""
+import json
+from typing import Any, Callable
+
+import pytest
+import trio
+import trio.testing
+
+from umbreon.http_base.http_client import HTTPClient
+from umbreon.http_base.route import RouteData
+from umbreon.http_base.routing_table import RoutingTable
+
+LIMIT = 5
+PERIOD = 2
+
+
+class Response:
+    def __init__(self, status_code: int, headers: dict, body: dict = None):
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+
+    def json(self) -> dict:
+        if self.body is None:
+            raise ValueError('no body')
+
+        return self.body
+
+
+class Buckets:
+    """
+    A bucket of `LIMIT` uses every `PERIOD` seconds for each url,
+    like Discord's for each channel.
+    """
+
+    def __init__(self):
+        self.windows = {}
+        self.used = {}
+        self.sent = 0
+        self.ratelimited = 0
+        #: how many responses are a headerless 502 first
+        self.errors = 0
+
+    async def request(self, method: str, url: str, **kwargs) -> Response:
+        now = trio.current_time()
+        await trio.sleep(0.05)
+
+        if self.errors:
+            self.errors -= 1
+            return Response(502, {})
+
+        if now >= self.windows.get(url, -1):
+            self.windows[url] = now + PERIOD
+            self.used[url] = 0
+
+        self.used[url] += 1
+        reset_after = self.windows[url] - now
+        headers = {
+            'X-RateLimit-Bucket': 'bucket',
+            'X-RateLimit-Limit': str(LIMIT),
+            'X-RateLimit-Remaining': str(max(LIMIT - self.used[url], 0)),
+            'X-RateLimit-Reset-After': str(reset_after)
+        }
+
+        if self.used[url] > LIMIT:
+            self.ratelimited += 1
+            headers['Via'] = '1.1 google'
+            return Response(429, headers, {'retry_after': reset_after * 1000})
+
+        self.sent += 1
+        return Response(200, headers)
+
+
+class Channels:
+    """Answers with a channel whose id is the end of the url."""
+
+    def __init__(self):
+        self.sent = []
+
+    async def request(self, method: str, url: str, **kwargs) -> Response:
+        self.sent.append((method, kwargs))
+        # the body has to make it over the wire
+        json.dumps(kwargs.get('json'))
+
+        channel_id = url.rstrip('/').rsplit('/', 1)[-1]
+        return Response(200, {}, {'id': channel_id, 'type': 0,
+                                  'name': 'general', **kwargs.get('json', {})})
+
+
+@pytest.fixture(autouse=True)
+def unknown_buckets() -> None:
+    """Every test finds out the routes' buckets for itself."""
+    for route in vars(RoutingTable).values():
+        if isinstance(route, RouteData):
+            route.hash = ''
+
+
+@pytest.fixture
+def buckets() -> Buckets:
+    return Buckets()
+
+
+@pytest.fixture
+def channels() -> Channels:
+    return Channels()
+
+
+@pytest.fixture
+def http(buckets: Buckets) -> HTTPClient:
+    return HTTPClient('token', session=buckets)
+
+
+@pytest.fixture
+def run() -> Callable[..., Any]:
+    """Runs `main` without waiting for any of its sleeps."""
+
+    def run(main: Callable[..., Any], *args: Any) -> Any:
+        clock = trio.testing.MockClock(autojump_threshold=0)
+        return trio.run(main, *args, clock=clock)
+
+    return run
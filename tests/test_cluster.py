@@ -0,0 +1,100 @@
+import trio
+import trio.testing
+
+from umbreon import Client
+from umbreon.gateway.cluster import Coordinator, FrameStream, guild_count
+
+from test_dict_cache import guild, play
+
+
+async def connect(nursery: trio.Nursery,
+                  coordinator: Coordinator) -> FrameStream:
+    ours, theirs = trio.testing.memory_stream_pair()
+    nursery.start_soon(coordinator.serve, theirs)
+
+    return FrameStream(ours)
+
+
+async def worker(nursery: trio.Nursery,
+                 coordinator: Coordinator,
+                 index: int) -> FrameStream:
+    channel = await connect(nursery, coordinator)
+    await channel.send({'op': 'hello', 'worker': index,
+                        'token': coordinator.token})
+
+    return channel
+
+
+def test_queries_dont_wait_on_lost_workers():
+    coordinator = Coordinator(Client, 1, 2)
+    answer = []
+
+    async def main() -> None:
+        async with trio.open_nursery() as nursery:
+            first = await worker(nursery, coordinator, 0)
+            second = await worker(nursery, coordinator, 1)
+            await trio.sleep(1)
+
+            await first.send({'op': 'query', 'nonce': 7,
+                              'name': 'guild_count'})
+
+            query = await first.receive()
+            await first.send({'op': 'answer', 'nonce': query['nonce'],
+                              'value': 3})
+
+            # hangs up without answering
+            await second.receive()
+            await second.stream.aclose()
+
+            # sooner than the timeout for workers that don't answer
+            with trio.fail_after(10):
+                answer.append(await first.receive())
+
+            assert list(coordinator.workers) == [0]
+            nursery.cancel_scope.cancel()
+
+    trio.run(main, clock=trio.testing.MockClock(autojump_threshold=0))
+
+    assert answer[0]['value'] == [3]
+
+
+def test_strangers_are_hung_up_on():
+    coordinator = Coordinator(Client, 1, 2)
+    hung_up = []
+
+    async def main() -> None:
+        async with trio.open_nursery() as nursery:
+            first = await worker(nursery, coordinator, 0)
+
+            stranger = await connect(nursery, coordinator)
+            await stranger.send({'op': 'hello', 'worker': 1,
+                                 'token': 'guess'})
+            hung_up.append(await stranger.receive())
+
+            rude = await connect(nursery, coordinator)
+            await rude.send({'op': 'hello'})
+            hung_up.append(await rude.receive())
+
+            # a worker sending nonsense doesn't take the others down
+            second = await worker(nursery, coordinator, 1)
+            await second.send({'op': 'nonsense'})
+            hung_up.append(await second.receive())
+
+            await first.send({'op': 'query', 'nonce': 7,
+                              'name': 'guild_count'})
+            query = await first.receive()
+            await first.send({'op': 'answer', 'nonce': query['nonce'],
+                              'value': 3})
+            assert (await first.receive())['value'] == [3]
+
+            nursery.cancel_scope.cancel()
+
+    trio.run(main, clock=trio.testing.MockClock(autojump_threshold=0))
+
+    assert hung_up == [None, None, None]
+
+
+def test_guild_count():
+    client = play(('GUILD_CREATE', guild()))
+
+    assert guild_count(client, None) == 1
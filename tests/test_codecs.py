@@ -0,0 +1,65 @@
+import zlib
+
+import pytest
+
+from umbreon.gateway import etf
+from umbreon.gateway.codecs import find_codec
+
+
+def test_etf_round_trip():
+    payload = {
+        'op': 0, 's': 70000, 't': 'MESSAGE_CREATE',
+        'd': {
+            'id': 41771983423143937, 'nonce': -3, 'ratio': 0.5,
+            'content': 'héllo', 'pinned': False, 'edited_timestamp': None,
+            'mentions': [], 'embeds': [{'fields': ()}]
+        }
+    }
+
+    decoded = etf.unpack(etf.pack(payload))
+
+    payload['d']['embeds'][0]['fields'] = ()
+    assert decoded == payload
+
+
+def test_etf_decodes_like_erlpack():
+    data = bytes((
+        etf.VERSION, etf.MAP_EXT, 0, 0, 0, 3,
+        etf.SMALL_ATOM_UTF8_EXT, 1, ord('a'),
+        etf.ATOM_EXT, 0, 4, *b'true',
+        etf.SMALL_ATOM_UTF8_EXT, 1, ord('b'),
+        etf.STRING_EXT, 0, 2, 1, 2,
+        etf.BINARY_EXT, 0, 0, 0, 1, 0xff,
+        etf.NIL_EXT,
+    ))
+
+    # atoms and strings are str, and binaries too if they're UTF-8
+    assert etf.unpack(data) == {'a': True, 'b': '\x01\x02', b'\xff': []}
+
+
+def test_etf_compressed_terms():
+    term = etf.pack(['guild'] * 100)[1:]
+    data = (bytes((etf.VERSION, etf.COMPRESSED))
+            + len(term).to_bytes(4, 'big') + zlib.compress(term))
+
+    assert etf.unpack(data) == ['guild'] * 100
+
+
+def test_etf_errors():
+    with pytest.raises(etf.ETFError):
+        etf.unpack(b'{"op": 0}')
+
+    with pytest.raises(etf.ETFError):
+        etf.pack({'set': {1}})
+
+
+def test_find_codec():
+    assert find_codec('json').encoding == 'json'
+    assert find_codec('etf', 'python').decode is etf.unpack
+
+    stdlib = find_codec('json', 'stdlib')
+    assert stdlib.decode(stdlib.encode({'op': 1, 'd': None})) \
+        == {'op': 1, 'd': None}
+
+    with pytest.raises(UserWarning):
+        find_codec('xml')
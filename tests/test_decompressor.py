@@ -0,0 +1,64 @@
+import json
+import zlib
+
+import pytest
+
+from umbreon.gateway.decompressor import (DecompressionError, ZLIB_SUFFIX,
+                                          ZlibStream)
+
+
+def compressor():
+    compress = zlib.compressobj()
+
+    def payload(data: dict) -> bytes:
+        encoded = json.dumps(data).encode()
+        return compress.compress(encoded) + compress.flush(zlib.Z_SYNC_FLUSH)
+
+    return payload
+
+
+def test_payloads_share_the_stream():
+    payload = compressor()
+    stream = ZlibStream()
+
+    for n in range(3):
+        message = payload({'op': 0, 's': n})
+        assert message.endswith(ZLIB_SUFFIX)
+        assert json.loads(stream.feed(message)) == {'op': 0, 's': n}
+
+    assert stream.payloads == 3
+
+
+def test_payloads_split_over_messages():
+    payload = compressor()
+    stream = ZlibStream(keep_size=16)
+    big = {'op': 0, 'd': ['member'] * 1000}
+    message = payload(big)
+
+    parts = [message[:5], message[5:-2], message[-2:]]
+    assert [stream.feed(part) for part in parts[:-1]] == [None, None]
+    assert json.loads(stream.feed(parts[-1])) == big
+
+    # the buffer doesn't hold on to big payloads
+    assert len(stream.buffer) == 0
+    assert json.loads(stream.feed(payload({'op': 11}))) == {'op': 11}
+    assert stream.ratio > 1
+
+
+def test_reset_starts_a_new_stream():
+    stream = ZlibStream()
+    stream.feed(compressor()({'op': 10}))
+
+    stream.reset()
+
+    assert json.loads(stream.feed(compressor()({'op': 0}))) == {'op': 0}
+
+
+def test_payloads_over_max_size():
+    stream = ZlibStream(max_size=100)
+
+    with pytest.raises(DecompressionError):
+        stream.feed(compressor()({'d': 'x' * 1000}))
+
+    with pytest.raises(DecompressionError):
+        stream.feed(b'\x00' * 101)
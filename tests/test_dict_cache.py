@@ -0,0 +1,94 @@
+import trio
+
+from umbreon import Client
+from umbreon.gateway.gateway_state_machine import GatewayStateMachine
+from umbreon.structures import Channel, Guild, Role
+
+GUILD_ID = '41771983423143937'
+
+
+def member(user_id: str, nick: str = 'nick') -> dict:
+    return {
+        'user': {'id': user_id, 'username': f'user {user_id}'},
+        'nick': nick, 'roles': [], 'deaf': False, 'mute': False,
+        'joined_at': '2020-01-01T00:00:00+00:00'
+    }
+
+
+def guild() -> dict:
+    return {
+        'id': GUILD_ID, 'name': 'guild',
+        # @everyone has the guild's id
+        'roles': [{'id': GUILD_ID, 'name': '@everyone', 'permissions': 0}],
+        'channels': [{'id': '2', 'type': 0, 'name': 'general'}],
+        'members': [member('10'), member('11')]
+    }
+
+
+def play(*events: dict, client: Client = None) -> Client:
+    client = client or Client('token')
+
+    async def main() -> None:
+        async with trio.open_nursery() as nursery:
+            state = GatewayStateMachine.connect(
+                client, nursery, client.dispatchers, client.diff_dispatchers
+            )
+
+            for seq, (event, data) in enumerate(events, 1):
+                await state.process({'op': 0, 's': seq, 't': event, 'd': data})
+
+    trio.run(main)
+
+    return client
+
+
+def test_ids_shared_across_classes_dont_collide():
+    cache = play(('GUILD_CREATE', guild())).cache
+
+    assert isinstance(cache.get(int(GUILD_ID), Guild), Guild)
+    assert isinstance(cache.get(int(GUILD_ID), Role), Role)
+
+
+def test_member_events_keep_the_index_up_to_date():
+    cache = play(
+        ('GUILD_CREATE', guild()),
+        ('GUILD_MEMBER_ADD', {**member('12'), 'guild_id': GUILD_ID}),
+        ('GUILD_MEMBER_UPDATE', {'guild_id': GUILD_ID, 'nick': None,
+                                 'roles': [], 'user': {'id': '10'}}),
+        ('GUILD_MEMBER_REMOVE', {'guild_id': GUILD_ID,
+                                 'user': {'id': '11'}}),
+    ).cache
+
+    members = cache.members_of(int(GUILD_ID))
+
+    assert sorted(m.user.id for m in members) == [10, 12]
+    assert cache.get_member(int(GUILD_ID), 10).nick is None
+
+
+def test_deletes_remove_from_the_cache():
+    cache = play(
+        ('GUILD_CREATE', guild()),
+        ('CHANNEL_DELETE', {'id': '2', 'type': 0, 'guild_id': GUILD_ID}),
+        ('GUILD_DELETE', {'id': GUILD_ID}),
+    ).cache
+
+    assert cache.get(2, Channel) is None
+    assert cache.get(int(GUILD_ID), Guild) is None
+    assert cache.channels_of(int(GUILD_ID)) == []
+
+
+def test_cleared_fields_are_changes():
+    client = Client('token')
+    seen = []
+
+    @client.on_dispatch('CHANNEL_UPDATE', changes=True)
+    async def on_update(client, channel, changes):
+        seen.append(changes)
+
+    channel = {'id': '2', 'type': 0, 'name': 'general', 'topic': 'hi'}
+    play(('CHANNEL_CREATE', channel),
+         ('CHANNEL_UPDATE', {**channel, 'topic': None}),
+         client=client)
+
+    assert seen[0].old('topic') == 'hi' and 'topic' in seen[0]
+    assert client.cache.get(2, Channel).topic is None
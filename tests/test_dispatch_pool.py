@@ -0,0 +1,79 @@
+import trio
+import trio.testing
+
+from umbreon import Client
+from umbreon.gateway.dispatch_pool import DispatchPool
+from umbreon.gateway.gateway_connection import GatewayConnection
+
+
+class WebSocket:
+    def __init__(self):
+        self.sent = []
+        self.closed = None
+
+    async def send_message(self, message) -> None:
+        self.sent.append(message)
+
+    async def aclose(self, code: int = 1000, reason: str = None) -> None:
+        self.closed = code
+
+
+def run(main) -> None:
+    trio.run(main, clock=trio.testing.MockClock(autojump_threshold=0))
+
+
+def test_full_queues_stall_the_submitter():
+    pool = DispatchPool(workers=1, queue_size=1)
+
+    async def handler() -> None:
+        await trio.sleep(10)
+
+    async def main() -> None:
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(pool.run)
+            await trio.sleep(1)
+
+            # one running, one queued, one waiting for room
+            for _ in range(3):
+                await pool.submit(None, handler)
+
+            assert pool.stalls == 1
+
+            nursery.start_soon(pool.submit, None, handler)
+            await trio.sleep(1)
+            assert pool.blocked
+
+            nursery.cancel_scope.cancel()
+
+    run(main)
+
+
+def test_stalled_listener_isnt_a_zombie():
+    ws = WebSocket()
+
+    async def handler() -> None:
+        await trio.sleep(100)
+
+    async def main() -> None:
+        async with trio.open_nursery() as nursery:
+            gate = GatewayConnection('token', nursery, Client('token'),
+                                     workers=1, queue_size=0)
+            gate.state.heartbeat_interval = 1
+            gate.state.hello.set()
+
+            nursery.start_soon(gate.dispatch_pool.run)
+            await nursery.start(gate.heartbeater, ws, gate.state)
+
+            # the listener is stuck on handlers for many beats, with
+            # every ACK behind it
+            await gate.dispatch_pool.submit(None, handler)
+            await gate.dispatch_pool.submit(None, handler)
+            assert ws.closed is None
+            assert len(ws.sent) > 1
+
+            await trio.sleep(3)
+            assert ws.closed == 4000
+
+            nursery.cancel_scope.cancel()
+
+    run(main)
@@ -0,0 +1,71 @@
+from umbreon import Client
+from umbreon.cache.dict_cache import DictCache
+from umbreon.cache.eviction import Evictor, LRUPolicy, TTLPolicy
+from umbreon.structures import Channel, Guild, Member
+
+from test_dict_cache import GUILD_ID, guild, member, play
+
+
+def channel(channel_id: int) -> tuple:
+    return ('CHANNEL_CREATE', {'id': str(channel_id), 'type': 0,
+                               'name': 'general'})
+
+
+def test_lru_keeps_the_recently_used():
+    policy = LRUPolicy(2)
+
+    assert policy.stored('a') == []
+    assert policy.stored('b') == []
+    policy.accessed('a')
+
+    assert policy.stored('c') == ['b']
+
+
+def test_ttl_expires_on_the_clock():
+    now = [0.0]
+    policy = TTLPolicy(10, clock=lambda: now[0])
+
+    policy.stored('a')
+    now[0] = 5
+    policy.stored('b')
+    assert policy.accessed('a')
+
+    now[0] = 11
+    assert not policy.accessed('a')
+    assert policy.stored('c') == ['a']
+
+
+def test_the_budget_never_evicts_what_was_just_stored():
+    evictor = Evictor(default=LRUPolicy(10), memory_budget=10, sizer=len)
+
+    assert evictor.stored('a', 'x' * 8) == []
+    assert evictor.stored('b', 'x' * 12) == ['a']
+    # even on its own, it's too big, but it's kept
+    assert list(evictor.recency) == ['b']
+
+
+def test_dict_cache_drops_what_the_evictor_says():
+    cache = DictCache(Evictor({Channel: LRUPolicy(2)}))
+    play(*(channel(channel_id) for channel_id in (2, 3, 4)),
+         client=Client('token', cache=cache))
+
+    assert cache.get(2, Channel) is None
+    assert cache.get(4, Channel).id == 4
+
+
+def test_members_are_budgeted():
+    evictor = Evictor({Member: LRUPolicy(1)})
+    cache = DictCache(evictor)
+    client = play(('GUILD_CREATE', guild()),
+                  client=Client('token', cache=cache))
+
+    assert cache.get(int(GUILD_ID), Guild) is not None
+    assert cache.get_member(int(GUILD_ID), 10) is None
+    assert cache.get_member(int(GUILD_ID), 11) is not None
+
+    play(('GUILD_MEMBER_ADD', {**member('12'), 'guild_id': GUILD_ID}),
+         client=client)
+    assert [m.user.id for m in cache.members_of(int(GUILD_ID))] == [12]
+
+    cache.drop(Guild, int(GUILD_ID))
+    assert (Member, (int(GUILD_ID), 12)) not in evictor.owners
@@ -0,0 +1,76 @@
+import trio
+
+from umbreon import Client
+from umbreon.structures import Channel
+
+from test_dict_cache import play
+
+
+def client(channels) -> Client:
+    return Client('token', freshness=60, session=channels)
+
+
+def test_modify_sends_the_fields(channels, run):
+    bot = client(channels)
+
+    async def main() -> None:
+        channel = await bot.fetch_channel(2)
+        channel.topic = 'new topic'
+        modified = await channel.modify()
+
+        assert modified.topic == 'new topic'
+
+    run(main)
+
+    method, kwargs = channels.sent[-1]
+    assert method == 'PATCH'
+    assert kwargs['json'] == {'name': 'general', 'type': 0,
+                              'topic': 'new topic'}
+
+
+def test_modify_sends_overwrites(channels, run):
+    bot = client(channels)
+    overwrite = {'id': '3', 'type': 'role', 'allow': 1024, 'deny': 0}
+
+    async def main() -> None:
+        channel = Channel(bot, {'id': '2', 'type': 0, 'guild_id': '1',
+                                'last_message_id': '9',
+                                'permission_overwrites': [overwrite]})
+        await channel.modify()
+
+    run(main)
+
+    method, kwargs = channels.sent[-1]
+    assert kwargs['json'] == {'type': 0, 'permission_overwrites': [
+        {'id': 3, 'type': 'role', 'allow': 1024, 'deny': 0}
+    ]}
+
+
+def test_expired_fetches_are_dropped(channels, run):
+    bot = client(channels)
+
+    async def main() -> None:
+        for channel_id in range(2, 12):
+            await bot.fetch_channel(channel_id)
+
+        await trio.sleep(61)
+        await bot.fetch_channel(12)
+
+    run(main)
+
+    assert list(bot.fetched) == [(Channel, 12)]
+    assert bot.cache.get(2, Channel) is None
+
+
+def test_gateway_updates_are_fresh(channels, run):
+    bot = client(channels)
+
+    async def main() -> None:
+        await bot.fetch_channel(2)
+
+    run(main)
+    play(('CHANNEL_UPDATE', {'id': '2', 'type': 0, 'name': 'renamed'}),
+         client=bot)
+
+    assert bot.fetched == {}
+    assert bot.cache.get(2, Channel).name == 'renamed'
@@ -0,0 +1,26 @@
+import trio
+
+from umbreon import Client
+from umbreon.gateway.gateway_state_machine import GatewayStateMachine
+
+
+def test_handlers_registered_after_connecting():
+    client = Client('token')
+    seen = []
+
+    async def main() -> None:
+        async with trio.open_nursery() as nursery:
+            state = GatewayStateMachine.connect(
+                client, nursery, client.dispatchers, client.diff_dispatchers
+            )
+
+            @client.on_dispatch('TYPING_START')
+            async def on_typing(client, data):
+                seen.append(data)
+
+            await state.process({'op': 0, 's': 1, 't': 'TYPING_START',
+                                 'd': {'channel_id': '2', 'user_id': '3'}})
+
+    trio.run(main)
+
+    assert len(seen) == 1
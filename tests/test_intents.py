@@ -0,0 +1,28 @@
+from umbreon import Client
+from umbreon.gateway.conversion_table import intents_for
+from umbreon.gateway.intents import Intents
+
+
+def test_intents_for_events():
+    assert intents_for([]) == Intents.GUILDS
+    assert intents_for(['READY', 'TYPING_START']) == (
+        Intents.GUILDS
+        | Intents.GUILD_MESSAGE_TYPING
+        | Intents.DIRECT_MESSAGE_TYPING
+    )
+
+
+def test_the_cache_gets_its_events():
+    client = Client('token')
+    intents = client.inferred_intents()
+
+    assert intents & Intents.GUILD_MESSAGES
+    assert intents & Intents.GUILD_EMOJIS
+    # it can't ask for privileged intents by itself
+    assert not intents & Intents.GUILD_MEMBERS
+
+    @client.on_dispatch('GUILD_MEMBER_ADD')
+    async def on_member_add(client, member):
+        pass
+
+    assert client.inferred_intents() & Intents.GUILD_MEMBERS
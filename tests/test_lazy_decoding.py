@@ -0,0 +1,49 @@
+from umbreon import Client
+from umbreon.structures import Message, Unset, User
+
+
+def message(client: Client) -> Message:
+    return Message(client, {
+        'id': '5', 'channel_id': '2', 'content': 'hi',
+        'author': {'id': '10', 'username': 'user 10'}
+    })
+
+
+def test_fields_convert_when_first_accessed(monkeypatch):
+    monkeypatch.setattr(Message, 'lazy_decoding', True)
+    client = Client('token')
+    lazy = message(client)
+
+    assert not lazy.loaded('content')
+    assert lazy.content == 'hi'
+    assert lazy.loaded('content')
+
+    # nested models go through the cache once they're converted
+    assert client.cache.get(10, User) is None
+    assert lazy.author is client.cache.get(10, User)
+
+    assert isinstance(lazy.edited_timestamp, Unset)
+    assert not lazy.loaded('edited_timestamp')
+
+
+def test_deferred_payloads_replace_fields(monkeypatch):
+    monkeypatch.setattr(Message, 'lazy_decoding', True)
+    lazy = message(Client('token'))
+    assert lazy.content == 'hi'
+
+    lazy.defer({'content': 'edited', 'not_a_field': 1})
+
+    assert not lazy.loaded('content')
+    assert lazy.content == 'edited'
+    assert lazy.id == 5
+    assert 'not_a_field' not in lazy.raw
+
+
+def test_eager_models_can_defer_too():
+    eager = message(Client('token'))
+    assert eager.raw is None and eager.loaded('content')
+
+    eager.defer({'content': 'edited'})
+
+    assert eager.content == 'edited'
+    assert eager.author.id == 10
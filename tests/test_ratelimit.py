@@ -0,0 +1,110 @@
+import trio
+
+from umbreon.http_base.http_client import HTTPClient
+from umbreon.http_base.route import RouteData
+from umbreon.http_base.routing_table import RoutingTable
+from umbreon.http_base.scheduler import Priority, Scheduler
+
+from conftest import LIMIT, PERIOD
+
+
+async def burst(client: HTTPClient,
+                count: int,
+                channel_id: int = 1,
+                route: RouteData = RoutingTable.modify_channel) -> None:
+    async with trio.open_nursery() as nursery:
+        for _ in range(count):
+            nursery.start_soon(
+                lambda: client.request(route, {'name': 'general'},
+                                       channel_id=channel_id)
+            )
+
+
+def test_burst_waits_instead_of_429(http, buckets, run):
+    async def main() -> None:
+        await burst(http, 3 * LIMIT + 2)
+
+    run(main)
+
+    assert buckets.sent == 3 * LIMIT + 2
+    assert buckets.ratelimited == 0
+
+
+def test_window_ending_with_uses_left(http, buckets, run):
+    async def main() -> None:
+        await burst(http, 2)
+        await trio.sleep(PERIOD + 1)
+        await burst(http, 2 * LIMIT)
+
+    run(main)
+
+    assert buckets.ratelimited == 0
+
+
+def test_errors_dont_unlimit_the_bucket(http, buckets, run):
+    buckets.errors = 1
+
+    async def main() -> None:
+        response = await http.request(RoutingTable.modify_channel,
+                                      {'name': 'general'}, channel_id=1)
+        assert response.status_code == 502
+
+        await burst(http, 2 * LIMIT)
+
+    run(main)
+
+    assert buckets.ratelimited == 0
+
+
+def test_routes_finding_the_same_bucket_share_it(http, buckets, run):
+    async def main() -> None:
+        # neither route knows its bucket yet, so each has a container
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(burst, http, LIMIT + 1)
+            nursery.start_soon(burst, http, LIMIT + 1, 1,
+                               RoutingTable.delete_channel)
+
+    run(main)
+
+    assert buckets.sent == 2 * LIMIT + 2
+    assert buckets.ratelimited == 0
+
+
+def test_waiting_on_a_bucket_holds_no_global_turn(http, run):
+    other_done = []
+
+    async def main() -> None:
+        http.scheduler = Scheduler(limit=LIMIT + 1, period=60)
+        await burst(http, LIMIT)
+
+        async with trio.open_nursery() as nursery:
+            # waits on its bucket until the window is over
+            nursery.start_soon(burst, http, 1)
+            await trio.sleep(0.01)
+
+            await burst(http, 1, channel_id=2)
+            other_done.append(trio.current_time())
+            nursery.cancel_scope.cancel()
+
+    run(main)
+
+    assert other_done[0] < PERIOD
+
+
+def test_urgent_gets_dont_wait_on_less_urgent_ones(http, buckets, run):
+    async def get(priority: Priority) -> None:
+        await http.request(RoutingTable.get_channel, priority=priority,
+                           channel_id=1)
+
+    async def main() -> None:
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(get, Priority.LOW)
+            await trio.sleep(0)
+            nursery.start_soon(get, Priority.HIGH)
+            await trio.sleep(0)
+            # the other way around is fine
+            nursery.start_soon(get, Priority.LOW)
+
+    run(main)
+
+    assert buckets.sent == 2
@@ -0,0 +1,77 @@
+import json
+
+import pytest
+import trio
+import trio.testing
+from trio_websocket import CloseReason, ConnectionClosed
+
+from umbreon import Client
+from umbreon.gateway.gateway_connection import GatewayConnection
+from umbreon.gateway.gateway_state_machine import GatewayError
+from umbreon.gateway.recording import Recorder, read, replay
+
+
+def typing_start(seq: int, channel_id: str) -> str:
+    return json.dumps({'op': 0, 's': seq, 't': 'TYPING_START',
+                       'd': {'channel_id': channel_id, 'user_id': '3'}})
+
+
+def test_replay_runs_handlers_on_a_pool(tmp_path):
+    path = str(tmp_path / 'capture')
+
+    async def record() -> None:
+        recorder = Recorder(path, 'json', False)
+        recorder.connected()
+
+        for seq in range(1, 9):
+            recorder.write(typing_start(seq, str(seq % 2)))
+
+        recorder.close()
+
+    trio.run(record)
+
+    client = Client('token')
+    seen = []
+
+    @client.on_dispatch('TYPING_START')
+    async def on_typing(client, data):
+        await trio.sleep(1 if data['channel_id'] == 0 else 0)
+        seen.append(int(data['channel_id']))
+
+    # one worker, so every handler waits for the one before
+    stats = trio.run(replay, client, path, False, None, 1,
+                     clock=trio.testing.MockClock(autojump_threshold=0))
+
+    assert stats.events == 8
+    assert seen == [1, 0] * 4
+    assert stats.seconds == 4
+
+
+class WebSocket:
+    async def get_message(self) -> str:
+        raise ConnectionClosed(CloseReason(4004, 'Authentication failed.'))
+
+
+def test_the_recorder_is_closed_with_the_connection(tmp_path):
+    path = str(tmp_path / 'capture')
+    gates = []
+
+    async def main() -> None:
+        async with trio.open_nursery() as nursery:
+            gate = GatewayConnection('token', nursery, Client('token'),
+                                     compress=False, record=path)
+            gate.identify = trio.lowlevel.checkpoint
+            gate.ws = WebSocket()
+            gate.recorder.connected()
+            gates.append(gate)
+
+            await gate.listener()
+
+    with pytest.raises(GatewayError):
+        trio.run(main)
+
+    assert gates[0].recorder.file.closed
+
+    header, records = read(path)
+    assert header == {'encoding': 'json', 'compress': False}
+    assert len(list(records)) == 1
@@ -0,0 +1,85 @@
+import trio
+
+from umbreon import Client
+from umbreon.cache.changes import ChangeSet
+from umbreon.cache.remote_cache import LocalTransport, RemoteCache
+from umbreon.structures import Channel, Guild, Role
+
+
+def client() -> Client:
+    return Client('token', cache=RemoteCache(LocalTransport()))
+
+
+def test_reads_dont_write_back():
+    bot = client()
+    members = [
+        {'user': {'id': str(n), 'username': f'user {n}'}, 'roles': []}
+        for n in range(10, 60)
+    ]
+    guild = Guild(bot, {'id': '1', 'name': 'guild', 'members': members})
+    bot.cache.pass_through(guild)
+    bot.cache.flush()
+
+    assert isinstance(bot.cache.get(1, Guild), Guild)
+    assert bot.cache.pending == []
+
+
+def test_diffs_off_the_trio_thread():
+    bot = client()
+    channel = {'id': '2', 'type': 0, 'name': 'general', 'topic': 'hi'}
+    bot.cache.pass_through(Channel(bot, channel))
+
+    changes = ChangeSet()
+    updated = Channel(bot, {**channel, 'topic': None})
+    trio.run(bot.cache.pass_through_async, updated, changes)
+
+    assert changes.old('topic') == 'hi' and 'topic' in changes
+    assert bot.cache.get(2, Channel).topic is None
+
+
+def test_ids_shared_across_classes_dont_collide():
+    bot = client()
+    guild = Guild(bot, {
+        'id': '1', 'name': 'guild',
+        # @everyone has the guild's id, and is queued first
+        'roles': [{'id': '1', 'name': '@everyone', 'permissions': 0}]
+    })
+    guild.uncache()
+
+    assert isinstance(bot.cache.get(1, Guild), Guild)
+    assert isinstance(bot.cache.get(1, Role), Role)
+
+    bot.cache.remove(1, Role)
+
+    assert bot.cache.get(1, Role) is None
+    assert isinstance(bot.cache.get(1, Guild), Guild)
+
+
+class CountingTransport(LocalTransport):
+    __slots__ = ('sent',)
+
+    def __init__(self):
+        super().__init__()
+        self.sent = 0
+
+    def send(self, request: bytes) -> None:
+        self.sent += 1
+        super().send(request)
+
+
+def test_only_async_writes_reach_the_server():
+    transport = CountingTransport()
+    bot = Client('token', cache=RemoteCache(transport, flush_size=0))
+
+    channel = Channel(bot, {'id': '2', 'type': 0, 'name': 'general'})
+    bot.cache.pass_through(channel)
+    bot.cache.pass_through_many([channel])
+    bot.cache.remove(3, Channel)
+
+    assert transport.sent == 0
+
+    trio.run(bot.cache.pass_through_async, channel)
+
+    # the puts from before the removal, the removal, the new put
+    assert transport.sent == 3
+    assert trio.run(bot.cache.get_async, 2, Channel).name == 'general'
@@ -0,0 +1,22 @@
+import pytest
+
+from umbreon import Client
+from umbreon.gateway.gateway_state_machine import GatewayError
+from umbreon.gateway.shard_manager import ShardManager
+
+from conftest import Response
+
+
+class Unauthorized:
+    async def request(self, method: str, url: str, **kwargs) -> Response:
+        return Response(401, {}, {'message': '401: Unauthorized'})
+
+
+def test_recommended_needs_an_answer(run):
+    client = Client('token', session=Unauthorized())
+
+    async def main() -> None:
+        await ShardManager.recommended(client, None)
+
+    with pytest.raises(GatewayError):
+        run(main)
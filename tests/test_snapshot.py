@@ -0,0 +1,36 @@
+from umbreon import Client
+from umbreon.cache.snapshot import as_payload
+from umbreon.structures import Channel, Member
+
+from test_dict_cache import GUILD_ID, guild, member, play
+
+
+def test_snapshots_round_trip(tmp_path):
+    data = guild()
+    data['members'].append({**member('12'), 'hoisted_role': GUILD_ID})
+    original = play(('GUILD_CREATE', data))
+    path = str(tmp_path / 'cache.snapshot')
+
+    saved = original.save_snapshot(path)
+    restored = Client('token')
+    assert restored.load_snapshot(path) == saved
+
+    before = sorted(original.cache.models(), key=repr)
+    after = sorted(restored.cache.models(), key=repr)
+    assert before == after
+    assert [as_payload(model) for model in before] \
+        == [as_payload(model) for model in after]
+
+    assert restored.cache.get(2, Channel).name == 'general'
+    assert len(restored.cache.members_of(int(GUILD_ID))) == 3
+
+
+def test_payloads_use_discords_keys():
+    client = play(('GUILD_CREATE', guild()))
+    member = Member(client, {'user': {'id': '12'}, 'roles': [],
+                             'hoisted_role': GUILD_ID})
+
+    payload = as_payload(member)
+
+    assert payload['hoisted_role'] == int(GUILD_ID)
+    assert 'hoisted_role_id' not in payload
@@ -1,4 +1,6 @@
 from .client import Client
+from .gateway.intents import Intents
 from .http_base.routing_table import RoutingTable
+from .http_base.scheduler import Priority
 
-__all__ = ('Client', 'RoutingTable',)
+__all__ = ('Client', 'Intents', 'Priority', 'RoutingTable',)
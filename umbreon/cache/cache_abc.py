@@ -1,12 +1,37 @@
 import abc
-from typing import TypeVar, Any
+from typing import (TypeVar, Any, FrozenSet, Iterable, List, Optional,
+                    Type, TYPE_CHECKING)
+
+from .changes import ChangeSet
+
+if TYPE_CHECKING:
+    from .. import Client
 
 T = TypeVar('T')
 
 
 class CacheABC(metaclass=abc.ABCMeta):
+    #: Gateway events this cache learns from, so they're converted even
+    #: when nothing handles them. Events not in here with no handlers
+    #: are skipped without building anything.
+    cached_events: FrozenSet[str] = frozenset({
+        'READY',
+        'CHANNEL_CREATE', 'CHANNEL_UPDATE', 'CHANNEL_DELETE',
+        'GUILD_CREATE', 'GUILD_UPDATE', 'GUILD_DELETE',
+        'GUILD_EMOJIS_UPDATE',
+        'GUILD_MEMBER_ADD', 'GUILD_MEMBER_UPDATE', 'GUILD_MEMBER_REMOVE',
+        'GUILD_MEMBERS_CHUNK',
+        'GUILD_ROLE_CREATE', 'GUILD_ROLE_UPDATE', 'GUILD_ROLE_DELETE',
+        'MESSAGE_CREATE', 'MESSAGE_UPDATE',
+        'MESSAGE_DELETE', 'MESSAGE_DELETE_BULK',
+        'USER_UPDATE',
+        'VOICE_STATE_UPDATE',
+    })
+
     @abc.abstractmethod
-    def pass_through(self, model: T) -> T:
+    def pass_through(self,
+                     model: T,
+                     changes: Optional[ChangeSet] = None) -> T:
         """
         Takes in a DataModel, and then outputs said datamodel.
 
@@ -17,14 +42,128 @@ class CacheABC(metaclass=abc.ABCMeta):
         This method is also where the cache fills the object with all
         the information it has stored.
 
+        If `changes` is passed, it should be filled in with every slot
+        of the stored model which this call changed.
+
         See `umbreon/cache/dict_cache.py` for a complete implementation.
         """
 
     @abc.abstractmethod
-    def get(self, model_id: Any) -> Any:
+    def get(self,
+            model_id: Any,
+            model_type: Optional[Type[T]] = None) -> Any:
         """
         Passes in the way the cache identifies, and returns
-        the object which matches that.
+        the object which matches that. If `model_type` is passed,
+        only an instance of it may be returned.
 
         See `umbreon/cache/dict_cache.py` for a complete implementation.
         """
+
+    def remove(self,
+               model_id: Any,
+               model_type: Optional[Type[Any]] = None) -> None:
+        """
+        Drops whatever matches `model_id` from the cache, if anything.
+        If `model_type` is passed, only instances of it are dropped.
+        The default keeps everything.
+
+        See `umbreon/cache/dict_cache.py` for a complete implementation.
+        """
+
+    def pass_through_many(self, models: Iterable[T]) -> List[T]:
+        """
+        `pass_through` for many models at once, so implementations
+        can amortize their per-call costs. The default just loops.
+        """
+        return [self.pass_through(model) for model in models]
+
+    def get_many(self,
+                 model_ids: Iterable[Any],
+                 model_type: Optional[Type[T]] = None) -> List[Any]:
+        """
+        `get` for many ids at once, with None for every miss.
+        The default just loops.
+        """
+        return [self.get(model_id, model_type) for model_id in model_ids]
+
+    async def pass_through_async(self,
+                                 model: T,
+                                 changes: Optional[ChangeSet] = None) -> T:
+        """
+        Like `pass_through`, for the gateway, so caches which have to
+        wait on I/O to fill in `changes` can let other tasks run.
+        """
+        return self.pass_through(model, changes)
+
+    async def pass_through_many_async(self,
+                                      models: Iterable[T]) -> List[T]:
+        """
+        Like `pass_through_many`, but caches which have to wait on
+        I/O can override this to let other tasks run meanwhile.
+        """
+        return self.pass_through_many(models)
+
+    async def get_many_async(
+        self,
+        model_ids: Iterable[Any],
+        model_type: Optional[Type[T]] = None
+    ) -> List[Any]:
+        """Like `get_many`, see `pass_through_many_async`."""
+        return self.get_many(model_ids, model_type)
+
+    async def get_async(self,
+                        model_id: Any,
+                        model_type: Optional[Type[T]] = None) -> Any:
+        """Like `get`, see `pass_through_many_async`."""
+        return self.get(model_id, model_type)
+
+    def get_member(self, guild_id: Any, user_id: Any) -> Any:
+        """
+        The `Member` of `user_id` in `guild_id`, or None. Members
+        don't have ids of their own, so `get` can't find them.
+        The default never finds any.
+        """
+        return None
+
+    def add_member(self, guild_id: Any, member: T) -> T:
+        """
+        Caches `member` of `guild_id`, for `get_member`. Its user is
+        already cached when it's built, which is all the default keeps.
+        """
+        return member
+
+    def remove_member(self, guild_id: Any, user_id: Any) -> None:
+        """Drops the `Member` of `user_id` in `guild_id`, if it's cached."""
+
+    def handle_event(self,
+                     event: str,
+                     data: Any,
+                     converted: Any) -> None:
+        """
+        Called with every gateway event in `cached_events`, its raw
+        `data` and what that was `converted` to, after the models in it
+        went through `pass_through`. This is for what that can't see:
+        members, which don't know their guild, and deletions.
+        The default ignores them.
+        """
+
+    def attach(self, client: 'Client') -> None:
+        """
+        Called by the `Client` which is going to use this cache.
+        Caches which have to build models themselves need it.
+        """
+
+    def models(self) -> Iterable[Any]:
+        """
+        Every cached model, for snapshots and `count`. The default
+        has none to list, so a snapshot of it is empty.
+        """
+        return []
+
+    def count(self, model_type: Type[Any]) -> int:
+        """
+        How many instances of exactly `model_type` are cached. The
+        default goes through `models`, so caches should keep a count.
+        """
+        return sum(type(model) is model_type for model in self.models())
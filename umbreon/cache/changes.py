@@ -0,0 +1,43 @@
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+
+class ChangeSet:
+    """
+    What a cache's `pass_through` changed on the stored model:
+    for every slot that changed, its old and new value.
+    """
+    __slots__ = ('created', 'changes')
+    #: The model wasn't cached before, so everything is new.
+    created: bool
+    changes: Dict[str, Tuple[Any, Any]]
+
+    def __init__(self):
+        self.created = False
+        self.changes = {}
+
+    def record(self, slot: str, old: Any, new: Any) -> None:
+        self.changes[slot] = (old, new)
+
+    def old(self, slot: str, default: Optional[Any] = None) -> Any:
+        return self.changes[slot][0] if slot in self.changes else default
+
+    def new(self, slot: str, default: Optional[Any] = None) -> Any:
+        return self.changes[slot][1] if slot in self.changes else default
+
+    def __contains__(self, slot: str) -> bool:
+        return slot in self.changes
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.changes)
+
+    def __bool__(self) -> bool:
+        return self.created or bool(self.changes)
+
+    def __repr__(self) -> str:
+        if self.created:
+            return 'ChangeSet(created)'
+
+        return 'ChangeSet(%s)' % ', '.join(
+            f'{slot}: {old!r} -> {new!r}'
+            for slot, (old, new) in self.changes.items()
+        )
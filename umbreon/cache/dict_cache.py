@@ -1,20 +1,66 @@
 from .cache_abc import CacheABC
-from ..structures.snowflake import SnowflakeDependent
+from .changes import ChangeSet
+from .eviction import Evictor
+from .index import SecondaryIndex, group_of
+from ..structures.channel import Channel
+from ..structures.guild import Guild
+from ..structures.member import Member
+from ..structures.message import Message
+from ..structures.role import Role
+from ..structures.snowflake import Snowflake, SnowflakeDependent
 from ..structures.storage_box import StorageBox
-from typing import TypeVar, Any, Dict
+from typing import (TypeVar, Any, Callable, Dict, Iterable, List,
+                    Optional, Type)
 
 
 T = TypeVar('T')
 
 
 class DictCache(CacheABC):
-    __slots__ = ('backing',)
-    backing: Dict[int, Any]
+    __slots__ = ('partitions', 'evictor', 'indexers', 'event_handlers',
+                 'guild_channels', 'guild_members', 'channel_messages')
+    #: One store per model class, by id. Ids aren't unique across
+    #: classes (the @everyone role has its guild's), so they're never
+    #: looked up in one big dict.
+    partitions: Dict[Type[Any], Dict[int, Any]]
+    #: Without an evictor, everything is kept forever.
+    evictor: Optional[Evictor]
+    indexers: Dict[Type[Any], Callable[[Any], None]]
+    #: what to do with events `pass_through` doesn't see all of
+    event_handlers: Dict[str, Callable[[Dict[str, Any], Any], None]]
+    #: guild id -> channel ids
+    guild_channels: SecondaryIndex
+    #: guild id -> user id -> the `Member`, which isn't in a partition
+    guild_members: SecondaryIndex
+    #: channel id -> message ids, oldest first
+    channel_messages: SecondaryIndex
 
-    def __init__(self):
-        self.backing = dict()
+    def __init__(self, evictor: Optional[Evictor] = None):
+        self.partitions = dict()
+        self.evictor = evictor
+        self.guild_channels = SecondaryIndex()
+        self.guild_members = SecondaryIndex()
+        self.channel_messages = SecondaryIndex()
+        self.indexers = {
+            Channel: self.index_channel,
+            Guild: self.index_guild,
+            Message: self.index_message
+        }
+        self.event_handlers = {
+            'GUILD_MEMBER_ADD': self.on_member_add,
+            'GUILD_MEMBER_UPDATE': self.on_member_update,
+            'GUILD_MEMBER_REMOVE': self.on_member_remove,
+            'GUILD_MEMBERS_CHUNK': self.on_members_chunk,
+            'CHANNEL_DELETE': self.on_channel_delete,
+            'GUILD_DELETE': self.on_guild_delete,
+            'GUILD_ROLE_DELETE': self.on_role_delete,
+            'MESSAGE_DELETE': self.on_message_delete,
+            'MESSAGE_DELETE_BULK': self.on_message_delete_bulk
+        }
 
-    def pass_through(self, model: T) -> T:
+    def pass_through(self,
+                     model: T,
+                     changes: Optional[ChangeSet] = None) -> T:
         model_class = model.__class__
 
         if not issubclass(model_class, SnowflakeDependent):
@@ -24,34 +70,57 @@ class DictCache(CacheABC):
             # only Snowflakes which don't need to be cached.
             return model
 
-        # check if there is another model like that stored
-        is_stored = hash(model) in self.backing
+        partition = self.partitions.get(model_class)
 
-        if not is_stored:
+        if partition is None:
+            partition = self.partitions[model_class] = {}
+
+        key = hash(model)
+        stored_model = partition.get(key)
+
+        if stored_model is None:
             # maybe model should be .copy() -ed?
-            self.backing[hash(model)] = model
-            return model
+            partition[key] = model
+            self.track(model)
 
-        # a simple check to see if this should continue
-        # this may happen, who knows, discord is weird
-        # besides, this check doesn't take much...
-        stored_model = self.backing[hash(model)]
+            if changes is not None:
+                changes.created = True
 
-        if type(stored_model) != type(model):
             return model
 
         # an assumption to make this work without taking forever
         slots = getattr(model, '__slots__', tuple())
 
-        # light optimization:
-        changes = False
+        # lazy models only hand over what was converted, the rest
+        # of their payload is deferred to the stored model. Unless
+        # a diff is wanted, then it all has to be converted anyways.
+        raw = getattr(model, 'raw', None)
+        defer = raw is not None and changes is None
 
         for slot in slots:
-            new_data = getattr(model, slot)
-            if new_data:
-                if getattr(stored_model, slot) != new_data:
-                    setattr(stored_model, slot, new_data)
-                    changes = True
+            try:
+                new_data = object.__getattribute__(model, slot)
+            except AttributeError:
+                # not in the payload, or lazy and not converted yet
+                if raw is None or defer:
+                    continue
+
+                new_data = getattr(model, slot)
+
+                # a falsy value only counts if it was in the payload,
+                # like a nick that was cleared
+                if not new_data and not model.loaded(slot):  # type: ignore
+                    continue
+
+            old_data = getattr(stored_model, slot)
+            if old_data != new_data:
+                setattr(stored_model, slot, new_data)
+
+                if changes is not None:
+                    changes.record(slot, old_data, new_data)
+
+        if defer:
+            stored_model.defer(raw)  # type: ignore
 
         # update storage
         if hasattr(stored_model, 'storage') and not stored_model.storage:
@@ -60,12 +129,316 @@ class DictCache(CacheABC):
         if hasattr(model, 'storage') and model.storage:  # type: ignore
             stored_model.storage.update(model.storage)  # type: ignore
 
-        if changes:
-            self.backing[hash(model)] = stored_model
-
-        model = stored_model
+        self.track(stored_model)
 
         return stored_model  # type: ignore
 
-    def get(self, model_id: Any) -> Any:
-        return self.backing.get(hash(model_id))
+    def pass_through_many(self, models: Iterable[T]) -> List[T]:
+        # lists are nearly always of a single class, and mostly of
+        # models which aren't stored yet: those are just inserted.
+        results = []
+        last_class: Optional[type] = None
+        partition: Dict[int, Any] = {}
+        cacheable = False
+
+        for model in models:
+            model_class = model.__class__
+
+            if model_class is not last_class:
+                last_class = model_class
+                cacheable = issubclass(model_class, SnowflakeDependent)
+
+                if cacheable:
+                    partition = self.partitions.setdefault(model_class, {})
+
+            if not cacheable:
+                results.append(model)
+                continue
+
+            key = hash(model)
+
+            if key in partition:
+                results.append(self.pass_through(model))
+                continue
+
+            partition[key] = model
+            self.track(model)
+            results.append(model)
+
+        return results
+
+    def get(self,
+            model_id: Any,
+            model_type: Optional[Type[T]] = None) -> Any:
+        """
+        Without `model_type`, the first model of any class with that id,
+        which is ambiguous for ids like a guild's and its @everyone role.
+        """
+        key = hash(model_id)
+
+        if self.evictor is None and model_type is not None:
+            model = self.partitions.get(model_type, {}).get(key)
+
+            if model is not None:
+                return model
+
+        for model_class in self.classes_of(model_type):
+            model = self.partitions[model_class].get(key)
+
+            if model is None:
+                continue
+
+            if self.evictor is not None \
+                    and not self.evictor.accessed((model_class, key)):
+                self.drop(model_class, key)
+                continue
+
+            return model
+
+        return None
+
+    def classes_of(self, model_type: Optional[Type[Any]]) -> List[Type[Any]]:
+        """The partitions `model_type` can be in, its own first."""
+        if model_type is None:
+            return list(self.partitions)
+
+        classes = [model_type] if model_type in self.partitions else []
+
+        # maybe a subclass, like MentionedUser for User
+        classes.extend(
+            model_class for model_class in self.partitions
+            if model_class is not model_type
+            and issubclass(model_class, model_type)
+        )
+
+        return classes
+
+    def models(self) -> List[Any]:
+        return [
+            model
+            for partition in self.partitions.values()
+            for model in partition.values()
+        ]
+
+    def all(self, model_type: Type[T]) -> List[T]:
+        """Every cached instance of exactly `model_type`."""
+        return list(self.partitions.get(model_type, {}).values())
+
+    def count(self, model_type: Type[Any]) -> int:
+        """How many instances of exactly `model_type` are cached."""
+        return len(self.partitions.get(model_type, {}))
+
+    def channels_of(self, guild_id: Any) -> List[Channel]:
+        return self.resolve(Channel, self.guild_channels.get(hash(guild_id)))
+
+    def members_of(self, guild_id: Any) -> List[Member]:
+        return list(self.guild_members.get(hash(guild_id)).values())
+
+    def get_member(self, guild_id: Any, user_id: Any) -> Optional[Member]:
+        key = (hash(guild_id), hash(user_id))
+        member = self.guild_members.get(key[0]).get(key[1])
+
+        if member is not None and self.evictor is not None \
+                and not self.evictor.accessed((Member, key)):
+            self.guild_members.discard(*key)
+            return None
+
+        return member
+
+    def add_member(self, guild_id: Any, member: T) -> T:
+        user = getattr(member, 'user', None)
+
+        if user:
+            self.keep_member(hash(guild_id), hash(user), member)
+
+        return member
+
+    def keep_member(self, guild_key: int, user_key: int, member: Any) -> None:
+        """Indexes `member`, and lets the evictor know about it."""
+        self.guild_members.add(guild_key, user_key, member)
+
+        if self.evictor is None:
+            return
+
+        evicted = self.evictor.stored((Member, (guild_key, user_key)), member)
+
+        for evicted_class, key in evicted:
+            self.drop(evicted_class, key)
+
+    def remove_member(self, guild_id: Any, user_id: Any) -> None:
+        key = (hash(guild_id), hash(user_id))
+        self.guild_members.discard(*key)
+
+        if self.evictor is not None:
+            self.evictor.removed((Member, key))
+
+    def messages_of(self,
+                    channel_id: Any,
+                    limit: Optional[int] = None) -> List[Message]:
+        """The cached messages of a channel, newest last."""
+        keys = list(self.channel_messages.get(hash(channel_id)))
+
+        if limit is not None:
+            keys = keys[-limit:] if limit > 0 else []
+
+        return self.resolve(Message, keys)
+
+    def resolve(self, model_class: Type[Any], keys: Any) -> List[Any]:
+        partition = self.partitions.get(model_class, {})
+        return [partition[key] for key in keys if key in partition]
+
+    def remove(self,
+               model_id: Any,
+               model_type: Optional[Type[Any]] = None) -> None:
+        key = hash(model_id)
+
+        for model_class in self.classes_of(model_type):
+            if key not in self.partitions[model_class]:
+                continue
+
+            self.drop(model_class, key)
+
+            if self.evictor is not None:
+                self.evictor.removed((model_class, key))
+
+    def drop(self, model_class: Type[Any], key: Any) -> None:
+        """Takes `key` out of the storage and the indexes."""
+        if model_class is Member:
+            # members are only in the index, by (guild, user)
+            self.guild_members.discard(*key)
+            return
+
+        model = self.partitions.get(model_class, {}).pop(key, None)
+
+        if model is None:
+            return
+
+        if model_class is Channel:
+            group = group_of(model, 'guild_id')
+            if group is not None:
+                self.guild_channels.discard(group, key)
+        elif model_class is Message:
+            group = group_of(model, 'channel_id')
+            if group is not None:
+                self.channel_messages.discard(group, key)
+        elif model_class is Guild:
+            self.guild_channels.drop(key)
+
+            if self.evictor is not None:
+                for user_key in self.guild_members.get(key):
+                    self.evictor.removed((Member, (key, user_key)))
+
+            self.guild_members.drop(key)
+
+    def track(self, model: Any) -> None:
+        """
+        Updates the indexes with `model`, then lets the
+        evictor know about it and evicts what it says.
+        """
+        model_class = type(model)
+        indexer = self.indexers.get(model_class)
+
+        if indexer is not None:
+            indexer(model)
+
+        if self.evictor is None:
+            return
+
+        evicted = self.evictor.stored((model_class, hash(model)), model)
+
+        for evicted_class, key in evicted:
+            self.drop(evicted_class, key)
+
+    def handle_event(self,
+                     event: str,
+                     data: Dict[str, Any],
+                     converted: Any) -> None:
+        handler = self.event_handlers.get(event)
+
+        if handler is not None and isinstance(data, dict):
+            handler(data, converted)
+
+    def on_member_add(self, data: Dict[str, Any], member: Member) -> None:
+        if data.get('guild_id'):
+            self.add_member(Snowflake(data['guild_id']), member)
+
+    def on_member_update(self,
+                         data: Dict[str, Any],
+                         converted: Dict[str, Any]) -> None:
+        user = converted.get('user')
+        member = self.get_member(converted.get('guild_id'), user)
+
+        if user is None or member is None:
+            return
+
+        for attr in ('nick', 'roles', 'premium_since'):
+            if attr in data:
+                # a cleared nick is null, which shouldn't be 'None'
+                value = converted[attr] if data[attr] is not None else None
+                setattr(member, attr, value)
+
+        member.user = user
+
+    def on_member_remove(self,
+                         data: Dict[str, Any],
+                         converted: Dict[str, Any]) -> None:
+        user = converted.get('user')
+
+        if user is not None and converted.get('guild_id'):
+            self.remove_member(converted['guild_id'], user)
+
+    def on_members_chunk(self,
+                         data: Dict[str, Any],
+                         converted: Dict[str, Any]) -> None:
+        if not converted.get('guild_id'):
+            return
+
+        for member in converted.get('members', ()):
+            self.add_member(converted['guild_id'], member)
+
+    def on_channel_delete(self, data: Dict[str, Any], channel: Any) -> None:
+        self.remove(channel, Channel)
+
+    def on_guild_delete(self, data: Dict[str, Any], guild: Any) -> None:
+        # unavailable guilds are in an outage, not gone
+        if not data.get('unavailable'):
+            self.remove(guild, Guild)
+
+    def on_role_delete(self,
+                       data: Dict[str, Any],
+                       converted: Dict[str, Any]) -> None:
+        if converted.get('role_id'):
+            self.remove(converted['role_id'], Role)
+
+    def on_message_delete(self,
+                          data: Dict[str, Any],
+                          converted: Dict[str, Any]) -> None:
+        if converted.get('id'):
+            self.remove(converted['id'], Message)
+
+    def on_message_delete_bulk(self,
+                               data: Dict[str, Any],
+                               converted: Dict[str, Any]) -> None:
+        for message_id in converted.get('ids', ()):
+            self.remove(message_id, Message)
+
+    def index_channel(self, channel: Channel) -> None:
+        group = group_of(channel, 'guild_id')
+
+        if group is not None:
+            self.guild_channels.add(group, hash(channel))
+
+    def index_message(self, message: Message) -> None:
+        group = group_of(message, 'channel_id')
+
+        if group is not None:
+            self.channel_messages.add(group, hash(message))
+
+    def index_guild(self, guild: Guild) -> None:
+        # channels and members in a guild payload don't have a guild_id
+        for channel in guild.channels:
+            self.guild_channels.add(hash(guild), hash(channel))
+
+        for member in guild.members:
+            if member.user:
+                self.keep_member(hash(guild), hash(member.user), member)
@@ -0,0 +1,253 @@
+"""
+Eviction policies, so a cache doesn't grow forever.
+
+Caches tell an `Evictor` what they store, access and remove,
+and the evictor tells them what to throw away. See `DictCache`
+for how a `CacheABC` implementation uses it.
+"""
+import abc
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Type
+
+
+class EvictionPolicy(metaclass=abc.ABCMeta):
+    """Decides which keys of a single model type to evict."""
+    __slots__ = ()
+
+    @abc.abstractmethod
+    def stored(self, key: Hashable) -> List[Hashable]:
+        """
+        Records that `key` was added or updated, and
+        returns the keys which should be evicted now.
+        """
+
+    @abc.abstractmethod
+    def accessed(self, key: Hashable) -> bool:
+        """Records that `key` was read. Returns False if it's stale."""
+
+    @abc.abstractmethod
+    def removed(self, key: Hashable) -> None:
+        """Forgets about `key`, it's not in the cache anymore."""
+
+
+class NeverEvict(EvictionPolicy):
+    """Keep everything, like guilds, roles and channels."""
+    __slots__ = ()
+
+    def stored(self, key: Hashable) -> List[Hashable]:
+        return []
+
+    def accessed(self, key: Hashable) -> bool:
+        return True
+
+    def removed(self, key: Hashable) -> None:
+        pass
+
+
+class LRUPolicy(EvictionPolicy):
+    """Keep the `max_count` most recently used models."""
+    __slots__ = ('max_count', 'order')
+    max_count: int
+    order: 'OrderedDict[Hashable, None]'
+
+    def __init__(self, max_count: int):
+        self.max_count = max_count
+        self.order = OrderedDict()
+
+    def stored(self, key: Hashable) -> List[Hashable]:
+        self.order[key] = None
+        self.order.move_to_end(key)
+
+        evicted = []
+        while len(self.order) > self.max_count:
+            evicted.append(self.order.popitem(last=False)[0])
+
+        return evicted
+
+    def accessed(self, key: Hashable) -> bool:
+        if key in self.order:
+            self.order.move_to_end(key)
+
+        return True
+
+    def removed(self, key: Hashable) -> None:
+        self.order.pop(key, None)
+
+
+class TTLPolicy(EvictionPolicy):
+    """Keep models for `ttl` seconds after they were last updated."""
+    __slots__ = ('ttl', 'clock', 'deadlines')
+    ttl: float
+    clock: Callable[[], float]
+    deadlines: 'OrderedDict[Hashable, float]'
+
+    def __init__(self,
+                 ttl: float,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+        self.deadlines = OrderedDict()
+
+    def stored(self, key: Hashable) -> List[Hashable]:
+        now = self.clock()
+
+        self.deadlines[key] = now + self.ttl
+        self.deadlines.move_to_end(key)
+
+        # deadlines are in insertion order, so the expired ones are first
+        evicted = []
+        for old_key, deadline in self.deadlines.items():
+            if deadline > now:
+                break
+            evicted.append(old_key)
+
+        for old_key in evicted:
+            del self.deadlines[old_key]
+
+        return evicted
+
+    def accessed(self, key: Hashable) -> bool:
+        deadline = self.deadlines.get(key)
+        return deadline is None or deadline > self.clock()
+
+    def removed(self, key: Hashable) -> None:
+        self.deadlines.pop(key, None)
+
+
+def model_size(model: Any) -> int:
+    """A rough, shallow estimate of how many bytes `model` takes up."""
+    size = sys.getsizeof(model)
+
+    for klass in type(model).__mro__:
+        slots = vars(klass).get('__slots__', ())
+        if isinstance(slots, str):
+            slots = (slots,)
+
+        for slot in slots:
+            try:
+                size += sys.getsizeof(object.__getattribute__(model, slot))
+            except AttributeError:
+                pass
+
+    return size
+
+
+class Evictor:
+    """
+    Routes every model type to its `EvictionPolicy`, and optionally
+    keeps the total (estimated) size of the cache under `memory_budget`
+    bytes by evicting the least recently used evictable models.
+
+    `DictCache` stores members under `(Member, (guild id, user id))`,
+    so they count towards the budget, and are only evicted by it if
+    `Member` has a policy other than `NeverEvict`.
+    """
+    __slots__ = ('policies', 'default', 'memory_budget', 'sizer',
+                 'owners', 'sizes', 'total_size', 'recency')
+    policies: Dict[Type[Any], EvictionPolicy]
+    default: EvictionPolicy
+    memory_budget: Optional[int]
+    sizer: Callable[[Any], int]
+    #: which policy is looking after which key.
+    owners: Dict[Hashable, EvictionPolicy]
+    sizes: Dict[Hashable, int]
+    total_size: int
+    #: every key which isn't `NeverEvict`-ed, least recently used first.
+    recency: 'OrderedDict[Hashable, None]'
+
+    def __init__(self,
+                 policies: Optional[Dict[Type[Any], EvictionPolicy]] = None,
+                 default: Optional[EvictionPolicy] = None,
+                 memory_budget: Optional[int] = None,
+                 sizer: Callable[[Any], int] = model_size):
+        self.policies = policies or {}
+        self.default = default or NeverEvict()
+        self.memory_budget = memory_budget
+        self.sizer = sizer
+        self.owners = {}
+        self.sizes = {}
+        self.total_size = 0
+        self.recency = OrderedDict()
+
+    def policy_for(self, model_class: Type[Any]) -> EvictionPolicy:
+        for klass in model_class.__mro__:
+            if klass in self.policies:
+                return self.policies[klass]
+
+        return self.default
+
+    def stored(self, key: Hashable, model: Any) -> List[Hashable]:
+        """
+        Records that `model` was stored under `key`, and
+        returns the keys which the cache should drop.
+        """
+        policy = self.owners.get(key)
+
+        if policy is None:
+            policy = self.policy_for(type(model))
+            self.owners[key] = policy
+
+        evicted = policy.stored(key)
+
+        if not isinstance(policy, NeverEvict):
+            self.recency[key] = None
+            self.recency.move_to_end(key)
+
+        if self.memory_budget is not None:
+            size = self.sizer(model)
+            self.total_size += size - self.sizes.get(key, 0)
+            self.sizes[key] = size
+
+        for old_key in evicted:
+            self.forget(old_key)
+
+        if self.memory_budget is not None:
+            while self.total_size > self.memory_budget and self.recency:
+                old_key = next(iter(self.recency))
+
+                if old_key == key:
+                    # nothing older is left, and the cache is about
+                    # to hand out what was just stored
+                    break
+
+                self.owners[old_key].removed(old_key)
+                self.forget(old_key)
+                evicted.append(old_key)
+
+        return evicted
+
+    def accessed(self, key: Hashable) -> bool:
+        """
+        Records that `key` was read. If this returns False the model
+        is stale, and the cache should drop it and act like a miss.
+        """
+        policy = self.owners.get(key)
+
+        if policy is None:
+            return True
+
+        if not policy.accessed(key):
+            policy.removed(key)
+            self.forget(key)
+            return False
+
+        if key in self.recency:
+            self.recency.move_to_end(key)
+
+        return True
+
+    def removed(self, key: Hashable) -> None:
+        """Records that the cache dropped `key` by itself."""
+        policy = self.owners.get(key)
+
+        if policy is not None:
+            policy.removed(key)
+
+        self.forget(key)
+
+    def forget(self, key: Hashable) -> None:
+        self.owners.pop(key, None)
+        self.recency.pop(key, None)
+        self.total_size -= self.sizes.pop(key, 0)
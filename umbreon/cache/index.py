@@ -0,0 +1,48 @@
+from typing import Any, Dict, Hashable, Optional
+
+
+class SecondaryIndex:
+    """
+    Groups the keys of cached models under another key, like
+    all the channel ids of a guild id. Groups keep insertion order,
+    so the most recently added keys are last.
+    """
+    __slots__ = ('groups',)
+    groups: Dict[Hashable, Dict[Hashable, Any]]
+
+    def __init__(self):
+        self.groups = {}
+
+    def add(self, group: Hashable, key: Hashable, value: Any = None) -> None:
+        members = self.groups.get(group)
+
+        if members is None:
+            members = self.groups[group] = {}
+
+        members[key] = value
+
+    def discard(self, group: Hashable, key: Hashable) -> None:
+        members = self.groups.get(group)
+
+        if members is None:
+            return
+
+        members.pop(key, None)
+
+        if not members:
+            del self.groups[group]
+
+    def drop(self, group: Hashable) -> None:
+        self.groups.pop(group, None)
+
+    def get(self, group: Hashable) -> Dict[Hashable, Any]:
+        return self.groups.get(group, {})
+
+    def __len__(self) -> int:
+        return len(self.groups)
+
+
+def group_of(model: Any, attribute: str) -> Optional[int]:
+    """The value of `attribute` on `model` if it makes a usable group."""
+    value = getattr(model, attribute, None)
+    return value if isinstance(value, int) and value else None
@@ -0,0 +1,521 @@
+"""
+A cache which lives in another process, so several workers
+can share one copy of every guild, channel, user...
+
+Start a server with `python -m umbreon.cache.remote_cache <address>`,
+where the address is a unix socket path or `host:port`, then use
+`Client(token, cache=RemoteCache(SocketTransport(address)))`.
+`LocalTransport` runs the same server in-process, for tests.
+
+Every request is a u8 opcode and a u32 body length, then the body.
+Models travel as records: an i64 key, a u16 class name length,
+a u32 payload length, the class name and the JSON payload (see
+`umbreon.cache.snapshot.as_payload`). GET and REMOVE send records
+without a payload, where an empty class name means any class, since
+ids aren't unique across classes. Only GET and ALL get a reply, a u32
+length followed by records.
+
+Puts and removals are buffered, and only sent by `flush`, which the
+async methods run in a worker thread and reads run first. So the sync
+`pass_through`s, which models call while they're converted, never
+wait on the network. Reads do: on the trio thread, use the async ones.
+"""
+import json
+import socket
+import socketserver
+import struct
+import sys
+import threading
+from enum import IntEnum
+from functools import partial
+from typing import (Any, Dict, Iterable, Iterator, List, Optional, Tuple,
+                    Type, TypeVar, Union, TYPE_CHECKING)
+
+import trio
+
+from .cache_abc import CacheABC
+from .changes import ChangeSet
+from .snapshot import as_payload, build, model_classes
+from ..structures.base import DataModelMixin
+from ..structures.snowflake import SnowflakeDependent
+
+if TYPE_CHECKING:
+    from .. import Client
+
+T = TypeVar('T')
+
+FRAME = struct.Struct('<BI')
+LENGTH = struct.Struct('<I')
+RECORD = struct.Struct('<qHI')
+
+ADDRESS_TYPE = Union[str, Tuple[str, int]]
+
+
+class Operation(IntEnum):
+    PUT = 1
+    GET = 2
+    REMOVE = 3
+    ALL = 4
+
+
+class RemoteCacheError(Exception):
+    pass
+
+
+def pack_records(records: Iterable[Tuple[int, str, bytes]]) -> bytes:
+    chunks = []
+
+    for key, name, payload in records:
+        encoded_name = name.encode('utf-8')
+        chunks.append(RECORD.pack(key, len(encoded_name), len(payload)))
+        chunks.append(encoded_name)
+        chunks.append(payload)
+
+    return b''.join(chunks)
+
+
+def unpack_records(body: bytes) -> Iterator[Tuple[int, str, bytes]]:
+    view = memoryview(body)
+    offset = 0
+
+    while offset < len(view):
+        key, name_length, payload_length = RECORD.unpack_from(view, offset)
+        offset += RECORD.size
+
+        name = bytes(view[offset:offset + name_length]).decode('utf-8')
+        offset += name_length
+
+        yield key, name, bytes(view[offset:offset + payload_length])
+        offset += payload_length
+
+
+def frame(operation: Operation, body: bytes = b'') -> bytes:
+    return FRAME.pack(operation, len(body)) + body
+
+
+class CacheServer:
+    """
+    The shared state: payloads by key, then by class name. New payloads
+    are merged into the stored ones the same way `DictCache` merges
+    models, where every field that was sent replaces what's there.
+    """
+    __slots__ = ('payloads', 'lock')
+    payloads: Dict[int, Dict[str, Dict[str, Any]]]
+    lock: threading.Lock
+
+    def __init__(self):
+        self.payloads = {}
+        self.lock = threading.Lock()
+
+    def handle(self, request: bytes) -> Optional[bytes]:
+        """Answers a single request frame, if it needs an answer."""
+        operation, length = FRAME.unpack_from(request)
+        body = request[FRAME.size:FRAME.size + length]
+
+        with self.lock:
+            if operation == Operation.PUT:
+                for key, name, payload in unpack_records(body):
+                    self.put(key, name, json.loads(payload))
+                return None
+            elif operation == Operation.REMOVE:
+                for key, name, _ in unpack_records(body):
+                    for stored in self.names(key, name):
+                        self.remove(key, stored)
+                return None
+            elif operation == Operation.GET:
+                found = [(key, stored)
+                         for key, name, _ in unpack_records(body)
+                         for stored in self.names(key, name)]
+            elif operation == Operation.ALL:
+                found = [(key, name)
+                         for key, by_name in self.payloads.items()
+                         for name in by_name]
+            else:
+                raise RemoteCacheError(f'Unknown operation {operation}.')
+
+            reply = pack_records(
+                (key, name,
+                 json.dumps(self.payloads[key][name],
+                            separators=(',', ':')).encode('utf-8'))
+                for key, name in found
+            )
+
+        return LENGTH.pack(len(reply)) + reply
+
+    def names(self, key: int, name: str) -> List[str]:
+        """The classes stored under `key` that `name` asks for."""
+        by_name = self.payloads.get(key, {})
+
+        if not name:
+            return list(by_name)
+
+        return [name] if name in by_name else []
+
+    def put(self, key: int, name: str, payload: Dict[str, Any]) -> None:
+        by_name = self.payloads.setdefault(key, {})
+        stored = by_name.get(name)
+
+        if stored is None:
+            by_name[name] = payload
+        else:
+            # payloads only have the fields that were sent, even falsy ones
+            stored.update(payload)
+
+    def remove(self, key: int, name: str) -> None:
+        by_name = self.payloads.get(key, {})
+        by_name.pop(name, None)
+
+        if not by_name:
+            self.payloads.pop(key, None)
+
+
+class LocalTransport:
+    """Talks to a `CacheServer` in this process, a stand-in for tests."""
+    __slots__ = ('server',)
+    server: CacheServer
+
+    def __init__(self, server: Optional[CacheServer] = None):
+        self.server = server or CacheServer()
+
+    def send(self, request: bytes) -> None:
+        self.server.handle(request)
+
+    def request(self, request: bytes) -> bytes:
+        reply = self.server.handle(request) or LENGTH.pack(0)
+        return reply[LENGTH.size:]
+
+
+class SocketTransport:
+    """Talks to a server started with `serve`, over a blocking socket."""
+    __slots__ = ('socket',)
+    socket: socket.socket
+
+    def __init__(self, address: ADDRESS_TYPE):
+        if isinstance(address, str):
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.socket.setsockopt(socket.IPPROTO_TCP,
+                                   socket.TCP_NODELAY, 1)
+
+        self.socket.connect(address)
+
+    def send(self, request: bytes) -> None:
+        self.socket.sendall(request)
+
+    def request(self, request: bytes) -> bytes:
+        self.socket.sendall(request)
+        length, = LENGTH.unpack(receive_exactly(self.socket, LENGTH.size))
+        return receive_exactly(self.socket, length)
+
+    def close(self) -> None:
+        self.socket.close()
+
+
+def receive_exactly(connection: socket.socket, size: int) -> bytes:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+
+    while received < size:
+        count = connection.recv_into(view[received:])
+
+        if not count:
+            raise RemoteCacheError('The cache server hung up.')
+
+        received += count
+
+    return bytes(buffer)
+
+
+class RemoteCache(CacheABC):
+    """
+    A `CacheABC` backed by a `CacheServer`. It doesn't merge models
+    locally: `pass_through` queues the model to be sent and returns
+    it as is, and `get` builds fresh models from the server's data.
+    """
+    __slots__ = ('transport', 'client', 'classes', 'lock', 'io_lock',
+                 'building', 'frames', 'pending', 'pending_size',
+                 'flush_size')
+    transport: Union[LocalTransport, SocketTransport]
+    #: guards the buffers, and is never held while waiting on the server
+    lock: threading.Lock
+    #: one request at a time on the transport, the async methods
+    #: use it from worker threads
+    io_lock: threading.RLock
+    #: set while models read from the server are built, in that thread,
+    #: so their nested models aren't sent right back
+    building: threading.local
+    client: Optional['Client']
+    classes: Dict[str, Type[DataModelMixin]]
+    #: requests waiting to be sent, in order, before `pending`
+    frames: List[bytes]
+    #: records waiting to be sent in the next PUT
+    pending: List[Tuple[int, str, bytes]]
+    pending_size: int
+    flush_size: int
+
+    def __init__(self,
+                 transport: Union[LocalTransport, SocketTransport],
+                 flush_size: int = 64 * 1024):
+        self.transport = transport
+        self.client = None
+        self.classes = {}
+        self.lock = threading.Lock()
+        self.io_lock = threading.RLock()
+        self.building = threading.local()
+        self.frames = []
+        self.pending = []
+        self.pending_size = 0
+        self.flush_size = flush_size
+
+    def attach(self, client: 'Client') -> None:
+        self.client = client
+
+    def pass_through(self,
+                     model: T,
+                     changes: Optional[ChangeSet] = None) -> T:
+        if not isinstance(model, SnowflakeDependent) or self.is_building:
+            return model
+
+        if changes is not None:
+            self.diff(model, changes)
+
+        self.queue(model)
+
+        return model
+
+    async def pass_through_async(self,
+                                 model: T,
+                                 changes: Optional[ChangeSet] = None) -> T:
+        if changes is not None and isinstance(model, SnowflakeDependent):
+            # diffing reads from the server, which blocks
+            await trio.to_thread.run_sync(self.diff, model, changes)
+
+        self.pass_through(model)
+
+        if self.pending_size >= self.flush_size:
+            await trio.to_thread.run_sync(self.flush)
+
+        return model
+
+    def pass_through_many(self, models: Iterable[T]) -> List[T]:
+        models = list(models)
+
+        if self.is_building:
+            return models
+
+        for model in models:
+            if isinstance(model, SnowflakeDependent):
+                self.queue(model)
+
+        return models
+
+    async def pass_through_many_async(self,
+                                      models: Iterable[T]) -> List[T]:
+        models = self.pass_through_many(models)
+
+        await trio.to_thread.run_sync(self.flush)
+
+        return models
+
+    @property
+    def is_building(self) -> bool:
+        return getattr(self.building, 'active', False)
+
+    def queue(self, model: Any) -> None:
+        payload = json.dumps(
+            as_payload(model),
+            separators=(',', ':')
+        ).encode('utf-8')
+
+        with self.lock:
+            self.pending.append((hash(model), type(model).__name__, payload))
+            self.pending_size += len(payload)
+
+    def names_of(self, model_type: Optional[Type[Any]]) -> List[str]:
+        """
+        The class names `model_type` can be stored under, its own first,
+        or the empty name which stands for any class.
+        """
+        if model_type is None:
+            return ['']
+
+        if not self.classes:
+            self.classes = model_classes()
+
+        # maybe a subclass, like MentionedUser for User
+        return [model_type.__name__] + [
+            name for name, model_class in self.classes.items()
+            if model_class is not model_type
+            and issubclass(model_class, model_type)
+        ]
+
+    def diff(self, model: Any, changes: ChangeSet) -> None:
+        stored = self.get(model, type(model))
+
+        if stored is None:
+            changes.created = True
+            return
+
+        for slot in model.__slots__:
+            new_data = getattr(model, slot)
+
+            if not new_data and not model.loaded(slot):
+                continue  # not in the payload
+
+            old_data = getattr(stored, slot)
+
+            if old_data != new_data:
+                changes.record(slot, old_data, new_data)
+
+    def flush(self) -> None:
+        """Sends every queued put and removal to the server."""
+        with self.io_lock:
+            with self.lock:
+                frames = self.frames
+                self.frames = []
+                self.take_pending(frames)
+
+            for request in frames:
+                self.transport.send(request)
+
+    def take_pending(self, frames: List[bytes]) -> None:
+        """Moves the queued puts into `frames`, under `lock`."""
+        if not self.pending:
+            return
+
+        frames.append(frame(Operation.PUT, pack_records(self.pending)))
+        self.pending = []
+        self.pending_size = 0
+
+    def get(self,
+            model_id: Any,
+            model_type: Optional[Type[T]] = None) -> Any:
+        """
+        Without `model_type`, the first model of any class with that id,
+        which is ambiguous for ids like a guild's and its @everyone role.
+        """
+        return self.get_many([model_id], model_type)[0]
+
+    async def get_async(self,
+                        model_id: Any,
+                        model_type: Optional[Type[T]] = None) -> Any:
+        return (await self.get_many_async([model_id], model_type))[0]
+
+    def get_many(self,
+                 model_ids: Iterable[Any],
+                 model_type: Optional[Type[T]] = None) -> List[Any]:
+        """Fetches several models in a single round trip."""
+        keys = [hash(model_id) for model_id in model_ids]
+        names = self.names_of(model_type)
+
+        with self.io_lock:
+            self.flush()
+            reply = self.transport.request(frame(
+                Operation.GET,
+                pack_records((key, name, b'')
+                             for key in keys for name in names)
+            ))
+
+        found: Dict[int, Any] = {}
+
+        for key, model in self.build_all(reply):
+            found.setdefault(key, model)
+
+        return [found.get(key) for key in keys]
+
+    async def get_many_async(
+        self,
+        model_ids: Iterable[Any],
+        model_type: Optional[Type[T]] = None
+    ) -> List[Any]:
+        return await trio.to_thread.run_sync(
+            partial(self.get_many, list(model_ids), model_type)
+        )
+
+    def remove(self,
+               model_id: Any,
+               model_type: Optional[Type[Any]] = None) -> None:
+        key = hash(model_id)
+        records = [(key, name, b'') for name in self.names_of(model_type)]
+
+        with self.lock:
+            # after the puts queued so far, which it may undo
+            self.take_pending(self.frames)
+            self.frames.append(frame(Operation.REMOVE, pack_records(records)))
+
+    def models(self) -> List[Any]:
+        with self.io_lock:
+            self.flush()
+            reply = self.transport.request(frame(Operation.ALL))
+
+        return [model for _, model in self.build_all(reply)]
+
+    def build_all(self, body: bytes) -> Iterator[Tuple[int, Any]]:
+        if self.client is None:
+            raise RemoteCacheError(
+                'RemoteCache needs a Client to build models, '
+                'pass it as `Client(token, cache=...)`.'
+            )
+
+        if not self.classes:
+            self.classes = model_classes()
+
+        for key, name, payload in unpack_records(body):
+            self.building.active = True
+
+            try:
+                model = build(self.client, self.classes, name,
+                              json.loads(payload))
+            finally:
+                self.building.active = False
+
+            if model is not None:
+                yield key, model
+
+
+class RequestHandler(socketserver.BaseRequestHandler):
+    server: Any
+
+    def handle(self) -> None:
+        while True:
+            try:
+                header = receive_exactly(self.request, FRAME.size)
+            except RemoteCacheError:
+                return  # the worker hung up
+
+            _, length = FRAME.unpack(header)
+            request = header + receive_exactly(self.request, length)
+            reply = self.server.cache.handle(request)
+
+            if reply is not None:
+                self.request.sendall(reply)
+
+
+def serve(address: ADDRESS_TYPE,
+          cache: Optional[CacheServer] = None) -> None:
+    """Runs a cache server at `address` until interrupted."""
+    server: Any
+
+    if isinstance(address, str):
+        server = socketserver.ThreadingUnixStreamServer(
+            address, RequestHandler
+        )
+    else:
+        server = socketserver.ThreadingTCPServer(address, RequestHandler)
+
+    server.daemon_threads = True
+    server.cache = cache or CacheServer()
+
+    with server:
+        server.serve_forever()
+
+
+def parse_address(address: str) -> ADDRESS_TYPE:
+    host, _, port = address.rpartition(':')
+    return (host, int(port)) if port.isdigit() and host else address
+
+
+if __name__ == '__main__':
+    serve(parse_address(sys.argv[1]))
@@ -0,0 +1,195 @@
+"""
+Checkpoints of cached models, for warm restarts.
+
+A snapshot stores every model as the payload Discord would have sent
+for it, so loading one goes through the normal `DataModelMixin`
+decoding (and is lazy if the model class is). Slots a model gained
+since the snapshot was written are simply missing, slots it lost
+are skipped.
+
+The layout is:
+    MAGIC, then a little-endian u16 version and u32 header length,
+    then the JSON header `{"models": [class names...], "count": n}`,
+    then `count` records of a u16 index into `models`,
+    a u32 length, and the JSON payload.
+"""
+import enum
+import json
+import mmap
+import os
+import struct
+from datetime import datetime
+from typing import (Any, Dict, Iterable, Iterator, List, Optional, Tuple,
+                    Type, TYPE_CHECKING)
+
+from ..structures.base import DataModelMixin
+
+if TYPE_CHECKING:
+    from .. import Client
+
+MAGIC = b'UMBRSNAP'
+VERSION = 1
+HEADER = struct.Struct('<HI')
+RECORD = struct.Struct('<HI')
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def model_classes() -> Dict[str, Type[DataModelMixin]]:
+    """Every `DataModelMixin` subclass, by name."""
+    classes: Dict[str, Type[DataModelMixin]] = {}
+    queue = [DataModelMixin]
+
+    while queue:
+        for subclass in queue.pop().__subclasses__():
+            classes.setdefault(subclass.__name__, subclass)
+            queue.append(subclass)
+
+    return classes
+
+
+def as_payload(value: Any) -> Any:
+    """Turns a converted value back into what Discord would send."""
+    if isinstance(value, DataModelMixin):
+        payload = dict(value.raw or {})
+        # attributes under another name in Discord's payloads
+        renamed = {attr: key for key, attr in value.mapping.items()}
+
+        for attr in value.field_keys:
+            if value.loaded(attr):
+                key = renamed.get(attr, attr)
+                payload[key] = as_payload(getattr(value, attr))
+
+        return payload
+    elif isinstance(value, (list, tuple)):
+        return [as_payload(element) for element in value]
+    elif isinstance(value, datetime):
+        return value.isoformat()
+    elif isinstance(value, enum.Enum):
+        return value.value
+    elif isinstance(value, int) and not isinstance(value, bool):
+        return int(value)  # Snowflakes, flags...
+
+    return value
+
+
+def dump(models: Iterable[Any], path: str) -> int:
+    """
+    Writes `models` to a snapshot at `path`, and returns how many were
+    written. The file is replaced atomically, so a crash midway through
+    leaves the previous snapshot intact.
+    """
+    names: List[str] = []
+    indexes: Dict[str, int] = {}
+    records: List[bytes] = []
+
+    for model in models:
+        if not isinstance(model, DataModelMixin):
+            continue
+
+        name = type(model).__name__
+        if name not in indexes:
+            indexes[name] = len(names)
+            names.append(name)
+
+        payload = json.dumps(
+            as_payload(model),
+            separators=(',', ':')
+        ).encode('utf-8')
+
+        records.append(RECORD.pack(indexes[name], len(payload)) + payload)
+
+    header = json.dumps({'models': names, 'count': len(records)}).encode()
+    temporary = f'{path}.tmp'
+
+    with open(temporary, 'wb') as file:
+        file.write(MAGIC)
+        file.write(HEADER.pack(VERSION, len(header)))
+        file.write(header)
+        file.writelines(records)
+
+    os.replace(temporary, path)
+
+    return len(records)
+
+
+def read(path: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yields the class name and payload of every record at `path`."""
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            raise SnapshotError(f'{path} is empty.')
+
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            view = memoryview(data)
+
+            try:
+                yield from read_view(view)
+            finally:
+                view.release()
+
+
+def read_view(view: memoryview) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    if bytes(view[:len(MAGIC)]) != MAGIC:
+        raise SnapshotError('This is not an umbreon snapshot.')
+
+    offset = len(MAGIC)
+    version, header_length = HEADER.unpack_from(view, offset)
+    offset += HEADER.size
+
+    if version > VERSION:
+        raise SnapshotError(
+            f'Snapshot version {version} is newer than {VERSION}.'
+        )
+
+    header = json.loads(bytes(view[offset:offset + header_length]))
+    offset += header_length
+    names = header['models']
+
+    for _ in range(header['count']):
+        index, length = RECORD.unpack_from(view, offset)
+        offset += RECORD.size
+
+        yield names[index], json.loads(bytes(view[offset:offset + length]))
+        offset += length
+
+
+def build(client: 'Client',
+          classes: Dict[str, Type[DataModelMixin]],
+          name: str,
+          payload: Dict[str, Any]) -> Optional[DataModelMixin]:
+    """
+    Rebuilds a model from `as_payload`'s output, or returns
+    None if its class doesn't exist anymore.
+    """
+    model_class = classes.get(name)
+
+    if model_class is None:
+        return None
+
+    field_plan = model_class.field_plan
+    payload = {k: v for k, v in payload.items() if k in field_plan}
+
+    return model_class(client, payload)
+
+
+def load(client: 'Client', path: str) -> int:
+    """
+    Feeds every model of the snapshot at `path` through `client.cache`,
+    and returns how many were loaded. Records of model classes which no
+    longer exist are skipped.
+    """
+    classes = model_classes()
+    loaded = 0
+
+    for name, payload in read(path):
+        model = build(client, classes, name, payload)
+
+        if model is None:
+            continue
+
+        client.cache.pass_through(model)
+        loaded += 1
+
+    return loaded
@@ -1,70 +1,337 @@
 """
 A 'Client' class that ties everything together
 """
+from .gateway.conversion_table import intents_for
 from .gateway.gateway_connection import GatewayConnection
+from .gateway.heartbeat import LatencyHistogram
+from .gateway.intents import Intents
+from .gateway.shard_manager import ShardManager
 from .http_base.http_client import HTTPClient
+from .http_base.route import RouteData
+from .http_base.routing_table import RoutingTable
+from .cache.cache_abc import CacheABC
+from .cache.changes import ChangeSet
 from .cache.dict_cache import DictCache
-from typing import Optional, List, Callable, Coroutine, Dict, Any
+from .cache import snapshot
+from .structures import Channel, Guild, Member, User
+from typing import (Optional, List, Callable, Coroutine, Dict, Any,
+                    Hashable, Iterable, Type, TypeVar, TYPE_CHECKING)
 
-from trio import Nursery, open_nursery
+from math import inf
+from trio import Nursery, current_time, open_nursery
+
+if TYPE_CHECKING:
+    from .gateway.cluster import ClusterWorker
 
 DISPATCH_FUNCTION_TYPE = Callable[
     ['Client', Dict[str, Any]],
     Coroutine[Any, Any, Any]
 ]
+DIFF_DISPATCH_FUNCTION_TYPE = Callable[
+    ['Client', Any, Optional[ChangeSet]],
+    Coroutine[Any, Any, Any]
+]
+
+M = TypeVar('M')
 
 
 class Client:
     http: HTTPClient
     gate: Optional[GatewayConnection]
+    shards: Optional[ShardManager]
+    #: set in the worker processes of `umbreon.gateway.cluster`
+    cluster: Optional['ClusterWorker']
     dispatchers: Dict[str, List[DISPATCH_FUNCTION_TYPE]]
-    cache: DictCache
+    diff_dispatchers: Dict[str, List[DIFF_DISPATCH_FUNCTION_TYPE]]
+    cache: CacheABC
+    #: how long, in seconds, a fetched model is served from the cache
+    freshness: float
+    #: when models were last fetched, on the trio clock, by their
+    #: class and id. Only there while they're stale or fresh from it.
+    fetched: Dict[Hashable, float]
+    #: the longest `freshness` asked for, past which fetches are dropped
+    longest_freshness: float
+    #: when expired fetches are next dropped, on the trio clock
+    next_expiry: float
     _token: str
 
-    def __init__(self, token: str, **kwargs):
+    def __init__(self,
+                 token: str,
+                 cache: Optional[CacheABC] = None,
+                 freshness: float = 60,
+                 **kwargs):
         self._token = token
+        self.freshness = freshness
+        self.fetched = {}
+        self.longest_freshness = freshness
+        self.next_expiry = -inf
         self.http = HTTPClient(self._token, **kwargs)
         self.dispatchers = {}
-        self.cache = DictCache()
+        self.diff_dispatchers = {}
+        self.cache = cache if cache is not None else DictCache()
+        self.cache.attach(self)
+        self.gate = None
+        self.shards = None
+        self.cluster = None
+
+    def inferred_intents(self) -> Intents:
+        """What `start_gateway` asks for when it's not passed `intents`."""
+        intents = intents_for([*self.dispatchers, *self.diff_dispatchers])
+        cached = intents_for(self.cache.cached_events)
+
+        return intents | (cached & Intents.UNPRIVILEGED)
 
     async def start_gateway(
             self,
-            nursery: Optional[Nursery] = None, **kwargs
+            nursery: Optional[Nursery] = None,
+            shard_count: Optional[int] = None,
+            shard_ids: Optional[Iterable[int]] = None,
+            intents: Optional[Intents] = None,
+            **kwargs
     ) -> None:
+        """
+        Connects to the gateway. Pass `shard_count` to run `shard_ids`
+        (by default all of them) through a `ShardManager`, or 0 to use
+        as many shards as Discord recommends.
+
+        Without `intents`, the events which have handlers (see
+        `on_dispatch`) or are in the cache's `cached_events` are asked
+        for. Privileged intents are only inferred from handlers, since
+        they have to be enabled first, so pass them for the cache.
+        Other keyword arguments, like `large_threshold`, go to every
+        `GatewayConnection`.
+        """
         # create an internal nursery if none is passed in.
-        if nursery is not None:
+        if nursery is None:
+            async with open_nursery() as internal_nursery:
+                return await self.start_gateway(
+                    internal_nursery,
+                    shard_count,
+                    shard_ids,
+                    intents,
+                    **kwargs
+                )
+
+        if intents is None:
+            intents = self.inferred_intents()
+
+        kwargs['intents'] = intents
+
+        if shard_count is None:
             self.gate = GatewayConnection(
                 self._token,
                 nursery,
                 self,
                 self.dispatchers,
+                diff_dispatchers=self.diff_dispatchers,
                 **kwargs
             )
 
             return await self.gate.connect()
+
+        if shard_count == 0:
+            self.shards = await ShardManager.recommended(
+                self, nursery, **kwargs
+            )
         else:
-            async with open_nursery() as internal_nursery:
-                self.gate = GatewayConnection(
-                    self._token,
-                    internal_nursery,
-                    self,
-                    self.dispatchers
-                )
+            self.shards = ShardManager(
+                self, nursery, shard_count, shard_ids, **kwargs
+            )
+
+        return await self.shards.start()
+
+    def shard_for(self, guild_id: int) -> int:
+        """Which shard `guild_id`'s events arrive on."""
+        return self.shards.shard_for(guild_id) if self.shards else 0
+
+    @property
+    def latencies(self) -> Dict[int, Optional[float]]:
+        """Heartbeat latency by shard id, in seconds."""
+        if self.shards is not None:
+            return self.shards.latencies
+
+        return {0: self.gate.state.latency if self.gate else None}
+
+    @property
+    def latency_histograms(self) -> Dict[int, LatencyHistogram]:
+        """
+        Rolling heartbeat latencies by shard id, with `p50` and `p99`
+        to catch slow shards before Discord drops them.
+        """
+        if self.shards is not None:
+            return self.shards.histograms
+
+        return {0: self.gate.latencies} if self.gate else {}
+
+    def is_fresh(self, key: Hashable, freshness: Optional[float]) -> bool:
+        """
+        Whether the cached model under `key` can be served. Models the
+        gateway put there are kept up to date by it, so only fetched
+        ones expire, after `freshness` (or `self.freshness`) seconds.
+        """
+        fetched = self.fetched.get(key)
+
+        if fetched is None:
+            return True
+
+        if freshness is None:
+            freshness = self.freshness
+
+        return current_time() - fetched < freshness
 
-                return await self.gate.connect()
+    def refreshed(self, model: Any) -> None:
+        """Called when the gateway sends `model`, which is fresh again."""
+        if self.fetched:
+            self.fetched.pop((type(model), hash(model)), None)
+
+    def expire_if_due(self, freshness: Optional[float]) -> None:
+        """Lazily runs `expire`, keeping any fetch `freshness` asks for."""
+        if freshness is not None and freshness > self.longest_freshness:
+            self.longest_freshness = freshness
+
+        now = current_time()
+
+        if now >= self.next_expiry:
+            self.expire(now)
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """
+        Drops fetched models which are too old for any `freshness` from
+        the cache, so they're fetched again, and returns how many.
+        """
+        if now is None:
+            now = current_time()
+
+        horizon = self.longest_freshness
+        self.next_expiry = now + horizon
+        expired = [
+            key for key, fetched in self.fetched.items()
+            if now - fetched >= horizon
+        ]
+
+        for key in expired:
+            del self.fetched[key]
+
+            if key[0] is Member:
+                self.cache.remove_member(key[1], key[2])
+            else:
+                self.cache.remove(key[1], key[0])
+
+        return len(expired)
+
+    async def fetch(self,
+                    model_type: Type[M],
+                    route: RouteData,
+                    model_id: Any,
+                    freshness: Optional[float] = None,
+                    **kwargs: Any) -> Optional[M]:
+        """
+        The cached `model_type` with `model_id`, or else the one at
+        `route` which is then cached. None if Discord doesn't have it.
+        """
+        self.expire_if_due(freshness)
+
+        key = (model_type, hash(model_id))
+        cached = await self.cache.get_async(model_id, model_type)
+
+        if cached is None:
+            self.fetched.pop(key, None)  # evicted since
+        elif self.is_fresh(key, freshness):
+            return cached
+
+        response = await self.http.request(route, **kwargs)
+
+        if response.status_code != 200:
+            return None
+
+        model = model_type(self, response.json())  # type: ignore
+        self.fetched[key] = current_time()
+
+        return self.cache.pass_through(model)
+
+    async def fetch_channel(self,
+                            channel_id: int,
+                            freshness: Optional[float] = None
+                            ) -> Optional[Channel]:
+        return await self.fetch(Channel, RoutingTable.get_channel,
+                                channel_id, freshness,
+                                channel_id=channel_id)
+
+    async def fetch_user(self,
+                         user_id: int,
+                         freshness: Optional[float] = None
+                         ) -> Optional[User]:
+        return await self.fetch(User, RoutingTable.get_user,
+                                user_id, freshness,
+                                user_id=user_id)
+
+    async def fetch_guild(self,
+                          guild_id: int,
+                          freshness: Optional[float] = None
+                          ) -> Optional[Guild]:
+        return await self.fetch(Guild, RoutingTable.get_guild,
+                                guild_id, freshness,
+                                guild_id=guild_id)
+
+    async def fetch_member(self,
+                           guild_id: int,
+                           user_id: int,
+                           freshness: Optional[float] = None
+                           ) -> Optional[Member]:
+        self.expire_if_due(freshness)
+
+        key = (Member, hash(guild_id), hash(user_id))
+        cached = self.cache.get_member(guild_id, user_id)
+
+        if cached is None:
+            self.fetched.pop(key, None)
+        elif self.is_fresh(key, freshness):
+            return cached
+
+        response = await self.http.request(
+            RoutingTable.get_guild_member,
+            guild_id=guild_id,
+            user_id=user_id
+        )
+
+        if response.status_code != 200:
+            return None
+
+        member = Member(self, response.json())
+        self.fetched[key] = current_time()
+
+        return self.cache.add_member(guild_id, member)
+
+    def save_snapshot(self, path: str) -> int:
+        """Checkpoints the cache to `path`, see `umbreon.cache.snapshot`."""
+        return snapshot.dump(self.cache.models(), path)
+
+    def load_snapshot(self, path: str) -> int:
+        """
+        Warms the cache up from a snapshot at `path`. Call this before
+        `start_gateway`, and the gateway will update whatever is stale.
+        """
+        return snapshot.load(self, path)
 
     def on_dispatch(self,
-                    dispatch_type: str
-                    ) -> Callable[[DISPATCH_FUNCTION_TYPE],
-                                  DISPATCH_FUNCTION_TYPE]:
+                    dispatch_type: str,
+                    changes: bool = False
+                    ) -> Callable[[Any], Any]:
+        """
+        Registers a handler for `dispatch_type`. With `changes=True`, the
+        handler is called with a third argument: the `ChangeSet` of what
+        the event changed in the cache, or None if it isn't a model.
+        """
 
-        def decoration(function: DISPATCH_FUNCTION_TYPE
-                       ) -> DISPATCH_FUNCTION_TYPE:
+        def decoration(function: Any) -> Any:
+            registry: Dict[str, List[Any]] = (
+                self.diff_dispatchers if changes else self.dispatchers
+            )
 
-            if self.dispatchers.get(dispatch_type) is None:
-                self.dispatchers[dispatch_type] = []
+            if registry.get(dispatch_type) is None:
+                registry[dispatch_type] = []
 
-            self.dispatchers[dispatch_type].append(function)
+            registry[dispatch_type].append(function)
 
             return function
 
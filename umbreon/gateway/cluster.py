@@ -0,0 +1,500 @@
+"""
+Runs shards over several processes, to use more than one core.
+
+`run_cluster(factory, shard_count, processes)` starts a coordinator in
+this process, which spawns `processes` workers. Every worker builds its
+own client with `factory` (so it must be importable, like a function at
+the top of a module) and runs a contiguous range of the shards through
+a `ShardManager`. Workers IDENTIFY through the coordinator, so the
+identify concurrency window holds for the whole bot.
+
+Workers talk to each other through the coordinator:
+    `await client.cluster.query(name)` calls the `query_handler`
+    registered under `name` in every worker and returns their answers,
+    `await client.cluster.broadcast(event, data)` calls the `on_dispatch`
+    handlers of `event` in every worker.
+
+Messages are a u32 length followed by a JSON object, over a local socket,
+so queries should answer with JSON-friendly values. Workers introduce
+themselves with a token the coordinator passed them, and anything else
+which connects is hung up on.
+"""
+import logging
+import multiprocessing
+import os
+import secrets
+import struct
+from typing import (Any, Callable, Dict, Iterable, List, Optional, Set,
+                    Tuple, TYPE_CHECKING)
+
+import trio
+
+from .codecs import find_codec
+from .shard_manager import IdentifyLimiter
+from ..http_base.routing_table import RoutingTable
+
+if TYPE_CHECKING:
+    from .. import Client
+
+logger = logging.getLogger(__name__)
+
+LENGTH = struct.Struct('<I')
+
+QUERY_HANDLER_TYPE = Callable[['Client', Any], Any]
+
+#: what workers answer to `ClusterWorker.query`, by name
+query_handlers: Dict[str, QUERY_HANDLER_TYPE] = {}
+
+codec = find_codec('json')
+
+
+class ClusterError(Exception):
+    pass
+
+
+def query_handler(name: str) -> Callable[[Any], Any]:
+    """Registers a function answering the `name` query in every worker."""
+
+    def decoration(function: QUERY_HANDLER_TYPE) -> QUERY_HANDLER_TYPE:
+        query_handlers[name] = function
+        return function
+
+    return decoration
+
+
+@query_handler('guild_count')
+def guild_count(client: 'Client', _: Any) -> int:
+    from ..structures import Guild
+
+    return client.cache.count(Guild)
+
+
+@query_handler('latencies')
+def latencies(client: 'Client', _: Any) -> Dict[str, Optional[float]]:
+    # JSON objects only have string keys
+    return {str(shard): latency
+            for shard, latency in client.latencies.items()}
+
+
+class FrameStream:
+    """A framed, lockable message stream over a trio socket stream."""
+    __slots__ = ('stream', 'buffer', 'send_lock')
+    stream: trio.abc.Stream
+    buffer: bytearray
+    send_lock: trio.Lock
+
+    def __init__(self, stream: trio.abc.Stream):
+        self.stream = stream
+        self.buffer = bytearray()
+        self.send_lock = trio.Lock()
+
+    async def send(self, message: Dict[str, Any]) -> None:
+        data = codec.encode(message)
+
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+
+        async with self.send_lock:
+            await self.stream.send_all(LENGTH.pack(len(data)) + data)
+
+    async def receive(self) -> Optional[Dict[str, Any]]:
+        """The next message, or None once the other side hung up."""
+        while True:
+            if len(self.buffer) >= LENGTH.size:
+                length, = LENGTH.unpack_from(self.buffer)
+                end = LENGTH.size + length
+
+                if len(self.buffer) >= end:
+                    message = codec.decode(bytes(self.buffer[LENGTH.size:end]))
+                    del self.buffer[:end]
+                    return message
+
+            data = await self.stream.receive_some()
+
+            if not data:
+                return None
+
+            self.buffer.extend(data)
+
+
+def shard_ranges(shard_count: int, processes: int) -> List[List[int]]:
+    """Splits the shards into `processes` contiguous, even ranges."""
+    return [
+        list(range(n * shard_count // processes,
+                   (n + 1) * shard_count // processes))
+        for n in range(processes)
+    ]
+
+
+class Coordinator:
+    __slots__ = ('factory', 'shard_count', 'processes', 'limiter',
+                 'connection_kwargs', 'token', 'workers', 'queries',
+                 'next_nonce')
+    factory: Callable[[], 'Client']
+    shard_count: int
+    processes: int
+    limiter: IdentifyLimiter
+    connection_kwargs: Dict[str, Any]
+    #: what workers say in their hello, so only they are served
+    token: str
+    workers: Dict[int, FrameStream]
+    #: unanswered queries: the answers so far, the workers which
+    #: still have to answer and when they're all in
+    queries: Dict[int, Tuple[Dict[int, Any], Set[int], trio.Event]]
+    next_nonce: int
+
+    #: how long, in seconds, a query waits on workers that don't answer
+    QUERY_TIMEOUT = 30
+
+    def __init__(self,
+                 factory: Callable[[], 'Client'],
+                 shard_count: int,
+                 processes: int,
+                 max_concurrency: int = 1,
+                 **connection_kwargs: Any):
+        self.factory = factory
+        self.shard_count = shard_count
+        self.processes = processes
+        self.limiter = IdentifyLimiter(max_concurrency)
+        self.connection_kwargs = connection_kwargs
+        self.token = secrets.token_hex(16)
+        self.workers = {}
+        self.queries = {}
+        self.next_nonce = 0
+
+    async def recommend(self) -> None:
+        """Asks Discord how many shards to use, and how fast to start."""
+        client = self.factory()
+        response = await client.http.request(RoutingTable.get_gateway_bot)
+        data = response.json()
+
+        self.shard_count = data.get('shards', 1)
+        self.limiter.max_concurrency = data.get(
+            'session_start_limit', {}
+        ).get('max_concurrency', 1)
+
+        url = data.get('url')
+        if url and 'url' not in self.connection_kwargs:
+            self.connection_kwargs['url'] = url.rstrip('/') + '/'
+
+    async def run(self) -> None:
+        if self.shard_count == 0:
+            await self.recommend()
+
+        listeners = await trio.open_tcp_listeners(0, host='127.0.0.1')
+        port = listeners[0].socket.getsockname()[1]
+        context = multiprocessing.get_context('spawn')
+
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(trio.serve_listeners, self.serve, listeners)
+
+            workers = [
+                context.Process(
+                    target=worker_main,
+                    args=(self.factory, port, self.token, index,
+                          shard_ids, self.shard_count,
+                          self.connection_kwargs),
+                    daemon=True
+                )
+                for index, shard_ids in enumerate(shard_ranges(
+                    self.shard_count,
+                    max(min(self.processes, self.shard_count), 1)
+                ))
+            ]
+
+            try:
+                for worker in workers:
+                    worker.start()
+
+                for worker in workers:
+                    await trio.to_thread.run_sync(worker.join,
+                                                  cancellable=True)
+            finally:
+                for worker in workers:
+                    if worker.is_alive():
+                        worker.terminate()
+
+            nursery.cancel_scope.cancel()
+
+    async def serve(self, stream: trio.abc.Stream) -> None:
+        async with stream:
+            channel = FrameStream(stream)
+            hello = await channel.receive()
+
+            if not self.introduced(hello):
+                # whatever it is, the other workers keep going
+                logger.warning('Hanging up on a connection which did '
+                               'not introduce itself as a worker.')
+                return
+
+            index = hello['worker']
+            self.workers[index] = channel
+
+            try:
+                await self.serve_worker(index, channel)
+            finally:
+                self.lost(index)
+
+    def introduced(self, hello: Any) -> bool:
+        """Whether `hello` is one of this coordinator's workers'."""
+        return (
+            isinstance(hello, dict)
+            and hello.get('op') == 'hello'
+            and isinstance(hello.get('worker'), int)
+            and isinstance(hello.get('token'), str)
+            and secrets.compare_digest(hello['token'], self.token)
+        )
+
+    async def serve_worker(self, index: int, channel: FrameStream) -> None:
+        async with trio.open_nursery() as nursery:
+            while True:
+                message = await channel.receive()
+
+                if message is None:
+                    break
+
+                op = message.get('op')
+
+                if op == 'identify':
+                    nursery.start_soon(self.identify, channel, message)
+                elif op == 'query':
+                    nursery.start_soon(self.query, channel, message)
+                elif op == 'answer':
+                    self.answer(index, message)
+                elif op == 'broadcast':
+                    for worker in list(self.workers.values()):
+                        await worker.send({
+                            'op': 'dispatch',
+                            'event': message['event'],
+                            'data': message.get('data')
+                        })
+                else:
+                    logger.warning('Worker %d sent an unknown operation '
+                                   '%r, hanging up on it.', index, op)
+                    nursery.cancel_scope.cancel()
+                    return
+
+    def lost(self, index: int) -> None:
+        """Stops waiting on a worker which hung up, for any query."""
+        self.workers.pop(index, None)
+
+        for answers, pending, done in self.queries.values():
+            pending.discard(index)
+
+            if not pending:
+                done.set()
+
+    async def identify(self,
+                       channel: FrameStream,
+                       message: Dict[str, Any]) -> None:
+        await self.limiter.acquire(message['shard_id'])
+        await channel.send({'op': 'identify', 'nonce': message['nonce']})
+
+    async def query(self,
+                    channel: FrameStream,
+                    message: Dict[str, Any]) -> None:
+        nonce = self.next_nonce
+        self.next_nonce += 1
+
+        answers: Dict[int, Any] = {}
+        done = trio.Event()
+        workers = dict(self.workers)
+        pending = set(workers)
+        self.queries[nonce] = (answers, pending, done)
+
+        for index, worker in workers.items():
+            try:
+                await worker.send({
+                    'op': 'query',
+                    'nonce': nonce,
+                    'name': message['name'],
+                    'argument': message.get('argument')
+                })
+            except (trio.BrokenResourceError, trio.ClosedResourceError):
+                pending.discard(index)  # it's hanging up
+
+        # a worker stuck on something else shouldn't hang the asker,
+        # who gets the answers that came in
+        with trio.move_on_after(self.QUERY_TIMEOUT):
+            if pending:
+                await done.wait()
+
+        del self.queries[nonce]
+
+        await channel.send({
+            'op': 'answer',
+            'nonce': message['nonce'],
+            'value': [answers[index] for index in sorted(answers)]
+        })
+
+    def answer(self, index: int, message: Dict[str, Any]) -> None:
+        query = self.queries.get(message['nonce'])
+
+        if query is None:
+            return
+
+        answers, pending, done = query
+        answers[index] = message.get('value')
+        pending.discard(index)
+
+        if not pending:
+            done.set()
+
+
+class CoordinatedIdentify(IdentifyLimiter):
+    """Waits for the coordinator's go-ahead instead of a local timer."""
+    __slots__ = ('worker',)
+    worker: 'ClusterWorker'
+
+    def __init__(self, worker: 'ClusterWorker'):
+        super().__init__()
+        self.worker = worker
+
+    async def acquire(self, shard_id: int) -> None:
+        await self.worker.request({'op': 'identify', 'shard_id': shard_id})
+
+
+class ClusterWorker:
+    """A worker's side of the cluster, available as `client.cluster`."""
+    __slots__ = ('client', 'channel', 'token', 'index', 'nursery',
+                 'waiting', 'next_nonce')
+    client: 'Client'
+    channel: FrameStream
+    #: the coordinator's, to introduce itself with
+    token: str
+    index: int
+    nursery: trio.Nursery
+    #: requests waiting for the coordinator's answer
+    waiting: Dict[int, List[Any]]
+    next_nonce: int
+
+    def __init__(self,
+                 client: 'Client',
+                 channel: FrameStream,
+                 token: str,
+                 index: int):
+        self.client = client
+        self.channel = channel
+        self.token = token
+        self.index = index
+        self.waiting = {}
+        self.next_nonce = 0
+
+    async def run(self,
+                  shard_ids: Iterable[int],
+                  shard_count: int,
+                  **connection_kwargs: Any) -> None:
+        await self.channel.send({'op': 'hello', 'worker': self.index,
+                                 'token': self.token})
+
+        async with trio.open_nursery() as nursery:
+            self.nursery = nursery
+            nursery.start_soon(self.listen)
+
+            await self.client.start_gateway(
+                nursery,
+                shard_count,
+                shard_ids,
+                identify_limiter=CoordinatedIdentify(self),
+                **connection_kwargs
+            )
+
+    async def listen(self) -> None:
+        while True:
+            message = await self.channel.receive()
+
+            if message is None:
+                raise ClusterError('The coordinator hung up.')
+
+            op = message.get('op')
+
+            if op in ('identify', 'answer'):
+                waiter = self.waiting.pop(message['nonce'], None)
+
+                if waiter is not None:
+                    waiter[1] = message.get('value')
+                    waiter[0].set()
+            elif op == 'query':
+                self.nursery.start_soon(self.answer, message)
+            elif op == 'dispatch':
+                for handler in self.client.dispatchers.get(
+                    message['event'], []
+                ):
+                    self.nursery.start_soon(handler, self.client,
+                                            message.get('data'))
+
+    async def answer(self, message: Dict[str, Any]) -> None:
+        handler = query_handlers.get(message['name'])
+        value = None
+
+        if handler is not None:
+            value = handler(self.client, message.get('argument'))
+
+        await self.channel.send({
+            'op': 'answer',
+            'nonce': message['nonce'],
+            'value': value
+        })
+
+    async def request(self, message: Dict[str, Any]) -> Any:
+        nonce = self.next_nonce
+        self.next_nonce += 1
+
+        waiter = self.waiting[nonce] = [trio.Event(), None]
+        await self.channel.send({**message, 'nonce': nonce})
+        await waiter[0].wait()
+
+        return waiter[1]
+
+    async def query(self, name: str, argument: Any = None) -> List[Any]:
+        """Every worker's answer to the `name` query, in worker order."""
+        return await self.request({
+            'op': 'query',
+            'name': name,
+            'argument': argument
+        })
+
+    async def broadcast(self, event: str, data: Any = None) -> None:
+        """Calls the `event` handlers of every worker, this one too."""
+        await self.channel.send({
+            'op': 'broadcast',
+            'event': event,
+            'data': data
+        })
+
+
+def worker_main(factory: Callable[[], 'Client'],
+                port: int,
+                token: str,
+                index: int,
+                shard_ids: List[int],
+                shard_count: int,
+                connection_kwargs: Dict[str, Any]) -> None:
+    client = factory()
+
+    async def main() -> None:
+        stream = await trio.open_tcp_stream('127.0.0.1', port)
+        client.cluster = ClusterWorker(client, FrameStream(stream),
+                                       token, index)
+
+        await client.cluster.run(shard_ids, shard_count, **connection_kwargs)
+
+    trio.run(main)
+
+
+def run_cluster(factory: Callable[[], 'Client'],
+                shard_count: int = 0,
+                processes: Optional[int] = None,
+                max_concurrency: int = 1,
+                **connection_kwargs: Any) -> None:
+    """
+    Runs `shard_count` shards (0 for Discord's recommendation) over
+    `processes` worker processes, one per core by default.
+    """
+    trio.run(Coordinator(
+        factory,
+        shard_count,
+        processes or os.cpu_count() or 1,
+        max_concurrency,
+        **connection_kwargs
+    ).run)
@@ -0,0 +1,116 @@
+"""
+How gateway payloads are turned into Python objects and back.
+
+Every encoding (`json` or `etf`) has a list of codecs, fastest first.
+Codecs whose library isn't installed are never registered, so
+`find_codec(encoding)` is the fastest one available. Pass a name to
+pin one, like `find_codec('json', 'stdlib')`; `benchmarks/bench_codecs.py`
+compares everything registered here.
+"""
+import json
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from . import etf
+
+ENCODED_TYPE = Union[str, bytes]
+
+
+class Codec:
+    __slots__ = ('name', 'encoding', 'decode', 'encode')
+    name: str
+    #: the `encoding` query parameter of the gateway url
+    encoding: str
+    decode: Callable[[Union[str, bytes]], Any]
+    encode: Callable[[Any], ENCODED_TYPE]
+
+    def __init__(self,
+                 name: str,
+                 encoding: str,
+                 decode: Callable[[Union[str, bytes]], Any],
+                 encode: Callable[[Any], ENCODED_TYPE]):
+        self.name = name
+        self.encoding = encoding
+        self.decode = decode
+        self.encode = encode
+
+    def __repr__(self) -> str:
+        return f'<Codec {self.encoding}/{self.name}>'
+
+
+codecs: Dict[str, List[Codec]] = {'json': [], 'etf': []}
+
+
+def register(codec: Codec, first: bool = False) -> None:
+    """Makes `codec` available, as the preferred one if `first` is set."""
+    registered = codecs.setdefault(codec.encoding, [])
+
+    if first:
+        registered.insert(0, codec)
+    else:
+        registered.append(codec)
+
+
+def find_codec(encoding: str, name: Optional[str] = None) -> Codec:
+    for codec in codecs.get(encoding, []):
+        if name is None or codec.name == name:
+            return codec
+
+    raise UserWarning(
+        f'No codec {name or ""} is available for encoding `{encoding}`.'
+    )
+
+
+def text(encode: Callable[[Any], bytes]) -> Callable[[Any], str]:
+    # the gateway wants text frames for json
+    def encode_text(data: Any) -> str:
+        return encode(data).decode('utf-8')
+
+    return encode_text
+
+
+try:
+    import orjson  # type: ignore
+except ImportError:
+    pass
+else:
+    register(Codec('orjson', 'json', orjson.loads, text(orjson.dumps)))
+
+try:
+    import ujson  # type: ignore
+except ImportError:
+    pass
+else:
+    register(Codec('ujson', 'json', ujson.loads, ujson.dumps))
+
+register(Codec(
+    'stdlib', 'json', json.loads,
+    json.JSONEncoder(separators=(',', ':')).encode
+))
+
+
+def normalize(term: Any) -> Any:
+    # erlpack leaves binaries as bytes, but models want str
+    if isinstance(term, bytes):
+        return etf.as_text(term)
+    elif isinstance(term, dict):
+        return {normalize(k): normalize(v) for k, v in term.items()}
+    elif isinstance(term, list):
+        return [normalize(element) for element in term]
+    elif isinstance(term, str):
+        return etf.ATOMS.get(term, str(term))  # erlpack's atoms are str
+
+    return term
+
+
+try:
+    import erlpack  # type: ignore
+except ImportError:
+    pass
+else:
+    register(Codec(
+        'erlpack', 'etf',
+        lambda data: normalize(erlpack.unpack(data)),
+        erlpack.pack
+    ))
+
+register(Codec('python', 'etf', etf.unpack, etf.pack))
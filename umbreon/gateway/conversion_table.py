@@ -1,27 +1,24 @@
 from ..structures import (Channel, Emoji, Guild, Member, Message,
                           PresenceUpdate, Role, Snowflake,
                           User, VoiceState)
-from ..structures.base import optional, DataModelMixin
-from functools import partial
-from typing import Dict, Any, Callable
-from dateutil.parser import isoparse
+from ..structures.base import compile_converter, optional
+from ..structures.timestamp import parse_timestamp
+from .intents import Intents
+from typing import Dict, Any, Callable, FrozenSet, Iterable, List
 
 
 def converter(schema: Dict[str, Any]) -> Callable:
-    # def conversion(client, data: Dict[str, Any]) -> Any:
-    def conversion(client, data: Dict[str, Any]) -> Any:
-
-        out_dict = {}
-        for key, converter in schema.items():
-            if key in data.keys():
-                if (isinstance(converter, type)
-                   and issubclass(converter, DataModelMixin)):
-                    out_dict[key] = converter(client, data[key])
-                elif isinstance(converter, type) or callable(converter):
-                    out_dict[key] = converter(data[key])  # type: ignore
-                # out_dict[key] = converter(data[key])
+    # the same converters models use, so lists of models are
+    # handed the client and cached with `pass_through_many`
+    plan = {}
+    for key, transformer in schema.items():
+        convert = compile_converter(transformer)
+        if convert is not None:
+            plan[key] = convert
 
-        return out_dict
+    def conversion(client, data: Dict[str, Any]) -> Any:
+        return {key: convert(client, data[key])
+                for key, convert in plan.items() if key in data}
 
     return conversion
 
@@ -34,7 +31,7 @@ conversion_table = {
     'HELLO': {'heartbeat_interval': int},
     'READY': {
         'v': int, 'user': User, 'private_channels': list,
-        'guilds': partial(map, Guild), 'session_id': str, 'shard': list},
+        'guilds': List[Guild], 'session_id': str, 'shard': list},
     'RESUMED': empty_func,
     'RECONNECT': empty_func,
     'INVALID_SESSION': bool,
@@ -43,24 +40,24 @@ conversion_table = {
     'CHANNEL_DELETE': Channel,
     'CHANNEL_PINS_UPDATE': {
         'guild_id': Snowflake, 'channel_id': Snowflake,
-        'last_pin_timestamp': isoparse},
+        'last_pin_timestamp': parse_timestamp},
     'GUILD_CREATE': Guild,
     'GUILD_UPDATE': Guild,
     'GUILD_DELETE': Guild,
     'GUILD_BAN_ADD': {'guild_id': Snowflake, 'user': User},
     'GUILD_BAN_REMOVE': {'guild_id': Snowflake, 'user': User},
     'GUILD_EMOJIS_UPDATE': {
-        'guild_id': Snowflake, 'emojis': partial(map, Emoji)},
+        'guild_id': Snowflake, 'emojis': List[Emoji]},
     'GUILD_INTEGRATIONS_UPDATE': {'guild_id': Snowflake},
     'GUILD_MEMBER_ADD': Member,  # has an extra field, `guild_id`...
     'GUILD_MEMBER_REMOVE': {'guild_id': Snowflake, 'user': User},
     'GUILD_MEMBER_UPDATE': {
-        'guild_id': Snowflake, 'roles': partial(map, Snowflake), 'user': User,
+        'guild_id': Snowflake, 'roles': List[Snowflake], 'user': User,
         # frick discord... the only nullable field possible is "premium_since"
-        'nick': str, 'premium_since': optional(isoparse)},
+        'nick': str, 'premium_since': optional(parse_timestamp)},
     'GUILD_MEMBERS_CHUNK': {
-        'guild_id': Snowflake, 'members': partial(map, Member),
-        'not_found': list, 'presences': partial(map, PresenceUpdate)},
+        'guild_id': Snowflake, 'members': List[Member],
+        'not_found': list, 'presences': List[PresenceUpdate]},
     'GUILD_ROLE_CREATE': {'guild_id': Snowflake, 'role': Role},
     'GUILD_ROLE_UPDATE': {'guild_id': Snowflake, 'role': Role},
     'GUILD_ROLE_DELETE': {'guild_id': Snowflake, 'role_id': Snowflake},
@@ -69,7 +66,7 @@ conversion_table = {
     'MESSAGE_DELETE': {
         'id': Snowflake, 'channel_id': Snowflake, 'guild_id': Snowflake},
     'MESSAGE_DELETE_BULK': {
-        'ids': partial(map, Snowflake), 'channel_id': Snowflake,
+        'ids': List[Snowflake], 'channel_id': Snowflake,
         'guild_id': Snowflake},
     'MESSAGE_REACTION_ADD': {
         'user_id': Snowflake, 'channel_id': Snowflake, 'message_id': Snowflake,
@@ -94,3 +91,48 @@ conversion_table = {
 for key, value in conversion_table.items():
     if isinstance(value, dict):
         conversion_table[key] = converter(value)
+
+REACTION_EVENTS = frozenset({
+    'MESSAGE_REACTION_ADD', 'MESSAGE_REACTION_REMOVE',
+    'MESSAGE_REACTION_REMOVE_ALL', 'MESSAGE_REACTION_REMOVE_EMOJI'})
+MESSAGE_EVENTS = frozenset({
+    'MESSAGE_CREATE', 'MESSAGE_UPDATE', 'MESSAGE_DELETE'})
+
+# events which aren't in here (like READY) are always sent
+intent_events: Dict[Intents, FrozenSet[str]] = {
+    Intents.GUILDS: frozenset({
+        'GUILD_CREATE', 'GUILD_UPDATE', 'GUILD_DELETE',
+        'GUILD_ROLE_CREATE', 'GUILD_ROLE_UPDATE', 'GUILD_ROLE_DELETE',
+        'CHANNEL_CREATE', 'CHANNEL_UPDATE', 'CHANNEL_DELETE',
+        'CHANNEL_PINS_UPDATE'}),
+    Intents.GUILD_MEMBERS: frozenset({
+        'GUILD_MEMBER_ADD', 'GUILD_MEMBER_UPDATE', 'GUILD_MEMBER_REMOVE'}),
+    Intents.GUILD_BANS: frozenset({'GUILD_BAN_ADD', 'GUILD_BAN_REMOVE'}),
+    Intents.GUILD_EMOJIS: frozenset({'GUILD_EMOJIS_UPDATE'}),
+    Intents.GUILD_INTEGRATIONS: frozenset({'GUILD_INTEGRATIONS_UPDATE'}),
+    Intents.GUILD_WEBHOOKS: frozenset({'WEBHOOKS_UPDATE'}),
+    Intents.GUILD_INVITES: frozenset({'INVITE_CREATE', 'INVITE_DELETE'}),
+    Intents.GUILD_VOICE_STATES: frozenset({'VOICE_STATE_UPDATE'}),
+    Intents.GUILD_PRESENCES: frozenset({'PRESENCE_UPDATE'}),
+    Intents.GUILD_MESSAGES: MESSAGE_EVENTS | {'MESSAGE_DELETE_BULK'},
+    Intents.GUILD_MESSAGE_REACTIONS: REACTION_EVENTS,
+    Intents.GUILD_MESSAGE_TYPING: frozenset({'TYPING_START'}),
+    Intents.DIRECT_MESSAGES: MESSAGE_EVENTS | {'CHANNEL_PINS_UPDATE'},
+    Intents.DIRECT_MESSAGE_REACTIONS: REACTION_EVENTS,
+    Intents.DIRECT_MESSAGE_TYPING: frozenset({'TYPING_START'}),
+}
+
+
+def intents_for(events: Iterable[str]) -> Intents:
+    """
+    The intents needed to receive `events`, always with GUILDS
+    since everything else is looked up through guilds.
+    """
+    events = set(events)
+    intents = Intents.GUILDS
+
+    for intent, implied in intent_events.items():
+        if not events.isdisjoint(implied):
+            intents |= intent
+
+    return intents
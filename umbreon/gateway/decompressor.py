@@ -0,0 +1,118 @@
+"""
+The decompressing stage of a `zlib-stream` gateway connection.
+
+Discord compresses the whole connection as one zlib stream and
+flushes it at the end of every payload, so a payload is complete
+once the data received ends in `ZLIB_SUFFIX`. Big payloads (like
+GUILD_CREATEs of large guilds) are split over several websocket
+messages, which are buffered until the flush arrives.
+"""
+import zlib
+from typing import Optional, Union
+
+ZLIB_SUFFIX = b'\x00\x00\xff\xff'
+
+
+class DecompressionError(Exception):
+    pass
+
+
+class ZlibStream:
+    """
+    Turns websocket messages into whole decompressed payloads.
+
+    `max_size` bounds both the compressed data buffered for a payload
+    and the payload once decompressed, so a single connection can't
+    eat all the memory. The buffer is reused between payloads, and
+    shrunk back to `keep_size` bytes after an unusually big one.
+    """
+    __slots__ = ('inflator', 'buffer', 'filled', 'max_size', 'keep_size',
+                 'compressed_bytes', 'decompressed_bytes', 'payloads')
+    inflator: 'zlib._Decompress'
+    buffer: bytearray
+    #: how many bytes of `buffer` hold the current payload
+    filled: int
+    max_size: int
+    keep_size: int
+    compressed_bytes: int
+    decompressed_bytes: int
+    payloads: int
+
+    def __init__(self,
+                 max_size: int = 64 * 1024 * 1024,
+                 keep_size: int = 1024 * 1024):
+        self.inflator = zlib.decompressobj()
+        self.buffer = bytearray()
+        self.filled = 0
+        self.max_size = max_size
+        self.keep_size = keep_size
+        self.compressed_bytes = 0
+        self.decompressed_bytes = 0
+        self.payloads = 0
+
+    def reset(self) -> None:
+        """Starts over for a new connection, keeping the statistics."""
+        self.inflator = zlib.decompressobj()
+        self.filled = 0
+
+    def feed(self, data: Union[bytes, bytearray]) -> Optional[bytes]:
+        """
+        Takes the next websocket message, and returns the payload it
+        completes or None if the payload continues in the next one.
+        """
+        size = len(data)
+        self.compressed_bytes += size
+
+        if self.filled == 0 and data[-4:] == ZLIB_SUFFIX:
+            # the usual case, a payload in one message: nothing to copy
+            return self.inflate(data)
+
+        if self.filled + size > self.max_size:
+            raise DecompressionError(
+                f'A payload is over {self.max_size} bytes compressed.'
+            )
+
+        # grows the buffer if needed, otherwise writes over the old data
+        self.buffer[self.filled:self.filled + size] = data
+        self.filled += size
+        end = self.filled
+
+        if end < 4 or self.buffer[end - 4:end] != ZLIB_SUFFIX:
+            return None
+
+        with memoryview(self.buffer) as view:
+            payload = self.inflate(view[:self.filled])
+
+        self.filled = 0
+
+        if len(self.buffer) > self.keep_size:
+            self.buffer = bytearray()
+
+        return payload
+
+    def inflate(self, data: Union[bytes, bytearray, memoryview]) -> bytes:
+        try:
+            payload = self.inflator.decompress(data, self.max_size)
+        except zlib.error as error:
+            raise DecompressionError(str(error)) from error
+
+        if self.inflator.unconsumed_tail:
+            raise DecompressionError(
+                f'A payload is over {self.max_size} bytes decompressed.'
+            )
+
+        self.decompressed_bytes += len(payload)
+        self.payloads += 1
+
+        return payload
+
+    @property
+    def ratio(self) -> float:
+        """
+        How many bytes were decompressed for each byte received,
+        so 8.0 means compression saved 7/8 of the bandwidth.
+        """
+        if not self.compressed_bytes:
+            return 1.0
+
+        return self.decompressed_bytes / self.compressed_bytes
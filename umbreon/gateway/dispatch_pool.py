@@ -0,0 +1,133 @@
+"""
+Runs event handlers on a fixed number of workers.
+
+Every handler call has a key, usually the guild or channel the event
+happened in, and all calls with the same key go to the same worker.
+Workers run their calls one at a time, so the handlers of events in
+one guild see them in the order Discord sent them. Each worker has a
+bounded queue, and `Overflow` decides what happens when it's full.
+"""
+from enum import IntEnum, auto
+from itertools import count
+from typing import Any, Awaitable, Callable, Hashable, List, Optional, Tuple
+
+import trio
+
+JOB_TYPE = Tuple[Callable[..., Awaitable[Any]], Tuple[Any, ...]]
+
+
+class Overflow(IntEnum):
+    #: wait for room, which slows down reading from the gateway
+    BLOCK = auto()
+    #: throw away the call being submitted
+    DROP_NEWEST = auto()
+    #: throw away the oldest queued call of that worker
+    DROP_OLDEST = auto()
+
+
+def dispatch_key(event: str, data: Any) -> Optional[Hashable]:
+    """What the handlers of `event` should be ordered by."""
+    if not isinstance(data, dict):
+        return None
+
+    key = data.get('guild_id') or data.get('channel_id')
+
+    if key is None and event.startswith('GUILD_'):
+        key = data.get('id')  # GUILD_CREATE and friends are guilds
+
+    return key
+
+
+class DispatchPool:
+    __slots__ = ('senders', 'receivers', 'overflow', 'dropped', 'stalls',
+                 'round_robin')
+    senders: List[trio.MemorySendChannel]
+    receivers: List[trio.MemoryReceiveChannel]
+    overflow: Overflow
+    #: how many calls were thrown away because a queue was full
+    dropped: int
+    #: how many calls had to wait for room, which also held up
+    #: everything behind them on the gateway, heartbeat ACKs included
+    stalls: int
+    #: spreads calls without a key over the workers
+    round_robin: 'count[int]'
+
+    def __init__(self,
+                 workers: int = 8,
+                 queue_size: int = 256,
+                 overflow: Overflow = Overflow.BLOCK):
+        self.senders = []
+        self.receivers = []
+        self.overflow = overflow
+        self.dropped = 0
+        self.stalls = 0
+        self.round_robin = count()
+
+        for _ in range(workers):
+            sender, receiver = trio.open_memory_channel(queue_size)
+            self.senders.append(sender)
+            self.receivers.append(receiver)
+
+    async def run(self) -> None:
+        async with trio.open_nursery() as nursery:
+            for receiver in self.receivers:
+                nursery.start_soon(self.worker, receiver)
+
+    def close(self) -> None:
+        """Takes no more calls: `run` returns once the queued ones ran."""
+        for sender in self.senders:
+            sender.close()
+
+    @staticmethod
+    async def worker(receiver: trio.MemoryReceiveChannel) -> None:
+        async for function, args in receiver:
+            await function(*args)
+
+    async def submit(self,
+                     key: Optional[Hashable],
+                     function: Callable[..., Awaitable[Any]],
+                     *args: Any) -> None:
+        """Queues `function(*args)` behind the other calls with `key`."""
+        if key is None:
+            index = next(self.round_robin) % len(self.senders)
+        else:
+            index = hash(key) % len(self.senders)
+
+        sender = self.senders[index]
+        job: JOB_TYPE = (function, args)
+
+        if self.overflow == Overflow.BLOCK:
+            try:
+                sender.send_nowait(job)
+            except trio.WouldBlock:
+                self.stalls += 1
+                await sender.send(job)
+            return
+
+        try:
+            sender.send_nowait(job)
+        except trio.WouldBlock:
+            self.dropped += 1
+
+            if self.overflow == Overflow.DROP_OLDEST:
+                try:
+                    self.receivers[index].receive_nowait()
+                    sender.send_nowait(job)
+                except trio.WouldBlock:
+                    pass  # an unbuffered queue, there's nothing to drop
+
+    @property
+    def blocked(self) -> bool:
+        """Whether a call is waiting for room right now."""
+        return any(
+            sender.statistics().tasks_waiting_send
+            for sender in self.senders
+        )
+
+    @property
+    def queued(self) -> int:
+        """How many calls are waiting for a worker."""
+        return sum(
+            sender.statistics().current_buffer_used
+            for sender in self.senders
+        )
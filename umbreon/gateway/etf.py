@@ -0,0 +1,266 @@
+"""
+A pure Python implementation of the Erlang External Term Format,
+the subset Discord uses for `encoding=etf` gateway connections.
+
+It decodes like Discord's `erlpack` is used by libraries: binaries
+become `str` (or `bytes` if they aren't UTF-8), the `nil`, `true` and
+`false` atoms become None, True and False, and other atoms become
+`str`. Encoding goes the other way, with `str` sent as binaries.
+"""
+import struct
+import zlib
+from typing import Any, Callable, Dict, List, Tuple
+
+VERSION = 131
+
+NEW_FLOAT_EXT = 70
+COMPRESSED = 80
+SMALL_INTEGER_EXT = 97
+INTEGER_EXT = 98
+FLOAT_EXT = 99
+ATOM_EXT = 100
+SMALL_TUPLE_EXT = 104
+LARGE_TUPLE_EXT = 105
+NIL_EXT = 106
+STRING_EXT = 107
+LIST_EXT = 108
+BINARY_EXT = 109
+SMALL_BIG_EXT = 110
+LARGE_BIG_EXT = 111
+SMALL_ATOM_EXT = 115
+MAP_EXT = 116
+ATOM_UTF8_EXT = 118
+SMALL_ATOM_UTF8_EXT = 119
+
+U8 = struct.Struct('>B')
+U16 = struct.Struct('>H')
+I32 = struct.Struct('>i')
+U32 = struct.Struct('>I')
+F64 = struct.Struct('>d')
+
+ATOMS = {'nil': None, 'true': True, 'false': False}
+
+
+class ETFError(Exception):
+    pass
+
+
+class Decoder:
+    """Decodes one term, keeping track of where it is in `data`."""
+    __slots__ = ('data', 'offset')
+    data: bytes
+    offset: int
+
+    def __init__(self, data: bytes, offset: int = 0):
+        self.data = data
+        self.offset = offset
+
+    def term(self) -> Any:
+        tag = self.data[self.offset]
+        self.offset += 1
+
+        decode = DECODERS.get(tag)
+
+        if decode is None:
+            raise ETFError(f'Unsupported term tag {tag}.')
+
+        return decode(self)
+
+    def take(self, length: int) -> bytes:
+        start = self.offset
+        self.offset += length
+
+        if self.offset > len(self.data):
+            raise ETFError('The term ended early.')
+
+        return self.data[start:self.offset]
+
+    def unpack(self, layout: struct.Struct) -> Any:
+        value, = layout.unpack_from(self.data, self.offset)
+        self.offset += layout.size
+        return value
+
+    def small_integer(self) -> int:
+        return self.unpack(U8)
+
+    def integer(self) -> int:
+        return self.unpack(I32)
+
+    def new_float(self) -> float:
+        return self.unpack(F64)
+
+    def float_ext(self) -> float:
+        return float(self.take(31).split(b'\x00', 1)[0])
+
+    def atom(self, length: int, encoding: str) -> Any:
+        name = self.take(length).decode(encoding)
+        return ATOMS.get(name, name)
+
+    def atom_ext(self) -> Any:
+        return self.atom(self.unpack(U16), 'latin-1')
+
+    def small_atom_ext(self) -> Any:
+        return self.atom(self.unpack(U8), 'latin-1')
+
+    def atom_utf8(self) -> Any:
+        return self.atom(self.unpack(U16), 'utf-8')
+
+    def small_atom_utf8(self) -> Any:
+        return self.atom(self.unpack(U8), 'utf-8')
+
+    def tuple_of(self, arity: int) -> Tuple[Any, ...]:
+        return tuple([self.term() for _ in range(arity)])
+
+    def small_tuple(self) -> Tuple[Any, ...]:
+        return self.tuple_of(self.unpack(U8))
+
+    def large_tuple(self) -> Tuple[Any, ...]:
+        return self.tuple_of(self.unpack(U32))
+
+    def nil(self) -> List[Any]:
+        return []
+
+    def string_ext(self) -> Any:
+        # a list of small integers, which erlang calls a string
+        return as_text(self.take(self.unpack(U16)))
+
+    def list_ext(self) -> List[Any]:
+        elements = [self.term() for _ in range(self.unpack(U32))]
+        tail = self.term()
+
+        if tail != []:
+            elements.append(tail)  # an improper list, keep the tail
+
+        return elements
+
+    def binary_ext(self) -> Any:
+        return as_text(self.take(self.unpack(U32)))
+
+    def big(self, length: int) -> int:
+        sign = self.unpack(U8)
+        value = int.from_bytes(self.take(length), 'little')
+        return -value if sign else value
+
+    def small_big(self) -> int:
+        return self.big(self.unpack(U8))
+
+    def large_big(self) -> int:
+        return self.big(self.unpack(U32))
+
+    def map_ext(self) -> Dict[Any, Any]:
+        result = {}
+
+        for _ in range(self.unpack(U32)):
+            key = self.term()
+            result[key] = self.term()
+
+        return result
+
+    def compressed(self) -> Any:
+        size = self.unpack(U32)
+        data = zlib.decompress(self.data[self.offset:])
+
+        if len(data) != size:
+            raise ETFError('The compressed term has the wrong size.')
+
+        self.offset = len(self.data)
+        return Decoder(data).term()
+
+
+DECODERS: Dict[int, Callable[[Decoder], Any]] = {
+    NEW_FLOAT_EXT: Decoder.new_float,
+    COMPRESSED: Decoder.compressed,
+    SMALL_INTEGER_EXT: Decoder.small_integer,
+    INTEGER_EXT: Decoder.integer,
+    FLOAT_EXT: Decoder.float_ext,
+    ATOM_EXT: Decoder.atom_ext,
+    SMALL_TUPLE_EXT: Decoder.small_tuple,
+    LARGE_TUPLE_EXT: Decoder.large_tuple,
+    NIL_EXT: Decoder.nil,
+    STRING_EXT: Decoder.string_ext,
+    LIST_EXT: Decoder.list_ext,
+    BINARY_EXT: Decoder.binary_ext,
+    SMALL_BIG_EXT: Decoder.small_big,
+    LARGE_BIG_EXT: Decoder.large_big,
+    SMALL_ATOM_EXT: Decoder.small_atom_ext,
+    MAP_EXT: Decoder.map_ext,
+    ATOM_UTF8_EXT: Decoder.atom_utf8,
+    SMALL_ATOM_UTF8_EXT: Decoder.small_atom_utf8,
+}
+
+
+def as_text(data: bytes) -> Any:
+    try:
+        return data.decode('utf-8')
+    except UnicodeDecodeError:
+        return data
+
+
+def unpack(data: bytes) -> Any:
+    """Decodes a whole payload, starting with the version byte."""
+    data = bytes(data)
+
+    if not data or data[0] != VERSION:
+        raise ETFError('This is not an ETF payload.')
+
+    return Decoder(data, 1).term()
+
+
+def pack(term: Any) -> bytes:
+    """Encodes `term` into a payload, starting with the version byte."""
+    chunks = [bytes((VERSION,))]
+    encode(term, chunks.append)
+    return b''.join(chunks)
+
+
+def encode(term: Any, write: Callable[[bytes], Any]) -> None:
+    if term is None:
+        write(b'\x77\x03nil')
+    elif term is True:
+        write(b'\x77\x04true')
+    elif term is False:
+        write(b'\x77\x05false')
+    elif isinstance(term, int):
+        if 0 <= term <= 255:
+            write(bytes((SMALL_INTEGER_EXT, term)))
+        elif -2 ** 31 <= term < 2 ** 31:
+            write(bytes((INTEGER_EXT,)) + I32.pack(term))
+        else:
+            magnitude = abs(term)
+            length = (magnitude.bit_length() + 7) // 8
+
+            if length > 255:
+                raise ETFError('Integers this big are not supported.')
+
+            write(bytes((SMALL_BIG_EXT, length, term < 0)))
+            write(magnitude.to_bytes(length, 'little'))
+    elif isinstance(term, float):
+        write(bytes((NEW_FLOAT_EXT,)) + F64.pack(term))
+    elif isinstance(term, str):
+        data = term.encode('utf-8')
+        write(bytes((BINARY_EXT,)) + U32.pack(len(data)))
+        write(data)
+    elif isinstance(term, (bytes, bytearray)):
+        write(bytes((BINARY_EXT,)) + U32.pack(len(term)))
+        write(bytes(term))
+    elif isinstance(term, dict):
+        write(bytes((MAP_EXT,)) + U32.pack(len(term)))
+        for key, value in term.items():
+            encode(key, write)
+            encode(value, write)
+    elif isinstance(term, tuple):
+        if len(term) <= 255:
+            write(bytes((SMALL_TUPLE_EXT, len(term))))
+        else:
+            write(bytes((LARGE_TUPLE_EXT,)) + U32.pack(len(term)))
+        for element in term:
+            encode(element, write)
+    elif isinstance(term, list):
+        if term:
+            write(bytes((LIST_EXT,)) + U32.pack(len(term)))
+            for element in term:
+                encode(element, write)
+
+        write(bytes((NIL_EXT,)))
+    else:
+        raise ETFError(f'Cannot encode {type(term).__name__} objects.')
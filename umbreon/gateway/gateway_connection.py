@@ -1,45 +1,67 @@
 from trio_websocket import (connect_websocket_url,  # type: ignore
+                            ConnectionClosed, HandshakeError,
                             WebSocketConnection)
-from typing import (List, Dict, Callable, Any,
-                    Coroutine, Optional, TYPE_CHECKING, TypeVar)
-from trio import Nursery, sleep
-import json
-from zlib import decompressobj
-from .gateway_state_machine import GatewayStateMachine
+from typing import (List, Dict, Callable, Any, Coroutine,
+                    Optional, Tuple, TYPE_CHECKING, TypeVar)
+from trio import (CancelScope, Event, Nursery, sleep,
+                  TASK_STATUS_IGNORED)
+import random
+from .codecs import Codec, ENCODED_TYPE, find_codec
+from .decompressor import ZlibStream
+from .dispatch_pool import DispatchPool, Overflow
+from .heartbeat import LatencyHistogram
+from .recording import Recorder
+from .intents import Intents
+from .gateway_state_machine import (GatewayCode, GatewayError,
+                                    GatewayStateMachine,
+                                    DIFF_DISPATCHER_TYPE)
 from ..http_base.http_client import HTTPClient
 
 T = TypeVar('T')
 
-try:
-    import erlpack  # type: ignore
-except ImportError:
-    class erlpack:  # type: ignore
-        @staticmethod
-        def unpack(data: str) -> Any:
-            return data
-
-        @staticmethod
-        def pack(data: Any) -> str:
-            return str(data)
-
 if TYPE_CHECKING:
     from .. import Client
+    from .shard_manager import IdentifyLimiter
 
 DISPATCHER_TYPE = Callable[
     ['Client', Dict[str, Any]],
     Coroutine[Any, Any, Any]
 ]
 
+#: close codes after which reconnecting won't help
+FATAL_CLOSE_CODES = {4004, 4010, 4011, 4012, 4013, 4014}
+#: close codes after which the session can't be resumed
+INVALID_SESSION_CLOSE_CODES = {4007, 4009}
+#: the longest wait, in seconds, between attempts to reach the gateway
+MAX_BACKOFF = 60
+
 
 class GatewayConnection:
     token: str
+    client: 'Client'
     dispatchers: Dict[str, List[DISPATCHER_TYPE]]
+    diff_dispatchers: Dict[str, List[DIFF_DISPATCHER_TYPE]]
     url: str
     state: GatewayStateMachine
     ws: Optional[WebSocketConnection]
     http: HTTPClient
-    buffer: bytearray
-    compressed: bool
+    compress: bool
+    decompressor: Optional[ZlibStream]
+    codec: Codec
+    dispatch_pool: DispatchPool
+    #: this shard's id and the total number of shards
+    shard: Optional[Tuple[int, int]]
+    identify_limiter: Optional['IdentifyLimiter']
+    #: set once IDENTIFY was sent
+    identified: Event
+    #: None means not sending any, and getting every event
+    intents: Optional[Intents]
+    large_threshold: Optional[int]
+    guild_subscriptions: Optional[bool]
+    latencies: LatencyHistogram
+    #: cancels the heartbeater of the previous websocket
+    heartbeat_scope: Optional[CancelScope]
+    recorder: Optional[Recorder]
 
     def __init__(
         self,
@@ -50,94 +72,290 @@ class GatewayConnection:
         url: str = 'wss://gateway.discord.gg/',  # TODO!
         version: int = 6,
         compress: bool = True,
-        encoding: str = 'json'
+        encoding: str = 'json',
+        max_payload_size: int = 64 * 1024 * 1024,
+        codec: Optional[str] = None,
+        shard: Optional[Tuple[int, int]] = None,
+        identify_limiter: Optional['IdentifyLimiter'] = None,
+        workers: int = 8,
+        queue_size: int = 256,
+        overflow: Overflow = Overflow.BLOCK,
+        intents: Optional[Intents] = None,
+        large_threshold: Optional[int] = None,
+        guild_subscriptions: Optional[bool] = None,
+        record: Optional[str] = None,
+        diff_dispatchers: Optional[
+            Dict[str, List[DIFF_DISPATCHER_TYPE]]
+        ] = None
     ):
         if encoding not in ['json', 'etf']:
             raise UserWarning('encoding should be either `json` or `etf`.')
         self.encoding = encoding
+        self.codec = find_codec(encoding, codec)
         self.token = token
-        self.dispatchers = dispatchers or {}
+        if dispatchers is None:
+            dispatchers = {}
+        if diff_dispatchers is None:
+            diff_dispatchers = {}
+
+        self.dispatchers = dispatchers
+        self.diff_dispatchers = diff_dispatchers
         self.nursery = nursery
         self.ws = None
         self.url = f'{url}?encoding={encoding}&v={version}'
         self.http = client.http
-        self.buffer = bytearray()
         self.compress = compress
-        self.inflator = decompressobj()
+        self.decompressor = None
+        self.shard = shard
+        self.identify_limiter = identify_limiter
+        self.identified = Event()
+        self.dispatch_pool = DispatchPool(workers, queue_size, overflow)
+        self.intents = intents
+        self.large_threshold = large_threshold
+        self.guild_subscriptions = guild_subscriptions
+        self.latencies = LatencyHistogram()
+        self.heartbeat_scope = None
+        self.recorder = None
+
+        if record is not None:
+            self.recorder = Recorder(record, encoding, compress)
 
         if self.compress:
             self.url += '&compress=zlib-stream'
+            self.decompressor = ZlibStream(max_payload_size)
+
+        self.client = client
 
         self.state = GatewayStateMachine.connect(
             client,
             nursery,
-            self.dispatchers
+            self.dispatchers,
+            self.diff_dispatchers,
+            self.codec,
+            self.dispatch_pool,
+            self.latencies
         )
 
     async def connect(self) -> None:
-        self.ws = await connect_websocket_url(
-            self.nursery,
-            self.url,
-            message_queue_size=5
-        )
+        await self.open()
 
+        self.nursery.start_soon(self.dispatch_pool.run)
         self.nursery.start_soon(self.listener)
-        self.nursery.start_soon(self.heartbeater)
+
+    async def open(self) -> None:
+        self.ws = await self.open_websocket()
+
+        if self.decompressor is not None:
+            # every connection is its own zlib stream
+            self.decompressor.reset()
+
+        if self.recorder is not None:
+            self.recorder.connected()
+
+        if self.heartbeat_scope is not None:
+            self.heartbeat_scope.cancel()
+
+        self.heartbeat_scope = await self.nursery.start(
+            self.heartbeater,
+            self.ws,
+            self.state
+        )
+
+    async def open_websocket(self) -> WebSocketConnection:
+        """Connects to the gateway, backing off while it can't be reached."""
+        delay = 1.0
+
+        while True:
+            try:
+                return await connect_websocket_url(
+                    self.nursery,
+                    self.url,
+                    message_queue_size=5
+                )
+            except (HandshakeError, OSError):
+                await sleep(delay * random.uniform(1, 2))
+                delay = min(delay * 2, MAX_BACKOFF)
+
+    async def reconnect(self, resume: bool) -> None:
+        """
+        Opens a new connection, and picks the session back up where it
+        left off if `resume` is set and there's a session to resume.
+        Otherwise, starts over with a fresh state machine and IDENTIFY.
+        """
+        resume = resume and bool(self.state.session_id)
+
+        if self.ws is not None:
+            # Discord ends the session when closed with 1000 or 1001
+            await self.ws.aclose(4000 if resume else 1000)
+
+        if resume:
+            self.state = GatewayStateMachine.reconnect(
+                self.client,
+                self.nursery,
+                self.dispatchers,
+                self.state.session_id,
+                self.diff_dispatchers,
+                self.codec,
+                self.state.seq,
+                self.dispatch_pool,
+                self.latencies
+            )
+
+            await self.open()
+            await self.resume()
+        else:
+            self.state = GatewayStateMachine.connect(
+                self.client,
+                self.nursery,
+                self.dispatchers,
+                self.diff_dispatchers,
+                self.codec,
+                self.dispatch_pool,
+                self.latencies
+            )
+
+            # Discord asks for a random 1-5 seconds before re-identifying
+            await sleep(random.uniform(1, 5))
+            await self.open()
+            await self.identify()
 
     async def listener(self) -> None:
+        try:
+            await self.listen()
+        finally:
+            # however the connection ends, so the capture isn't cut off
+            if self.recorder is not None:
+                self.recorder.close()
+
+    async def listen(self) -> None:
         while self.ws is None:
             await sleep(0)
 
         # lets get this party started!
+        await self.identify()
+
+        while True:
+            try:
+                data = await self.ws.get_message()
+            except ConnectionClosed as closed:
+                code = closed.reason.code
+
+                if code in FATAL_CLOSE_CODES:
+                    raise GatewayError(
+                        f'Discord closed the connection with {code}: '
+                        f'{closed.reason.reason}'
+                    ) from closed
+
+                await self.reconnect(code not in INVALID_SESSION_CLOSE_CODES)
+                continue
+
+            if self.recorder is not None:
+                self.recorder.write(data)
+
+            # decompress data
+            if self.decompressor is not None:
+                data = self.decompressor.feed(data)
+                if data is None:
+                    continue  # the payload continues in the next message
+
+            decoded = self.decode(data)
+
+            code, value = await self.state.process(decoded)
+
+            if code == GatewayCode.SEND:
+                await self.ws.send_message(value)
+            elif code == GatewayCode.RECONNECT:
+                await self.reconnect(resume=True)
+            elif code == GatewayCode.DROP_AND_CONNECT:
+                await self.reconnect(resume=False)
+
+    async def identify(self) -> None:
+        identify: Dict[str, Any] = {
+            'token': self.token,
+            'properties': {
+                '$os': 'Copland',
+                '$browser': 'umbreon',
+                '$device': 'Navi'
+            }
+        }
+
+        if self.shard is not None:
+            identify['shard'] = list(self.shard)
+
+        if self.intents is not None:
+            identify['intents'] = int(self.intents)
+
+        if self.large_threshold is not None:
+            identify['large_threshold'] = self.large_threshold
+
+        if self.guild_subscriptions is not None:
+            identify['guild_subscriptions'] = self.guild_subscriptions
+
+        if self.identify_limiter is not None:
+            await self.identify_limiter.acquire(
+                self.shard[0] if self.shard else 0
+            )
+
+        await self.ws.send_message(self.encode({'op': 2, 'd': identify}))
+        self.identified.set()
+
+    async def resume(self) -> None:
+        # events missed since `seq` are replayed, then RESUMED arrives
         await self.ws.send_message(self.encode({
-            'op': 2,
+            'op': 6,
             'd': {
                 'token': self.token,
-                'properties': {
-                    '$os': 'Copland',
-                    '$browser': 'umbreon',
-                    '$device': 'Navi'
-                }
-            },
+                'session_id': self.state.session_id,
+                'seq': self.state.seq
+            }
         }))
 
-        while True:
-            data = await self.ws.get_message()
+    async def heartbeater(
+        self,
+        ws: WebSocketConnection,
+        state: GatewayStateMachine,
+        task_status: Any = TASK_STATUS_IGNORED
+    ) -> None:
+        """Heartbeats over `ws` until the next connection replaces it."""
+        with CancelScope() as scope:
+            task_status.started(scope)
 
-            # decompress data
-            if self.compress:
-                self.buffer.extend(data)
-                if len(data) < 4 or data[-4:] != b'\x00\x00\xff\xff':
-                    return
+            await state.hello.wait()
+            # so shards which connected together don't beat together
+            await sleep(state.heartbeat_interval * random.random())
 
-                data = self.inflator.decompress(self.buffer)
-                self.buffer.clear()
+            stalls = self.dispatch_pool.stalls
 
-            decoded = self.decode(data)
+            while True:
+                # the ACK may be queued behind events that waited for
+                # handlers to catch up, which isn't the connection's fault
+                stalled = (self.dispatch_pool.stalls != stalls
+                           or self.dispatch_pool.blocked)
+                stalls = self.dispatch_pool.stalls
 
-            await self.state.process(decoded)
+                if not state.acknowledged and not stalled:
+                    # no ACK since the last beat, so the connection is
+                    # a zombie: close it, and the listener will resume
+                    await ws.aclose(4000, 'Zombied connection.')
+                    return
 
-    async def heartbeater(self) -> None:
-        # TODO: handle disconnect... probably just ignore lmao
-        while self.ws is None:
-            await sleep(0)
+                try:
+                    await ws.send_message(state.heartbeat_payload)
+                except ConnectionClosed:
+                    return  # the listener is already reconnecting
 
-        while True:
-            await self.ws.send_message(self.state.heartbeat_payload)
-            await sleep(self.state.heartbeat_interval)
+                await sleep(state.heartbeat_interval)
 
-    def decode(self, data: bytes) -> Dict[str, Any]:
-        if self.encoding == 'json':
-            return json.loads(data)
-        elif self.encoding == 'etf':
-            return erlpack.unpack(data)
+    @property
+    def compression_ratio(self) -> float:
+        """Decompressed bytes per byte received, 1.0 if uncompressed."""
+        if self.decompressor is None:
+            return 1.0
 
-        return {}
+        return self.decompressor.ratio
 
-    def encode(self, data: Dict[str, Any]) -> str:
-        if self.encoding == 'json':
-            return json.dumps(data)
-        elif self.encoding == 'etf':
-            return erlpack.pack(data)
+    def decode(self, data: bytes) -> Dict[str, Any]:
+        return self.codec.decode(data)
 
-        return ''
+    def encode(self, data: Dict[str, Any]) -> ENCODED_TYPE:
+        return self.codec.encode(data)
@@ -1,10 +1,13 @@
-from json import dumps
 from typing import (List, Dict, Callable, Any, Optional,
                     Tuple, Coroutine, TYPE_CHECKING)
-from trio import current_time, Nursery, sleep
+from trio import current_time, Event, Nursery, sleep
 from enum import IntEnum, auto
 
+from .codecs import Codec, ENCODED_TYPE, find_codec
 from .conversion_table import conversion_table
+from .dispatch_pool import DispatchPool, dispatch_key
+from .heartbeat import LatencyHistogram
+from ..cache.changes import ChangeSet
 from ..structures.base import DataModelMixin
 
 if TYPE_CHECKING:
@@ -26,33 +29,58 @@ class GatewayCode(IntEnum):
     NOTHING = auto()
 
 
+class EventPolicy(IntEnum):
+    #: build models, update the cache and call the handlers
+    CONVERT = auto()
+    #: nothing handles it, but the cache wants to know
+    CACHE_ONLY = auto()
+    #: nobody cares, don't even look at it
+    SKIP = auto()
+
+
 DISPATCHER_TYPE = Callable[
     ['Client', Dict[str, Any]],
     Coroutine[Any, Any, Any]
 ]
+DIFF_DISPATCHER_TYPE = Callable[
+    ['Client', Any, Optional[ChangeSet]],
+    Coroutine[Any, Any, Any]
+]
 
 
 class GatewayStateMachine:
     dispatchers: Dict[str, List[DISPATCHER_TYPE]]
+    #: Handlers which also get what the event changed in the cache.
+    diff_dispatchers: Dict[str, List[DIFF_DISPATCHER_TYPE]]
     seq: Optional[int]
     _last_heartbeat: float
     heartbeat_interval: float
     latency: Optional[float]
+    #: every latency measured, shared with the connection
+    latencies: Optional[LatencyHistogram]
+    #: whether the last heartbeat sent was ACKed
+    acknowledged: bool
+    #: set once HELLO arrived, so the heartbeat interval is known
+    hello: Event
     nursery: Nursery
+    #: runs the handlers, or None to start a task for every handler
+    dispatch_pool: Optional[DispatchPool]
     session_id: str
     client: 'Client'
+    #: the same codec as the connection, for the payloads sent
+    codec: Codec
 
-    @staticmethod
-    def encode(data: Dict[str, Any]) -> str:
-        return dumps(data)
+    def encode(self, data: Dict[str, Any]) -> ENCODED_TYPE:
+        return self.codec.encode(data)
 
     @staticmethod
     def frame(opcode: int, data: Any) -> Dict[str, Any]:
         return {'op': opcode, 'd': data}
 
     @property
-    def heartbeat_payload(self) -> str:
+    def heartbeat_payload(self) -> ENCODED_TYPE:
         self._last_heartbeat = current_time()
+        self.acknowledged = False
 
         return self.encode(self.frame(1, self.seq))
 
@@ -91,7 +119,6 @@ class GatewayStateMachine:
 
         elif opcode == 7:
             # uh oh... GatewayCode.reconnection time
-            # TODO: implement GatewayCode.reconnection
             return (GatewayCode.RECONNECT, self.session_id)
 
         elif opcode == 9:
@@ -107,9 +134,14 @@ class GatewayStateMachine:
             return (GatewayCode.NOTHING, None)
 
         elif opcode == 11:
+            self.acknowledged = True
+
             if self._last_heartbeat:
                 self.latency = current_time() - self._last_heartbeat
                 self._last_heartbeat = 0.0
+
+                if self.latencies is not None:
+                    self.latencies.record(self.latency)
             return (GatewayCode.NOTHING, None)
 
         raise GatewayError(
@@ -120,28 +152,66 @@ class GatewayStateMachine:
 
     def parse_hello(self, data: Dict[str, Any]) -> None:
         self.heartbeat_interval = data.get('heartbeat_interval', 42500) / 1000
+        self.hello.set()
 
     async def parse_ready(self, data: Dict[str, Any]) -> None:
         self.session_id = data.get('session_id', '')
 
         await sleep(0)
 
+    def policy(self, event: str) -> EventPolicy:
+        if self.dispatchers.get(event) or self.diff_dispatchers.get(event):
+            return EventPolicy.CONVERT
+
+        if event in self.client.cache.cached_events:
+            return EventPolicy.CACHE_ONLY
+
+        return EventPolicy.SKIP
+
     async def dispatch(self, event: str, data: Any) -> None:
+        # without handlers there's nothing to call, so CACHE_ONLY
+        # only converts, which updates the cache
+        if self.policy(event) == EventPolicy.SKIP:
+            return
+
         coros: List[DISPATCHER_TYPE] = self.dispatchers.get(event, [])
+        diff_coros: List[DIFF_DISPATCHER_TYPE] = self.diff_dispatchers.get(
+            event, []
+        )
+        key = dispatch_key(event, data)
+
+        # diffing costs a bit, so only do it if someone wants it
+        changes: Optional[ChangeSet] = ChangeSet() if diff_coros else None
 
+        raw = data
         conversion = conversion_table.get(event)
 
         if (isinstance(conversion, type)
            and issubclass(conversion, DataModelMixin)):
             data = conversion(self.client, data)  # type: ignore
-            data = data.uncache()
+            data = await data.uncache_async(changes)
+            self.client.refreshed(data)
         elif isinstance(conversion, type):
             data = conversion(data)
+            changes = None
         elif callable(conversion):
             data = conversion(self.client, data)
+            changes = None
+
+        if event in self.client.cache.cached_events:
+            self.client.cache.handle_event(event, raw, data)
 
         for coro in coros:
-            self.nursery.start_soon(coro, self.client, data)
+            await self.submit(key, coro, self.client, data)
+
+        for diff_coro in diff_coros:
+            await self.submit(key, diff_coro, self.client, data, changes)
+
+    async def submit(self, key: Any, coro: Any, *args: Any) -> None:
+        if self.dispatch_pool is None:
+            self.nursery.start_soon(coro, *args)
+        else:
+            await self.dispatch_pool.submit(key, coro, *args)
 
     @classmethod
     def connect(
@@ -149,17 +219,36 @@ class GatewayStateMachine:
         client: 'Client',
         nursery: Nursery,
         dispatchers: Optional[Dict[str, List[DISPATCHER_TYPE]]] = None,
+        diff_dispatchers: Optional[
+            Dict[str, List[DIFF_DISPATCHER_TYPE]]
+        ] = None,
+        codec: Optional[Codec] = None,
+        dispatch_pool: Optional[DispatchPool] = None,
+        latencies: Optional[LatencyHistogram] = None,
     ) -> 'GatewayStateMachine':
         return_class = cls()
 
         return_class.client = client
         return_class.nursery = nursery
-        return_class.dispatchers = dispatchers or {}
+        # not `or {}`: the client's own dicts, even empty, so
+        # handlers registered later are seen
+        if dispatchers is None:
+            dispatchers = {}
+        if diff_dispatchers is None:
+            diff_dispatchers = {}
+
+        return_class.dispatchers = dispatchers
+        return_class.diff_dispatchers = diff_dispatchers
         return_class.seq = None
         return_class._last_heartbeat = 0.0
         return_class.latency = None
+        return_class.latencies = latencies
+        return_class.acknowledged = True
+        return_class.hello = Event()
         return_class.session_id = ''
         return_class.heartbeat_interval = 42500 / 1000  # a sane default
+        return_class.codec = codec or find_codec('json')
+        return_class.dispatch_pool = dispatch_pool
 
         return return_class
 
@@ -169,9 +258,25 @@ class GatewayStateMachine:
         client: 'Client',
         nursery: Nursery,
         dispatchers: Optional[Dict[str, List[DISPATCHER_TYPE]]] = None,
-        session_id: str = ''
+        session_id: str = '',
+        diff_dispatchers: Optional[
+            Dict[str, List[DIFF_DISPATCHER_TYPE]]
+        ] = None,
+        codec: Optional[Codec] = None,
+        seq: Optional[int] = None,
+        dispatch_pool: Optional[DispatchPool] = None,
+        latencies: Optional[LatencyHistogram] = None,
     ) -> 'GatewayStateMachine':
-        return_class = cls.connect(client, nursery, dispatchers)
+        return_class = cls.connect(
+            client,
+            nursery,
+            dispatchers,
+            diff_dispatchers,
+            codec,
+            dispatch_pool,
+            latencies
+        )
         return_class.session_id = session_id
+        return_class.seq = seq
 
         return return_class
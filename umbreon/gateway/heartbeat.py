@@ -0,0 +1,62 @@
+from collections import deque
+from typing import Deque, Dict, Iterable, Optional
+
+#: upper bounds, in seconds, of the default histogram buckets
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class LatencyHistogram:
+    """
+    The latencies of the last `size` heartbeats of a connection, in
+    seconds. It outlives the state machine, so it survives resumes.
+    """
+    __slots__ = ('samples',)
+    samples: Deque[float]
+
+    def __init__(self, size: int = 128):
+        self.samples = deque(maxlen=size)
+
+    def record(self, latency: float) -> None:
+        self.samples.append(latency)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """The nearest-rank `percent`th percentile, if there's a sample."""
+        if not self.samples:
+            return None
+
+        ordered = sorted(self.samples)
+        rank = max(round(percent / 100 * len(ordered)), 1)
+
+        return ordered[min(rank, len(ordered)) - 1]
+
+    @property
+    def p50(self) -> Optional[float]:
+        return self.percentile(50)
+
+    @property
+    def p99(self) -> Optional[float]:
+        return self.percentile(99)
+
+    def buckets(self,
+                bounds: Iterable[float] = BUCKETS) -> Dict[float, int]:
+        """How many samples fall under every bound, and above the last."""
+        counts = {bound: 0 for bound in sorted(bounds)}
+        counts[float('inf')] = 0
+
+        for sample in self.samples:
+            for bound in counts:
+                if sample <= bound:
+                    counts[bound] += 1
+                    break
+
+        return counts
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def __repr__(self) -> str:
+        if not self.samples:
+            return '<LatencyHistogram empty>'
+
+        return (f'<LatencyHistogram p50={self.p50 * 1000:.0f}ms '
+                f'p99={self.p99 * 1000:.0f}ms over {len(self)} beats>')
@@ -0,0 +1,214 @@
+"""
+Records gateway traffic, and replays it without a network.
+
+Pass `record='path'` to `GatewayConnection` (or `start_gateway`) and
+every websocket message is written to `path` as it was received, so
+still compressed. `replay(client, path)` feeds a recording through the
+same decompressor, codec and `GatewayStateMachine.process` as a live
+connection, and reports how fast that went.
+
+The layout is:
+    MAGIC, then a little-endian u32 header length and the JSON header
+    `{"encoding": ..., "compress": ...}`, then records of an f64
+    timestamp (seconds since recording started), a u8 kind and a u32
+    length, followed by the message.
+"""
+import json
+import mmap
+import os
+import struct
+from enum import IntEnum
+from typing import (Any, BinaryIO, Dict, Iterator, Optional, Tuple, Union,
+                    TYPE_CHECKING)
+
+import trio
+
+from .codecs import find_codec
+from .decompressor import ZlibStream
+from .dispatch_pool import DispatchPool
+from .gateway_state_machine import GatewayStateMachine
+
+if TYPE_CHECKING:
+    from .. import Client
+
+MAGIC = b'UMBRREC1'
+HEADER = struct.Struct('<I')
+RECORD = struct.Struct('<dBI')
+
+
+class RecordKind(IntEnum):
+    BINARY = 0
+    TEXT = 1
+    #: a new websocket, so a new zlib stream
+    CONNECTED = 2
+
+
+class RecordingError(Exception):
+    pass
+
+
+class Recorder:
+    __slots__ = ('file', 'started')
+    file: BinaryIO
+    started: float
+
+    def __init__(self, path: str, encoding: str, compress: bool):
+        self.file = open(path, 'wb')
+        self.started = trio.current_time()
+
+        header = json.dumps({
+            'encoding': encoding,
+            'compress': compress
+        }).encode('utf-8')
+
+        self.file.write(MAGIC)
+        self.file.write(HEADER.pack(len(header)))
+        self.file.write(header)
+
+    def write(self, message: Union[str, bytes]) -> None:
+        if isinstance(message, str):
+            self.append(RecordKind.TEXT, message.encode('utf-8'))
+        else:
+            self.append(RecordKind.BINARY, message)
+
+    def connected(self) -> None:
+        self.append(RecordKind.CONNECTED, b'')
+
+    def append(self, kind: RecordKind, data: bytes) -> None:
+        elapsed = trio.current_time() - self.started
+        self.file.write(RECORD.pack(elapsed, kind, len(data)))
+        self.file.write(data)
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def read(path: str) -> Tuple[Dict[str, Any],
+                             Iterator[Tuple[float, RecordKind, bytes]]]:
+    """The header of the recording at `path`, and its records."""
+    file = open(path, 'rb')
+
+    if os.fstat(file.fileno()).st_size < len(MAGIC) + HEADER.size:
+        file.close()
+        raise RecordingError(f'{path} is not a gateway recording.')
+
+    data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(data)
+
+    if bytes(view[:len(MAGIC)]) != MAGIC:
+        view.release()
+        data.close()
+        file.close()
+        raise RecordingError(f'{path} is not a gateway recording.')
+
+    offset = len(MAGIC)
+    header_length, = HEADER.unpack_from(view, offset)
+    offset += HEADER.size
+    header = json.loads(bytes(view[offset:offset + header_length]))
+    offset += header_length
+
+    def records() -> Iterator[Tuple[float, RecordKind, bytes]]:
+        position = offset
+
+        try:
+            while position < len(view):
+                elapsed, kind, length = RECORD.unpack_from(view, position)
+                position += RECORD.size
+
+                yield (elapsed, RecordKind(kind),
+                       bytes(view[position:position + length]))
+                position += length
+        finally:
+            view.release()
+            data.close()
+            file.close()
+
+    return header, records()
+
+
+class ReplayStats:
+    __slots__ = ('payloads', 'events', 'received_bytes', 'seconds')
+    payloads: int
+    #: how many of the payloads were dispatches (op 0)
+    events: int
+    #: bytes as received, so compressed if the recording is
+    received_bytes: int
+    seconds: float
+
+    def __init__(self):
+        self.payloads = 0
+        self.events = 0
+        self.received_bytes = 0
+        self.seconds = 0.0
+
+    @property
+    def events_per_second(self) -> float:
+        return self.events / self.seconds if self.seconds else 0.0
+
+    def __repr__(self) -> str:
+        return (f'<ReplayStats {self.events} events in {self.seconds:.3f}s, '
+                f'{self.events_per_second:,.0f} events/sec>')
+
+
+async def replay(client: 'Client',
+                 path: str,
+                 realtime: bool = False,
+                 codec: Optional[str] = None,
+                 workers: int = 8,
+                 queue_size: int = 256) -> ReplayStats:
+    """
+    Plays the recording at `path` into `client`, calling its handlers
+    and filling its cache. With `realtime`, messages are spaced out
+    like they were received, otherwise it goes as fast as it can.
+    Handlers run on a `DispatchPool` of `workers` like a connection's,
+    and the ones still running when the recording ends are waited for.
+    """
+    header, records = read(path)
+    stats = ReplayStats()
+    decompressor = ZlibStream() if header.get('compress') else None
+    decode = find_codec(header.get('encoding', 'json'), codec).decode
+    # never dropping calls, so a replay always calls the same handlers
+    dispatch_pool = DispatchPool(workers, queue_size)
+
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(dispatch_pool.run)
+
+        state = GatewayStateMachine.connect(
+            client,
+            nursery,
+            client.dispatchers,
+            client.diff_dispatchers,
+            dispatch_pool=dispatch_pool
+        )
+        started = trio.current_time()
+
+        for elapsed, kind, message in records:
+            if realtime:
+                await trio.sleep_until(started + elapsed)
+
+            if kind == RecordKind.CONNECTED:
+                if decompressor is not None:
+                    decompressor.reset()
+                continue
+
+            stats.received_bytes += len(message)
+            data: Optional[bytes] = message
+
+            if decompressor is not None:
+                data = decompressor.feed(message)
+                if data is None:
+                    continue
+
+            payload = decode(data)
+            stats.payloads += 1
+
+            if payload.get('op') == 0:
+                stats.events += 1
+
+            await state.process(payload)
+
+        dispatch_pool.close()
+
+    stats.seconds = trio.current_time() - started
+
+    return stats
@@ -0,0 +1,176 @@
+"""
+Runs several `GatewayConnection`s, each carrying the guilds of one shard.
+
+Discord puts a guild on shard `(guild_id >> 22) % shard_count`, and only
+lets a bot IDENTIFY `max_concurrency` shards every 5 seconds: shards
+whose `shard_id % max_concurrency` are equal share a slot.
+"""
+from math import inf
+from typing import Any, Dict, Iterable, List, Optional, TYPE_CHECKING
+
+import trio
+
+from .gateway_connection import GatewayConnection
+from .gateway_state_machine import GatewayError
+from .heartbeat import LatencyHistogram
+from ..http_base.routing_table import RoutingTable
+
+if TYPE_CHECKING:
+    from .. import Client
+
+IDENTIFY_INTERVAL = 5
+
+
+def shard_for(guild_id: int, shard_count: int) -> int:
+    return (guild_id >> 22) % shard_count
+
+
+class IdentifyLimiter:
+    """Spaces out IDENTIFYs the way Discord wants."""
+    __slots__ = ('max_concurrency', 'interval', 'locks', 'last_identify')
+    max_concurrency: int
+    interval: float
+    locks: Dict[int, trio.Lock]
+    last_identify: Dict[int, float]
+
+    def __init__(self,
+                 max_concurrency: int = 1,
+                 interval: float = IDENTIFY_INTERVAL):
+        self.max_concurrency = max_concurrency
+        self.interval = interval
+        self.locks = {}
+        self.last_identify = {}
+
+    async def acquire(self, shard_id: int) -> None:
+        """Waits until `shard_id` may send its IDENTIFY."""
+        key = shard_id % self.max_concurrency
+        lock = self.locks.get(key)
+
+        if lock is None:
+            lock = self.locks[key] = trio.Lock()
+
+        async with lock:
+            ready_at = self.last_identify.get(key, -inf) + self.interval
+            await trio.sleep_until(max(ready_at, trio.current_time()))
+            self.last_identify[key] = trio.current_time()
+
+
+class ShardManager:
+    """
+    Owns the connections of `shard_ids` out of `shard_count` shards.
+    They all share the client, and so its `http` ratelimits and cache.
+    """
+    __slots__ = ('client', 'nursery', 'shard_count', 'shard_ids',
+                 'limiter', 'connections', 'connection_kwargs')
+    client: 'Client'
+    nursery: trio.Nursery
+    shard_count: int
+    shard_ids: List[int]
+    limiter: IdentifyLimiter
+    connections: Dict[int, GatewayConnection]
+    connection_kwargs: Dict[str, Any]
+
+    def __init__(self,
+                 client: 'Client',
+                 nursery: trio.Nursery,
+                 shard_count: int,
+                 shard_ids: Optional[Iterable[int]] = None,
+                 max_concurrency: int = 1,
+                 identify_limiter: Optional[IdentifyLimiter] = None,
+                 **connection_kwargs: Any):
+        self.client = client
+        self.nursery = nursery
+        self.shard_count = shard_count
+        self.shard_ids = sorted(
+            range(shard_count) if shard_ids is None else shard_ids
+        )
+        self.limiter = identify_limiter or IdentifyLimiter(max_concurrency)
+        self.connections = {}
+        self.connection_kwargs = connection_kwargs
+
+        if any(not 0 <= n < shard_count for n in self.shard_ids):
+            raise UserWarning(
+                f'Shard ids should be between 0 and {shard_count - 1}.'
+            )
+
+    @classmethod
+    async def recommended(cls,
+                          client: 'Client',
+                          nursery: trio.Nursery,
+                          **connection_kwargs: Any) -> 'ShardManager':
+        """A manager for as many shards as Discord recommends."""
+        response = await client.http.request(RoutingTable.get_gateway_bot)
+
+        if response.status_code != 200:
+            raise GatewayError(
+                f'Could not get the recommended shards, '
+                f'got a {response.status_code}.'
+            )
+
+        data = response.json()
+
+        url = data.get('url')
+        if url and 'url' not in connection_kwargs:
+            connection_kwargs['url'] = url.rstrip('/') + '/'
+
+        return cls(
+            client,
+            nursery,
+            data.get('shards', 1),
+            max_concurrency=data.get('session_start_limit', {}).get(
+                'max_concurrency', 1
+            ),
+            **connection_kwargs
+        )
+
+    async def start(self) -> None:
+        # every websocket opens at once, and `limiter` spaces out the
+        # IDENTIFYs of shards which share a slot
+        connections = []
+
+        for shard_id in self.shard_ids:
+            connection = GatewayConnection(
+                self.client._token,
+                self.nursery,
+                self.client,
+                self.client.dispatchers,
+                diff_dispatchers=self.client.diff_dispatchers,
+                shard=(shard_id, self.shard_count),
+                identify_limiter=self.limiter,
+                **self.connection_kwargs
+            )
+            self.connections[shard_id] = connection
+            connections.append(connection)
+
+        async with trio.open_nursery() as starting:
+            for connection in connections:
+                starting.start_soon(connection.connect)
+
+    def shard_for(self, guild_id: int) -> int:
+        return shard_for(guild_id, self.shard_count)
+
+    def connection_for(self, guild_id: int) -> Optional[GatewayConnection]:
+        """The connection carrying `guild_id`, if this process runs it."""
+        return self.connections.get(self.shard_for(guild_id))
+
+    @property
+    def latencies(self) -> Dict[int, Optional[float]]:
+        """The latest heartbeat latency of every shard, in seconds."""
+        return {
+            shard_id: connection.state.latency
+            for shard_id, connection in self.connections.items()
+        }
+
+    @property
+    def histograms(self) -> Dict[int, LatencyHistogram]:
+        """The rolling heartbeat latency histogram of every shard."""
+        return {
+            shard_id: connection.latencies
+            for shard_id, connection in self.connections.items()
+        }
+
+    @property
+    def latency(self) -> Optional[float]:
+        """The average heartbeat latency of the shards, in seconds."""
+        known = [n for n in self.latencies.values() if n is not None]
+        return sum(known) / len(known) if known else None
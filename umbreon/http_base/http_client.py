@@ -1,16 +1,56 @@
 from .http import HTTPMethod
 from .route import RouteData, SentDataType, ExternalException
-from .ratelimit import Ratelimit
+from .ratelimit import Container, Ratelimit
+from .scheduler import Priority, Scheduler
 from ..structures import Snowflake
 from asks import Session  # type: ignore
 import trio
-from typing import Optional, Dict, Any, Union, Tuple, cast
+from math import inf
+from typing import Optional, Dict, Any, Hashable, Union, Tuple, cast
+
+
+class Flight:
+    """A GET in flight, which identical GETs wait on instead."""
+    __slots__ = ('done', 'response')
+    done: trio.Event
+    #: None if the request failed, or was cancelled
+    response: Any
+
+    def __init__(self):
+        self.done = trio.Event()
+        self.response = None
+
+
+def flight_key(url: str,
+               data: Optional[Dict[str, Any]]) -> Optional[Hashable]:
+    """What identical GETs have in common, if it can be a key."""
+    if not data:
+        return url
+
+    try:
+        query = tuple(sorted(data.items()))
+        hash(query)
+    except TypeError:
+        return None
+
+    return url, query
 
 
 class HTTPClient:
-    __slots__ = ('session', 'ratelimits')
+    __slots__ = ('session', 'ratelimits', 'scheduler',
+                 'next_collection', 'flights')
     session: Session
+    #: by Discord's bucket, or by route until that's known
     ratelimits: Dict[str, Ratelimit]
+    #: the global ratelimit, by priority
+    scheduler: Scheduler
+    #: when expired containers are next dropped, on the trio clock
+    next_collection: float
+    #: the GETs in flight, by `flight_key` and priority
+    flights: Dict[Hashable, Flight]
+
+    #: how often, in seconds, expired containers are dropped
+    COLLECT_INTERVAL = 60
 
     def __init__(self, token: str, session: Optional[Session] = None):
         self.session = session or Session(
@@ -20,10 +60,94 @@ class HTTPClient:
             }
         )
 
-        self.ratelimits = {
-            '': Ratelimit(),
-            'global': Ratelimit(50, 1)
-        }
+        self.ratelimits = {}
+        self.scheduler = Scheduler()
+        self.next_collection = -inf
+        self.flights = {}
+
+    def ratelimit(self, route: RouteData) -> Ratelimit:
+        now = trio.current_time()
+
+        if now >= self.next_collection:
+            self.collect(now)
+
+        key = route.hash or f'{route.method.value} {route.route}'
+        ratelimit = self.ratelimits.get(key)
+
+        if ratelimit is None:
+            ratelimit = self.ratelimits[key] = Ratelimit()
+
+        return ratelimit
+
+    def collect(self, now: Optional[float] = None) -> int:
+        """Drops the containers that are back to new, returns how many."""
+        if now is None:
+            now = trio.current_time()
+
+        self.next_collection = now + self.COLLECT_INTERVAL
+
+        return sum(
+            ratelimit.collect(now)
+            for ratelimit in self.ratelimits.values()
+        )
+
+    @property
+    def tracked_buckets(self) -> int:
+        """How many containers the ratelimits are keeping."""
+        return sum(
+            len(ratelimit.containers)
+            for ratelimit in self.ratelimits.values()
+        )
+
+    def learn(self,
+              route: RouteData,
+              ratelimit: Ratelimit,
+              container: Container,
+              sent: float,
+              resp: Any) -> None:
+        """Updates the ratelimits from the headers of `resp`."""
+        headers = resp.headers
+        bucket = headers.get('X-RateLimit-Bucket')
+
+        if bucket is None or 'X-RateLimit-Limit' not in headers:
+            if 200 <= resp.status_code < 300:
+                ratelimit.update(container, None, 0, 0, sent)
+            else:
+                # a global 429, or an error from before Discord (like a
+                # Cloudflare 502), says nothing about the bucket
+                ratelimit.release(container)
+            return
+
+        if route.hash != bucket:
+            # the containers waited on so far are now the bucket's, so
+            # requests already queued and the ones after share them
+            self.ratelimits.pop(
+                route.hash or f'{route.method.value} {route.route}',
+                None
+            )
+            route.hash = bucket
+            previous = ratelimit
+            ratelimit = self.ratelimits.get(bucket) or previous
+
+            for major_params, moved in previous.containers.items():
+                kept = ratelimit.containers.setdefault(major_params, moved)
+
+                if kept is not moved:
+                    # another route of the bucket got there first
+                    ratelimit.merge(moved, kept)
+
+                    if moved is container:
+                        container = kept
+
+            self.ratelimits[bucket] = ratelimit
+
+        ratelimit.update(
+            container,
+            int(headers['X-RateLimit-Limit']),
+            int(headers['X-RateLimit-Remaining']),
+            float(headers['X-RateLimit-Reset-After']),
+            sent
+        )
 
     async def request(
         self,
@@ -31,33 +155,92 @@ class HTTPClient:
                      Tuple[HTTPMethod, str, SentDataType],
                      Tuple[HTTPMethod, str]],
         data: Optional[Dict[str, Any]] = None,
-        exponential_backoff_counter: int = 0,
+        priority: Priority = Priority.NORMAL,
         **kwargs: Union[int, Snowflake]
     ) -> Any:
+        """
+        Sends a request to `route`, filled in with `kwargs`. Higher
+        `priority` requests are sent first when the global ratelimit
+        has more waiting than it lets through.
+        """
         route = cast(RouteData, route)  # mypy + dynamic metaclasses don't mix
 
-        # make sure that global ratelimiting is done
-        await self.ratelimits.get('global', Ratelimit(50, 1)).acquire()
-
         url = route.route.format(**kwargs)
 
-        # NOTE: this ratelimits a few times if you request
-        #  more than the ratelimit allows all on the same
-        #  major param, but this relatively minor thing that
-        #  is automatically corrected is not worth making
-        #  the unlimited bucket synchronous / allow only one
-        #  request at a time.
+        if route.method != HTTPMethod.GET:
+            return await self.send(route, url, data, priority, **kwargs)
+
+        # identical GETs at the same time get the same response,
+        # which only uses the ratelimits once
+        key = flight_key(url, data)
+
+        if key is None:
+            return await self.send(route, url, data, priority, **kwargs)
+
+        # only a flight at least as urgent is waited on, so a
+        # high priority GET isn't stuck behind a low priority one
+        flight = self.flight(key, priority)
+
+        while flight is not None:
+            await flight.done.wait()
+
+            if flight.response is not None:
+                return flight.response
+
+            # it failed there, so try again here
+            flight = self.flight(key, priority)
+
+        key = key, priority
+        flight = self.flights[key] = Flight()
+
+        try:
+            flight.response = await self.send(
+                route, url, data, priority, **kwargs
+            )
+        finally:
+            del self.flights[key]
+            flight.done.set()
+
+        return flight.response
+
+    def flight(self,
+               key: Hashable,
+               priority: Priority) -> Optional[Flight]:
+        """The flight of `key` at `priority` or a higher one, if any."""
+        for level in Priority:
+            if level > priority:
+                return None
+
+            flight = self.flights.get((key, level))
+
+            if flight is not None:
+                return flight
+
+        return None
+
+    async def send(
+        self,
+        route: RouteData,
+        url: str,
+        data: Optional[Dict[str, Any]] = None,
+        priority: Priority = Priority.NORMAL,
+        **kwargs: Union[int, Snowflake]
+    ) -> Any:
         major_params = tuple(
-            v.id if isinstance(v, Snowflake) else v
-            for k, v in kwargs.items() if k in
+            int(v) for k, v in kwargs.items() if k in
             [
                 'channel_id',
                 'guild_id',
                 'webhook_id'
             ]
         )
-        bucket = self.ratelimits.get(route.hash, Ratelimit())
-        await bucket.acquire(major_params)
+
+        # requests take turns by guild when they can't all go at once
+        fair_key = next(
+            (int(kwargs[k]) for k in ('guild_id', 'channel_id', 'webhook_id')
+             if k in kwargs),
+            None
+        )
 
         # asks requires differently named kwargs
         # for different types of data: this isn't
@@ -79,37 +262,38 @@ class HTTPClient:
         if not data:
             asks_kwargs = {}
 
-        resp = await self.session.request(
-            route.method.value,
-            url,
-            **asks_kwargs
-        )
+        while True:
+            ratelimit = self.ratelimit(route)
+            container = ratelimit.container(major_params)
 
-        # if we are globally ratelimited,
-        # reschedule the request, and
-        # make sure the locally stored
-        # global ratelimit is representative
-        # of what is on discord's end
-        if resp.headers.get('X-RateLimit-Global'):
-            if not self.ratelimits.get('global'):
-                # this might have been the problem
-                self.ratelimits['global'] = Ratelimit(50, 1, (), 50)
-            else:
-                self.ratelimits['global'].containers[()].uses = 50
-
-            await trio.sleep(2 ** exponential_backoff_counter)
-            return await self.request(
-                route,
-                data,
-                exponential_backoff_counter + 1,
-                **kwargs
-            )
+            sent = await ratelimit.acquire(container)
+
+            if sent is None:
+                # its bucket was found, look for the container there
+                continue
+
+            try:
+                # the global turn is taken last, so it isn't held
+                # (and others' with it) while the bucket is waited on
+                await self.scheduler.acquire(priority, fair_key)
+                resp = await self.session.request(
+                    route.method.value,
+                    url,
+                    **asks_kwargs
+                )
+            except BaseException:
+                ratelimit.release(container)
+                raise
+
+            self.learn(route, ratelimit, container, sent, resp)
 
-        # if we were ratelimited (not globally though
-        # as that was sifted out above), then just
-        # check for a Discord outage or Cloudflare
-        # ban or something, and reschedule
-        if resp.status_code == 429:
+            if resp.status_code != 429:
+                return resp
+
+            # if we were ratelimited, check for a
+            # Discord outage or Cloudflare ban or
+            # something, otherwise wait as long as
+            # Discord says and try again
             if not resp.headers.get('Via'):
                 raise ExternalException(
                     # external error haiku
@@ -118,57 +302,18 @@ class HTTPClient:
                     'One of them is wack.'
                 )
 
-            # ratelimited! try again, hopefully
-            # something better will happen...
-
-            # make sure that the api doesn't get DoSed
-            await trio.sleep(2 ** (exponential_backoff_counter - 3))
-            return await self.request(
-                route,
-                data,
-                exponential_backoff_counter + 1,
-                **kwargs
-            )
-
-        # this gets run every time, but I have no idead
-        # whether one of these signals the rest is present
-        ratelimit_headers_present = (
-            resp.headers.get('X-RateLimit-Bucket')
-            and resp.headers.get('X-RateLimit-Limit')
-            and resp.headers.get('X-RateLimit-Reset-After')
-            and resp.headers.get('X-RateLimit-Remaining')
-        )
-
-        # if this is the first request with ratelimit
-        # headers present, update which bucket this Route
-        # points to and update said bucket too.
-        if route.hash == '' and ratelimit_headers_present:
-            route.hash = resp.headers['X-Ratelimit-Bucket']
-            previous_requests = (int(resp.headers['X-RateLimit-Limit'])
-                                 - int(resp.headers['X-RateLimit-Remaining']))
-
-            if not self.ratelimits.get(route.hash):
-                bucket = Ratelimit(
-                    int(resp.headers['X-RateLimit-Limit']),
-                    int(resp.headers['X-RateLimit-Reset-After']),
-                    tuple(major_params),
-                    previous_requests
-                )
-                self.ratelimits[route.hash] = bucket
+            deadline = trio.current_time() + retry_after(resp)
 
-            if previous_requests > 1:
-                # uh oh someone's been here, our refresh time is off
-                route.resets_in_complete = False
+            if resp.headers.get('X-RateLimit-Global'):
+                self.scheduler.block_until(deadline)
             else:
-                route.resets_in_complete = True
-
-        if not route.resets_in_complete and ratelimit_headers_present:
-            previous_requests = (int(resp.headers['X-RateLimit-Limit'])
-                                 - int(resp.headers['X-RateLimit-Remaining']))
+                ratelimit.block_until(container, deadline)
 
-            if previous_requests == 1:
-                route.resets_in_complete = True
-                new_refresh = resp.headers['X-RateLimit-Reset-After']
-                self.ratelimits[route.hash].refresh = new_refresh
 
-        return resp
+def retry_after(resp: Any) -> float:
+    """How long a 429 says to wait, in seconds."""
+    try:
+        # milliseconds, with more precision than the header
+        return float(resp.json()['retry_after']) / 1000
+    except (ValueError, KeyError, TypeError):
+        return float(resp.headers.get('Retry-After', 1))
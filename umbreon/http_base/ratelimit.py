@@ -1,87 +1,207 @@
 """
-Not a good implementation of a ratelimiter,
-but at this point I just need to get an alpha
-out. Contributions very welcomed, even if you
-replace this whole file! Even if the api to
-use changes, anything is better than *this*.
+Ratelimits, driven by Discord's `X-RateLimit-*` headers.
+
+Discord groups routes into buckets, and limits every bucket separately
+for each major parameter (channel, guild or webhook). A `Ratelimit` is
+one bucket and its `Container`s the state for each major parameter.
+Requests queue in `acquire` until there's room, instead of finding
+out from a 429. Until a route's bucket is known, only one of its
+requests is in flight at a time, and its response tells the rest.
 """
+import sys
+from math import inf
+from typing import Dict, Optional, Tuple
 
 import trio
 
-from typing import Optional, Tuple, Dict
+#: what a route without ratelimit headers is limited to
+UNLIMITED = sys.maxsize
 
 
-class Container:
-    __slots__ = ('_uses', 'last_use', 'sleepers')
-    _uses: int
-    last_use: float
-    sleepers: int
-
-    def __init__(self, uses: int = 1):
-        self._uses = uses
-        self.sleepers = 0
-
-        if uses > 0:
-            self.last_use = trio.current_time()
-        else:
-            self.last_use = 0
+class Waiters:
+    """The queue of a container, only there while requests wait."""
+    __slots__ = ('lock', 'updated')
+    #: first come first served, whatever their `Priority`: that's only
+    #: for the global ratelimit, which is waited on after the bucket
+    lock: trio.Lock
+    #: set (and replaced) when a response updates the container
+    updated: trio.Event
 
-    @property
-    def uses(self) -> int:
-        return self._uses
+    def __init__(self):
+        self.lock = trio.Lock()
+        self.updated = trio.Event()
 
-    @uses.setter
-    def uses(self, value: int) -> None:
-        if self.uses <= 0 and value > 0:
-            self.last_use = trio.current_time()
 
-        self._uses = value
-
-    def reset(self, to: int = 1) -> None:
-        self.uses = to
-        self.last_use = trio.current_time()
+class Container:
+    __slots__ = ('remaining', 'reset_at', 'opened', 'waiters', 'merged')
+    remaining: int
+    #: when `remaining` goes back to the limit, on the trio clock, or
+    #: inf until a response says when the current window ends
+    reset_at: float
+    #: when the current window was started here, or -inf if no
+    #: response has said anything yet
+    opened: float
+    waiters: Optional[Waiters]
+    #: the container its requests go to instead, once its route's
+    #: bucket turned out to have one for the same major params
+    merged: Optional['Container']
+
+    def __init__(self, limit: Optional[int] = None):
+        self.waiters = None
+        self.merged = None
+
+        if limit is None:
+            # the first request finds out
+            self.remaining = 1
+            self.reset_at = inf
+            self.opened = -inf
+        elif limit == UNLIMITED:
+            self.remaining = UNLIMITED
+            self.reset_at = self.opened = -inf
+        else:
+            self.remaining = limit
+            self.reset_at = inf
+            self.opened = trio.current_time()
 
 
 class Ratelimit:
-    __slots__ = ('limit', 'refresh', 'containers', 'cushion')
-    limit: int
-    refresh: int
-    #: Because networks are totally reliable :tm:
-    cushion: float
-    #: The tuple should be (user_id, channel_id, guild_id), but
+    """
+    A bucket. Its containers are dropped by `collect` once their
+    window is over and nothing waits on them, as a new one starts out
+    the same, so there are only as many as recently used major params.
+    """
+    __slots__ = ('limit', 'containers')
+    #: None until a response says what it is
+    limit: Optional[int]
+    #: The tuple should be (channel_id, guild_id, webhook_id), but
     #: if a field is not present the tuple should not contain it.
     containers: Dict[Tuple[int, ...], Container]
 
-    def __init__(self,
-                 limit: int = 1,
-                 refresh: int = 0,
-                 initial_request: Optional[Tuple[int, ...]] = None,
-                 initial_requests: int = 1,
-                 cushion: float = 0.1):
+    def __init__(self, limit: Optional[int] = None):
         self.limit = limit
-        self.refresh = refresh
-        self.cushion = cushion
-
-        if not initial_request:
-            self.containers = {}
+        self.containers = {}
+
+    def container(self, major_params: Tuple[int, ...] = ()) -> Container:
+        container = self.containers.get(major_params)
+
+        if container is None:
+            container = self.containers[major_params] = Container(self.limit)
+
+        return container
+
+    def take(self, container: Container) -> bool:
+        # a window can end with uses left, and the next one's reset
+        # is only learned if it's started over (unlimited ones never are)
+        if container.reset_at != -inf \
+                and trio.current_time() >= container.reset_at:
+            container.remaining = self.limit or 1
+            container.reset_at = inf
+            container.opened = trio.current_time()
+
+        if container.remaining > 0:
+            container.remaining -= 1
+            return True
+
+        return False
+
+    async def acquire(self, container: Container) -> Optional[float]:
+        """
+        Waits for a use of `container`, and returns when it was given,
+        or None if it was merged into another one in the meantime.
+        """
+        if container.waiters is None and self.take(container):
+            # keep with trio conventions
+            await trio.sleep(0)
+            return trio.current_time()
+
+        if container.waiters is None:
+            container.waiters = Waiters()
+
+        waiters = container.waiters
+
+        try:
+            async with waiters.lock:
+                while container.merged is None and not self.take(container):
+                    # until the reset, or until a response says more
+                    with trio.move_on_at(container.reset_at):
+                        await waiters.updated.wait()
+
+                if container.merged is not None:
+                    return None
+
+                return trio.current_time()
+        finally:
+            # the lock goes straight to the next waiter, if there is one
+            if not waiters.lock.locked():
+                container.waiters = None
+
+    def update(self,
+               container: Container,
+               limit: Optional[int],
+               remaining: int,
+               reset_after: float,
+               sent: float) -> None:
+        """
+        Takes in the headers of the response to a request `sent` at
+        some time, with `limit` None if there were none.
+        """
+        if limit is None:
+            self.limit = container.remaining = UNLIMITED
+            container.reset_at = -inf
         else:
-            self.containers = {initial_request: Container(initial_requests)}
-
-    async def acquire(self, request: Optional[Tuple[int, ...]] = None) -> None:
-        if request is None:
-            request = ()
-
-        if request not in self.containers:
-            self.containers[request] = Container(0)
-
-        self.containers[request].uses += 1
-
-        if self.containers[request].uses > self.limit:
-            await trio.sleep_until(
-                self.containers[request].last_use + self.refresh + self.cushion
-            )
-
-            self.containers[request].reset()
-
-        # keep with trio conventions
-        await trio.sleep(0)
+            self.limit = limit
+
+            if container.opened == -inf:
+                # only one request was in flight
+                container.remaining = remaining
+                container.reset_at = trio.current_time() + reset_after
+                container.opened = sent
+            elif sent >= container.opened:
+                # responses arrive in any order, so trust the lowest,
+                # and ones from before the window tell nothing about it
+                container.remaining = min(container.remaining, remaining)
+
+                if container.reset_at == inf:
+                    container.reset_at = trio.current_time() + reset_after
+
+        self.wake(container)
+
+    def block_until(self, container: Container, deadline: float) -> None:
+        """Lets nothing through until `deadline`, like after a 429."""
+        container.remaining = 0
+
+        if container.reset_at == inf or deadline > container.reset_at:
+            container.reset_at = deadline
+
+        self.wake(container)
+
+    def merge(self, container: Container, into: Container) -> None:
+        """Sends whatever waits on `container` to wait on `into`."""
+        container.merged = into
+        self.wake(container)
+
+    def release(self, container: Container) -> None:
+        """Gives back a use that never reached Discord."""
+        container.remaining += 1
+        self.wake(container)
+
+    @staticmethod
+    def wake(container: Container) -> None:
+        waiters = container.waiters
+
+        if waiters is not None:
+            waiters.updated.set()
+            waiters.updated = trio.Event()
+
+    def collect(self, now: float) -> int:
+        """Drops the containers that are back to new, returns how many."""
+        expired = [
+            major_params
+            for major_params, container in self.containers.items()
+            if container.waiters is None and now >= container.reset_at
+        ]
+
+        for major_params in expired:
+            del self.containers[major_params]
+
+        return len(expired)
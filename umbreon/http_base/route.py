@@ -15,15 +15,12 @@ class ExternalException(UserWarning):
 
 
 class RouteData:
-    __slots__ = ('hash', 'method', 'route',
-                 'datatype', 'resets_in_complete')
+    __slots__ = ('hash', 'method', 'route', 'datatype')
+    #: Discord's ratelimit bucket, empty until a response says
     hash: str
     method: HTTPMethod
     route: str
     datatype: SentDataType
-    #: Sometimes, you bump into an already used ratelimit.
-    #: We have this to track that our "refresh" time is correct.
-    resets_in_complete: bool
 
     def __init__(
         self,
@@ -35,4 +32,3 @@ class RouteData:
         self.method = method
         self.route = API_BASE + route
         self.datatype = datatype
-        self.resets_in_complete = False
@@ -152,6 +152,10 @@ class RoutingTable(metaclass=RoutingMeta):
     tokened_modify_webhook = h.PATCH, '/webhooks/{webhook_id}/{webhook_token}'
     tokened_delete_webhook = h.DELETE, '/webhooks/{webhook_id}/{webhook_token}'
 
+    # gateway routes
+    get_gateway = h.GET, '/gateway'
+    get_gateway_bot = h.GET, '/gateway/bot'
+
     # audit log routes
     # TODO: Audit Log stuctures
     get_audit_log = h.GET, '/guilds/{guild_id}/audit-logs'
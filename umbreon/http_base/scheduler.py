@@ -0,0 +1,154 @@
+"""
+Hands out the global ratelimit, by priority and fairly across guilds.
+
+Every request waits for one of the `limit` sends Discord allows every
+`period` before it waits on its bucket. Higher priorities always go
+first, so a backlog of `Priority.LOW` work only gets what's left over.
+Within a priority, every guild (or channel, or webhook) takes its turn,
+so one busy guild can't hold up the rest.
+"""
+from collections import OrderedDict, deque
+from enum import IntEnum
+from math import inf
+from typing import Deque, Dict, Hashable, Optional
+
+import trio
+
+
+class Priority(IntEnum):
+    #: replies to users and the like, whose latency is noticed
+    HIGH = 0
+    NORMAL = 1
+    #: bulk edits, scraping, anything that can wait
+    LOW = 2
+
+
+class Waiter:
+    __slots__ = ('granted', 'woken')
+    granted: bool
+    woken: trio.Event
+
+    def __init__(self):
+        self.granted = False
+        self.woken = trio.Event()
+
+
+class Scheduler:
+    __slots__ = ('limit', 'period', 'remaining', 'reset_at',
+                 'queues', 'queued', 'timer')
+    limit: int
+    period: float
+    remaining: int
+    reset_at: float
+    #: priority -> fairness key -> waiters, the keys in turn order
+    queues: Dict[Priority, 'OrderedDict[Optional[Hashable], Deque[Waiter]]']
+    queued: int
+    #: the one waiter which wakes up for the reset, so not all of them do
+    timer: Optional[Waiter]
+
+    def __init__(self, limit: int = 50, period: float = 1):
+        self.limit = limit
+        self.period = period
+        self.remaining = limit
+        self.reset_at = -inf
+        self.queues = {priority: OrderedDict() for priority in Priority}
+        self.queued = 0
+        self.timer = None
+
+    def take(self) -> bool:
+        now = trio.current_time()
+
+        if now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = now + self.period
+
+        if self.remaining > 0:
+            self.remaining -= 1
+            return True
+
+        return False
+
+    def grant(self) -> None:
+        """Gives what's left of the limit to the next waiters in turn."""
+        for priority in Priority:
+            queue = self.queues[priority]
+
+            while queue:
+                if not self.take():
+                    return
+
+                key, waiters = next(iter(queue.items()))
+                waiter = waiters.popleft()
+                self.queued -= 1
+
+                if waiters:
+                    queue.move_to_end(key)
+                else:
+                    del queue[key]
+
+                waiter.granted = True
+                waiter.woken.set()
+
+    async def acquire(self,
+                      priority: Priority = Priority.NORMAL,
+                      key: Optional[Hashable] = None) -> None:
+        """Waits for a send, behind other requests with the same `key`."""
+        if not self.queued and self.take():
+            # keep with trio conventions
+            await trio.sleep(0)
+            return
+
+        waiter = Waiter()
+        self.queues[priority].setdefault(key, deque()).append(waiter)
+        self.queued += 1
+
+        try:
+            while True:
+                self.grant()
+
+                if waiter.granted:
+                    return
+
+                if self.timer is None:
+                    self.timer = waiter
+
+                deadline = self.reset_at if self.timer is waiter else inf
+
+                with trio.move_on_at(deadline):
+                    await waiter.woken.wait()
+
+                waiter.woken = trio.Event()
+        except BaseException:
+            if waiter.granted:
+                self.remaining += 1  # never sent
+            else:
+                self.forget(priority, key, waiter)
+            raise
+        finally:
+            if self.timer is waiter:
+                self.timer = None
+                self.wake_any()
+
+    def forget(self,
+               priority: Priority,
+               key: Optional[Hashable],
+               waiter: Waiter) -> None:
+        queue = self.queues[priority]
+        waiters = queue[key]
+        waiters.remove(waiter)
+        self.queued -= 1
+
+        if not waiters:
+            del queue[key]
+
+    def wake_any(self) -> None:
+        """Wakes a waiter to take over the timer."""
+        for queue in self.queues.values():
+            for waiters in queue.values():
+                waiters[0].woken.set()
+                return
+
+    def block_until(self, deadline: float) -> None:
+        """Lets nothing through until `deadline`, like after a 429."""
+        self.remaining = 0
+        self.reset_at = max(self.reset_at, deadline)
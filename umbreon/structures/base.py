@@ -1,6 +1,6 @@
 import enum
 import functools
-from typing import (Any, Callable, Dict, List, Optional,
+from typing import (Any, Callable, Dict, List, Optional, Tuple, Type,
                     Set, TypeVar, Union, TYPE_CHECKING)
 
 from .storage_box import StorageBox
@@ -8,6 +8,7 @@ from .unset import Unset
 
 if TYPE_CHECKING:
     from .. import Client
+    from ..cache.changes import ChangeSet
 
 T = TypeVar('T')
 A = TypeVar('A')
@@ -32,12 +33,35 @@ class CaseInsensitiveEnumMeta(enum.EnumMeta):
         return super(CaseInsensitiveEnumMeta, self).__getitem__(item)
 
 
+FIELD_CONVERTER = Callable[['Client', Any], Any]
+
+
 class DataModelMixin:
-    __slots__ = ('client', 'storage')
+    __slots__ = ('client', 'storage', 'raw')
     factories: Dict[str, Callable[[Any], Any]] = {}
     mapping: Dict[str, str] = {}
     undocumented: Set[str] = {'lazy', 'self_video'}
+    #: Built once per class by `compile_fields`, maps a payload key to
+    #: the attribute it is stored in and the converter for its value.
+    field_plan: Dict[str, Tuple[str, FIELD_CONVERTER]] = {}
+    #: The inverse of `field_plan`: attribute to the payload keys for it.
+    field_keys: Dict[str, Tuple[str, ...]] = {}
+    #: When set (for example `Message.lazy_decoding = True`), the payload
+    #: is kept in `raw` and each attribute is only converted the first
+    #: time it is accessed. Undocumented fields are not reported then.
+    lazy_decoding: bool = False
     storage: StorageBox
+    #: The payload of attributes waiting to be converted, if lazy.
+    raw: Optional[Dict[str, Any]]
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)  # type: ignore
+        cls.field_plan = compile_fields(cls)
+
+        field_keys: Dict[str, Tuple[str, ...]] = {}
+        for key, (attr, _) in cls.field_plan.items():
+            field_keys[attr] = field_keys.get(attr, ()) + (key,)
+        cls.field_keys = field_keys
 
     def __init__(self,
                  client: 'Client',
@@ -47,12 +71,22 @@ class DataModelMixin:
         self.storage = StorageBox(self)
 
         dictionary = dictionary or {}
-        dictionary.update(backup_dictionary)
+        if backup_dictionary:
+            dictionary.update(backup_dictionary)
 
-        for attr, value in dictionary.items():
-            attr = self.mapping.get(attr, attr)
+        if self.lazy_decoding:
+            self.raw = dictionary
+            return
+
+        self.raw = None
+        field_plan = self.field_plan
+
+        for key, value in dictionary.items():
+            field = field_plan.get(key)
+
+            if field is None:
+                attr = self.mapping.get(key, key)
 
-            if attr not in dir(self.__class__):
                 if attr not in self.undocumented:
                     print(
                         f'`{attr}` is not documented '
@@ -62,67 +96,37 @@ class DataModelMixin:
 
                 continue
 
-            transformer = (self.factories.get(attr)
-                           or self.__annotations__.get(attr)
-                           or default_func)
+            attr, convert = field
+            setattr(self, attr, convert(client, value))
+
+    def loaded(self, attr: str) -> bool:
+        """Whether `attr` is set, without converting it if it's lazy."""
+        try:
+            object.__getattribute__(self, attr)
+        except AttributeError:
+            return False
+
+        return True
 
-            # allow optional variables
-            args = []
-            is_union = False
-            is_list = False
+    def defer(self, dictionary: Dict[str, Any]) -> None:
+        """
+        Queues the values of a payload to replace this
+        model's attributes the next time they're accessed.
+        """
+        raw = dict(self.raw or {})
 
-            if hasattr(transformer, '__args__'):
-                origin = getattr(transformer, '__origin__', None)
-                is_union = origin == Union
-                is_list = (origin == list) or (origin == List)
-                args = getattr(transformer, '__args__')
+        for key, value in dictionary.items():
+            field = self.field_plan.get(key)
 
-            if args is None:
+            if field is None:
                 continue
 
-            seived = filter(is_not_nonetype, args)
-            was_optional_dataclass = False
-            if is_union and seived and type(None) in args:
-                element = list(seived)[0]
-                transformer = optional(element)
-
-                if (isinstance(element, type)
-                   and issubclass(element, DataModelMixin)):
-                    was_optional_dataclass = True
-
-            # allow lists
-            was_list_dataclass = False
-            if is_list and args:
-                if (isinstance(args[0], type)
-                   and issubclass(args[0], DataModelMixin)):
-                    transformer = functools.partial(args[0], client)
-                    transformer = functools.partial(map, transformer)
-                    was_list_dataclass = True
-                else:
-                    transformer = functools.partial(map, args[0])
-
-            # feed client into other dataclasses
-            was_dataclass = False
-            if (isinstance(transformer, type)
-               and issubclass(transformer, DataModelMixin)):
-                transformer = functools.partial(transformer, client)
-                was_dataclass = True
-
-            transformed_value = transformer(value)  # type: ignore
-
-            if was_dataclass:
-                client.cache.pass_through(transformed_value)
-
-            if was_optional_dataclass:
-                if transformed_value is not None:
-                    client.cache.pass_through(transformed_value)
-
-            if is_list and args:
-                transformed_value = list(transformed_value)  # type: ignore
-                if was_list_dataclass:
-                    list(map(client.cache.pass_through, transformed_value))
-
-            setattr(self, attr, transformed_value)
+            raw[key] = value
+
+            if self.loaded(field[0]):
+                delattr(self, field[0])
+
+        self.raw = raw
 
     def as_dict(self) -> Dict[str, Any]:
         return_dictionary: Dict[str, Any] = {}
@@ -140,18 +144,55 @@ class DataModelMixin:
 
         return return_dictionary
 
-    def __getattr__(self, attr: str) -> Unset:
+    def __getattr__(self, attr: str) -> Any:
         """Decreases the number of accidental errors... Maybe..."""
+        if attr == 'raw':
+            return None
+
+        raw = self.raw
+
+        if raw is not None:
+            for key in self.field_keys.get(attr, ()):
+                if key in raw:
+                    value = self.field_plan[key][1](self.client, raw[key])
+
+                    if isinstance(value, DataModelMixin):
+                        value = value.uncache()
+
+                    setattr(self, attr, value)
+                    return value
+
         return Unset()
 
-    def uncache(self) -> 'DataModelMixin':
+    def uncache(self,
+                changes: Optional['ChangeSet'] = None) -> 'DataModelMixin':
+        """
+        Swaps this and nested models for their cached versions. Only
+        this model's own changes are recorded into `changes`, if passed.
+        """
+        self.uncache_nested()
+
+        return self.client.cache.pass_through(self, changes)
+
+    async def uncache_async(
+        self,
+        changes: Optional['ChangeSet'] = None
+    ) -> 'DataModelMixin':
+        """`uncache`, through the cache's `pass_through_async`."""
+        self.uncache_nested()
+
+        return await self.client.cache.pass_through_async(self, changes)
+
+    def uncache_nested(self) -> None:
         # recursive!
         for attr in self.__slots__:
+            if self.raw is not None and not self.loaded(attr):
+                # lazy attributes get uncached once they're converted
+                continue
+
             if isinstance(getattr(self, attr, None), DataModelMixin):
                 setattr(self, attr, getattr(self, attr, None).uncache())
 
-        return self.client.cache.pass_through(self)
-
 
 class IDDependent:
     """Nice dunder methods for objects with unique IDs."""
@@ -182,3 +223,140 @@ def optional(
         return function(argument) if argument else None
 
     return decoration
+
+
+def compile_converter(transformer: Any) -> Optional[FIELD_CONVERTER]:
+    """
+    Turns a factory or an annotation into a function
+    taking the client and the raw value, or None if
+    the field should be ignored.
+    """
+    args: Any = ()
+    is_union = False
+    is_list = False
+
+    if hasattr(transformer, '__args__'):
+        origin = getattr(transformer, '__origin__', None)
+        is_union = origin == Union
+        is_list = (origin == list) or (origin == List)
+        args = getattr(transformer, '__args__')
+
+    if args is None:
+        return None
+
+    # allow optional variables
+    if is_union and type(None) in args:
+        element = [arg for arg in args if arg is not type(None)][0]
+
+        if isinstance(element, type) and issubclass(element, DataModelMixin):
+            return optional_model_converter(element)
+
+        return plain_converter(optional(element))
+
+    # allow lists
+    if is_list and args:
+        if isinstance(args[0], type) and issubclass(args[0], DataModelMixin):
+            return model_list_converter(args[0])
+
+        return list_converter(args[0])
+
+    # feed client into other dataclasses
+    if isinstance(transformer, type) and issubclass(transformer,
+                                                    DataModelMixin):
+        return model_converter(transformer)
+
+    if is_union or not callable(transformer):
+        return plain_converter(default_func)
+
+    return plain_converter(transformer)
+
+
+def compile_fields(
+    model: Type[DataModelMixin]
+) -> Dict[str, Tuple[str, FIELD_CONVERTER]]:
+    """
+    Resolves the converter of every attribute `model` can hold,
+    so `DataModelMixin.__init__` doesn't have to on every instance.
+    """
+    annotations: Dict[str, Any] = {}
+    slots: List[str] = []
+
+    for klass in reversed(model.__mro__):
+        annotations.update(vars(klass).get('__annotations__', {}))
+
+        klass_slots = vars(klass).get('__slots__', ())
+        if isinstance(klass_slots, str):
+            klass_slots = (klass_slots,)
+        slots.extend(klass_slots)
+
+    known = set(dir(model))
+    field_plan: Dict[str, Tuple[str, FIELD_CONVERTER]] = {}
+
+    # the mixin's own attributes aren't fields
+    internal = {*vars(DataModelMixin)['__annotations__'],
+                *DataModelMixin.__slots__}
+
+    for attr in {*annotations, *slots, *model.factories}:
+        if attr not in known or attr in internal:
+            continue
+
+        convert = compile_converter(model.factories.get(attr)
+                                    or annotations.get(attr)
+                                    or default_func)
+
+        if convert is not None:
+            field_plan[attr] = (attr, convert)
+
+    for key, attr in model.mapping.items():
+        if attr in field_plan:
+            field_plan[key] = field_plan[attr]
+        else:
+            field_plan.pop(key, None)
+
+    return field_plan
+
+
+def plain_converter(function: Callable[[Any], Any]) -> FIELD_CONVERTER:
+    def convert(client: 'Client', value: Any) -> Any:
+        return function(value)
+
+    return convert
+
+
+def list_converter(function: Callable[[Any], Any]) -> FIELD_CONVERTER:
+    def convert(client: 'Client', value: Any) -> Any:
+        return list(map(function, value))
+
+    return convert
+
+
+def model_converter(model: Type[DataModelMixin]) -> FIELD_CONVERTER:
+    def convert(client: 'Client', value: Any) -> Any:
+        result = model(client, value)
+        client.cache.pass_through(result)
+        return result
+
+    return convert
+
+
+def optional_model_converter(
+    model: Type[DataModelMixin]
+) -> FIELD_CONVERTER:
+    def convert(client: 'Client', value: Any) -> Any:
+        if not value:
+            return None
+
+        result = model(client, value)
+        client.cache.pass_through(result)
+        return result
+
+    return convert
+
+
+def model_list_converter(model: Type[DataModelMixin]) -> FIELD_CONVERTER:
+    def convert(client: 'Client', value: Any) -> Any:
+        result = [model(client, element) for element in value]
+        client.cache.pass_through_many(result)
+        return result
+
+    return convert
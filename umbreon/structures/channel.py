@@ -1,13 +1,12 @@
 from datetime import datetime
 from enum import Enum, IntEnum
-from json import loads
-from typing import List, Optional
-
-from dateutil.parser import isoparse
+from typing import Any, Dict, List, Optional
 
 from .base import CaseInsensitiveEnumMeta, DataModelMixin
 from .permission import Permissions
 from .snowflake import Snowflake, SnowflakeDependent
+from .timestamp import parse_timestamp
+from .unset import Unset
 from .user import User
 
 from ..http_base.routing_table import RoutingTable
@@ -36,6 +35,8 @@ class PermissionOverwrite(DataModelMixin):
     allow: Permissions
     deny: Permissions
 
+    modifiable_fields = ('id', 'type', 'allow', 'deny')
+
 
 class Channel(DataModelMixin, SnowflakeDependent):
     __slots__ = ('id', 'type', 'guild_id', 'position',
@@ -64,36 +65,48 @@ class Channel(DataModelMixin, SnowflakeDependent):
     last_pin_timestamp: datetime
 
     factories = {
-        'last_pin_timestamp': isoparse
+        'last_pin_timestamp': parse_timestamp
     }
 
+    #: what `modify` sends, as the rest can't be changed through it
+    modifiable_fields = (
+        'name', 'type', 'position', 'topic', 'nsfw', 'rate_limit_per_user',
+        'bitrate', 'user_limit', 'permission_overwrites', 'parent_id'
+    )
+
     async def fill(self) -> Optional['Channel']:
+        """The cached channel, or Discord's if that's too old."""
+        return await self.client.fetch_channel(self.id)
+
+    async def modify(self) -> Optional['Channel']:
         result = await self.client.http.request(
-            RoutingTable.get_channel,
+            RoutingTable.modify_channel,
+            modifiable(self),
             channel_id=self.id
         )
 
         if result.status_code != 200:
             return None  # TODO: ?
 
-        result = Channel(loads(result))
+        channel = Channel(self.client, result.json())
 
-        self.client.cache.pass_through(result)
+        return self.client.cache.pass_through(channel)
 
-        return result
 
-    async def modify(self):
-        result = await self.client.http.request(
-            RoutingTable.modify_channel,
-            self.asdict(),
-            channel_id=self.id
-        )
+def modifiable(model: Any) -> Any:
+    """The `modifiable_fields` of `model` which are set, as JSON."""
+    if isinstance(model, list):
+        return [modifiable(element) for element in model]
 
-        if result.status_code != 200:
-            return None  # TODO: ?
+    if not isinstance(model, DataModelMixin):
+        return model
+
+    body: Dict[str, Any] = {}
 
-        result = Channel(loads(result))
+    for attr in getattr(model, 'modifiable_fields', ()):
+        value = getattr(model, attr)
 
-        self.client.cache.pass_through(result)
+        if not isinstance(value, Unset):
+            body[attr] = modifiable(value)
 
-        return result
+    return body
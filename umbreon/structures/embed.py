@@ -2,9 +2,8 @@ from datetime import datetime
 from json import dumps  # TODO: autoselection between ujson, json
 from typing import List
 
-from dateutil.parser import isoparse
-
 from .base import DataModelMixin
+from .timestamp import parse_timestamp
 
 
 class EmbedAuthor(DataModelMixin):
@@ -78,7 +77,7 @@ class Embed(DataModelMixin):
     fields: List[EmbedField]
 
     factories = {
-        'timestamp': isoparse
+        'timestamp': parse_timestamp
     }
 
     def validate(self) -> bool:
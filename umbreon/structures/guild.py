@@ -2,8 +2,6 @@ from datetime import datetime
 from enum import Enum, IntEnum, IntFlag
 from typing import List, Optional
 
-from dateutil.parser import isoparse
-
 from .base import CaseInsensitiveEnumMeta, DataModelMixin
 from .channel import Channel
 from .emoji import Emoji
@@ -12,6 +10,7 @@ from .permission import Permissions
 from .presence import PresenceUpdate
 from .role import Role
 from .snowflake import Snowflake, SnowflakeDependent
+from .timestamp import parse_timestamp
 from .voice_state import VoiceState
 
 
@@ -127,5 +126,5 @@ class Guild(DataModelMixin, SnowflakeDependent):
     public_updates_channel_id: Optional[Snowflake]
 
     factories = {
-        'joined_at': isoparse
+        'joined_at': parse_timestamp
     }
@@ -1,15 +1,12 @@
 from datetime import datetime
-from typing import TYPE_CHECKING, List, Optional
-
-from dateutil.parser import isoparse
+from typing import List, Optional
 
 from .base import DataModelMixin, optional
+from .role import Role
 from .snowflake import Snowflake
+from .timestamp import parse_timestamp
 from .user import User
 
-if TYPE_CHECKING:
-    from .role import Role  # noqa
-
 
 class Member(DataModelMixin):
     __slots__ = ('user', 'nick', 'roles', 'joined_at',
@@ -25,8 +22,8 @@ class Member(DataModelMixin):
     hoisted_role_id: Optional[Snowflake]
 
     factories = {
-        'joined_at': isoparse,
-        'premium_since': optional(isoparse)  # type: ignore
+        'joined_at': parse_timestamp,
+        'premium_since': optional(parse_timestamp)  # type: ignore
     }
 
     mapping = {
@@ -34,8 +31,8 @@ class Member(DataModelMixin):
     }
 
     @property
-    def hoisted_role(self) -> Optional['Role']:
+    def hoisted_role(self) -> Optional[Role]:
         if self.hoisted_role_id:
-            return self.client.cache.get(self.hoisted_role_id)  # type: ignore
+            return self.client.cache.get(self.hoisted_role_id, Role)
 
         return None
@@ -2,16 +2,15 @@ import enum
 from datetime import datetime
 from typing import List, Optional
 
-from dateutil.parser import isoparse
-
 from .attachment import Attachment
 from .base import CaseInsensitiveEnumMeta, DataModelMixin, optional
-from .channel import ChannelType
+from .channel import Channel, ChannelType
 from .embed import Embed
 from .member import Member
 from .reaction import Reaction
 from .role import Role
 from .snowflake import Snowflake, SnowflakeDependent
+from .timestamp import parse_timestamp
 from .user import User
 
 
@@ -116,10 +115,10 @@ class Message(DataModelMixin, SnowflakeDependent):
     flags: MessageFlags
 
     factories = {
-        'timestamp': isoparse,
-        'edited_timestamp': optional(isoparse)  # type: ignore # ??? mypy
+        'timestamp': parse_timestamp,
+        'edited_timestamp': optional(parse_timestamp)  # type: ignore # ???
     }
 
     @property
-    def channel(self):
-        return self.client.cache.get(self.channel_id or 0)
+    def channel(self) -> Optional[Channel]:
+        return self.client.cache.get(self.channel_id or 0, Channel)
@@ -1,12 +1,11 @@
 from datetime import datetime
 from typing import List, Optional
 
-from dateutil.parser import isoparse
-
 from .activity import Activity
 from .base import DataModelMixin, optional
 from .client_status import ClientStatus
 from .snowflake import Snowflake
+from .timestamp import parse_timestamp
 from .user import User
 
 
@@ -25,5 +24,5 @@ class PresenceUpdate(DataModelMixin):
     nick: Optional[str]
 
     factories = {
-        'premium_since': optional(isoparse)  # type: ignore
+        'premium_since': optional(parse_timestamp)  # type: ignore
     }
@@ -1,21 +1,60 @@
-from typing import Any
+from datetime import datetime, timezone
+from typing import Any, Union
 
-from .base import IDDependent
+#: The first second of 2015, in milliseconds since the unix epoch.
+DISCORD_EPOCH = 1420070400000
 
 
-class Snowflake(IDDependent):
-    __slots__ = ('id')
+class Snowflake(int):
+    """
+    A plain `int` with a few helpers, so ids hash, compare
+    and work as dict keys exactly like the integers they are.
+    """
+    __slots__ = ()
+
+    def __new__(cls, id: Union[int, str, None] = 0) -> 'Snowflake':
+        return super().__new__(cls, int(id) if id else 0)  # type: ignore
+
+    @classmethod
+    def from_datetime(cls, when: datetime) -> 'Snowflake':
+        """
+        The smallest snowflake created at `when`, which makes
+        `Snowflake.from_datetime(a) <= message.id < ...from_datetime(b)`
+        a time range query.
+        """
+        milliseconds = int(when.timestamp() * 1000) - DISCORD_EPOCH
+        return cls(max(milliseconds, 0) << 22)
+
+    @property
+    def id(self) -> int:
+        """What the old, wrapping snowflakes stored their int in."""
+        return int(self)
 
-    id: int
+    @property
+    def timestamp(self) -> int:
+        """Milliseconds since the unix epoch this was made at."""
+        return (self >> 22) + DISCORD_EPOCH
 
-    def __init__(self, id: int):
-        self.id = int(id) if id else 0
+    @property
+    def created_at(self) -> datetime:
+        return datetime.fromtimestamp(self.timestamp / 1000, timezone.utc)
 
-    def __str__(self) -> str:
-        return str(self.id)
+    @property
+    def worker_id(self) -> int:
+        return (self & 0x3E0000) >> 17
 
-    def __int__(self) -> int:
-        return int(self.id)
+    @property
+    def process_id(self) -> int:
+        return (self & 0x1F000) >> 12
+
+    @property
+    def increment(self) -> int:
+        return self & 0xFFF
+
+    __str__ = int.__repr__
+
+    def __repr__(self) -> str:
+        return '%s(%d)' % (self.__class__.__name__, self)
 
 
 class SnowflakeDependent:
@@ -25,7 +64,7 @@ class SnowflakeDependent:
 
     def __hash__(self) -> int:
         """Decrease size of sets"""
-        return self.id.id
+        return self.id
 
     def __eq__(self, other: Any) -> bool:
         if isinstance(other, SnowflakeDependent):
@@ -37,4 +76,4 @@ class SnowflakeDependent:
         return not self.__eq__(other)
 
     def __repr__(self) -> str:
-        return '[%s#%d]' % (self.__class__.__name__, self.id.id)
+        return '[%s#%d]' % (self.__class__.__name__, self.id)
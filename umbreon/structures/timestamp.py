@@ -0,0 +1,50 @@
+"""
+A parser for the handful of ISO-8601 shapes Discord sends,
+like `2017-07-11T17:27:07.299000+00:00`.
+"""
+from datetime import datetime, timedelta, timezone, tzinfo
+from functools import lru_cache
+from typing import Optional
+
+
+@lru_cache(maxsize=256)
+def parse_timestamp(timestamp: str) -> datetime:
+    """
+    Parses a Discord timestamp. Repeated values (think the
+    `joined_at` of a guild's members) are served from a small cache.
+    """
+    try:
+        # C-accelerated, covers Discord's usual 0, 3 or 6 digit fractions
+        return datetime.fromisoformat(timestamp)
+    except ValueError:
+        return _parse_slowly(timestamp)
+
+
+def _parse_slowly(timestamp: str) -> datetime:
+    # older pythons choke on `Z` and odd fraction lengths
+    try:
+        date, _, time = timestamp.partition('T')
+        offset: Optional[tzinfo] = timezone.utc
+
+        if time[-1:] in ('Z', 'z'):
+            time = time[:-1]
+        elif len(time) > 6 and time[-6] in '+-' and time[-3] == ':':
+            sign = -1 if time[-6] == '-' else 1
+            offset = timezone(sign * timedelta(hours=int(time[-5:-3]),
+                                               minutes=int(time[-2:])))
+            time = time[:-6]
+        else:
+            offset = None
+
+        time, _, fraction = time.partition('.')
+
+        return datetime(
+            int(date[0:4]), int(date[5:7]), int(date[8:10]),
+            int(time[0:2]) if time else 0,
+            int(time[3:5]) if time else 0,
+            int(time[6:8]) if time else 0,
+            int(fraction[:6].ljust(6, '0')) if fraction else 0,
+            offset
+        )
+    except (ValueError, IndexError):
+        raise ValueError(f'{timestamp!r} is not a Discord timestamp.')
@@ -1,4 +1,4 @@
-from typing import Any, Iterable
+from typing import Any, Iterator
 
 
 class Unset(object):
@@ -9,8 +9,8 @@ class Unset(object):
     def __len__(self) -> int:
         return 0
 
-    def __iter__(self) -> Iterable[None]:
-        return ()
+    def __iter__(self) -> Iterator[None]:
+        return iter(())
 
     def __bool__(self) -> bool:
         return False